@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from resources.models import ArtifactFile, TileArtifact
+
+
+class ArtifactFileInline(admin.TabularInline):
+    model = ArtifactFile
+    extra = 0
+    readonly_fields = ("format", "file_name", "bytes", "sha256", "triangles", "seconds")
+
+
+@admin.register(TileArtifact)
+class TileArtifactAdmin(admin.ModelAdmin):
+    list_display = ("tile_type", "version", "formats", "triangle_count", "total_bytes", "use_count", "last_used_at")
+    list_filter = ("tile_type", "code_version")
+    search_fields = ("cache_key", "config_hash")
+    readonly_fields = ("cache_key", "config_hash", "created_at")
+    inlines = [ArtifactFileInline]
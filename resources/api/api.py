@@ -1,9 +1,21 @@
 from ninja import NinjaAPI
+from resources.api.config_api import config_router
+from resources.api.helper_api import router as helper_router
 from resources.api.tile_api import tile_router
+from resources.helpers.offload import Saturated
 
 api = NinjaAPI()
 
 def include_routers():
     api.add_router("/tiles/", tile_router)
+    api.add_router("/configs/", config_router)
+    api.add_router("/helpers/", helper_router)
+
+@api.exception_handler(Saturated)
+def tile_executor_saturated(request, exc):
+    """Answer with 429 and tell the client when capacity is likely to be free again."""
+    response = api.create_response(request, {"detail": str(exc)}, status=429)
+    response["Retry-After"] = str(exc.retry_after)
+    return response
 
 include_routers()
@@ -1,14 +1,22 @@
+from asgiref.sync import sync_to_async
 from ninja import Router
+from ninja.errors import HttpError
 from resources.configs.yaml_config import load_config, validate_config, get_default_config_path
 
 config_router = Router()
 
 @config_router.get("/{tile_type}/config/")
-def get_tile_config(request, tile_type: str):
+async def get_tile_config(request, tile_type: str):
     """
     Retrieve the configuration for a given tile type.
+    The YAML is read off the event loop, so this never waits behind tile generation.
     """
+    try:
+        config = await sync_to_async(_load_tile_config, thread_sensitive=False)(tile_type)
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    return {"tile_type": tile_type, "config": config.model_dump()}
+
+def _load_tile_config(tile_type: str):
     config_path = get_default_config_path(tile_type)
-    config = load_config(config_path)
-    validate_config(config, tile_type)
-    return {"tile_type": tile_type, "config": config}
+    return validate_config(load_config(config_path), tile_type)
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from ninja import Router
 from django.http import JsonResponse
 import os
@@ -5,11 +6,11 @@ import os
 router = Router(tags=["Helpers"])
 
 @router.get("/check-media-folder", summary="Check if media folder exists")
-def check_media_folder(request):
+async def check_media_folder(request):
     """
     Checks if the media directory exists.
     """
     media_path = "media/"
-    exists = os.path.exists(media_path)
+    exists = await sync_to_async(os.path.exists, thread_sensitive=False)(media_path)
     
     return JsonResponse({"media_folder_exists": exists}, status=200)
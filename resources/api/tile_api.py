@@ -1,23 +1,561 @@
-from ninja import Router
-from resources.helpers.tile_assembly import assemble_tile
-from resources.configs.yaml_config import load_config
-from resources.helpers.file_helper import export_tile
+import json
+import os
+import queue
+import re
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from ninja import Router, Schema
+from ninja.errors import HttpError
+from resources.configs.yaml_config import config_path_for, load_config
+from resources.helpers.artifact_index import find_artifact, record_use
+from resources.helpers.batch import expand_sweep, get_batch_executor, run_batch
+from resources.helpers.brick_geometry import prototype_cache_stats
+from resources.helpers.downloads import CONTENT_TYPES, serve_artifact, streams_async
+from resources.helpers.instrumentation import prometheus_text, span, trace_request
+from resources.helpers.job_queue import get_job_database_path, get_tile_job, submit_tile_job
+from resources.helpers.lod import SLAB_LOD, lod_level, mortar_hint
+from resources.helpers.offload import offload, offload_stats, submit_offload
+from resources.helpers.tessellation import resolve_tessellation
+from resources.helpers.tile_cache import (
+    artifact_key,
+    cache_stats,
+    cached_tile,
+    get_cache_root,
+    get_or_generate_tile,
+    lookup,
+)
+from resources.helpers.worker_pool import worker_stats
 
 tile_router = Router()
 
+CACHE_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class BatchRequest(Schema):
+    tile_type: str
+    sweep: dict = {}
+    overrides: dict = {}
+    export_formats: list = None
+
+
+class ArtifactQuery(Schema):
+    tile_type: str
+    overrides: dict = {}
+    export_formats: list = None
+    quality: str = None
+    max_triangles: int = None
+    max_bytes: int = None
+    fuse: bool = None
+    lod: int = None
+
+
+def media_url(path: str) -> str:
+    """
+    Convert a path inside MEDIA_ROOT into its public media URL.
+    """
+    relative_path = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    return f"{settings.MEDIA_URL}{relative_path}"
+
+
 @tile_router.post("/generate/")
-def generate_tile(request, tile_type: str):
+async def generate_tile(request, response: HttpResponse, tile_type: str, quality: str = None,
+                        max_triangles: int = None, max_bytes: int = None, fuse: bool = None, lod: int = None,
+                        debug: bool = False, profile: str = None):
     """
     Generate a tile based on the provided tile type and configuration.
+    Identical configurations are served from the tile cache.
+
+    ``quality`` selects the STL tessellation preset (draft/print/archive);
+    ``max_triangles``/``max_bytes`` set a budget the STL must fit.
+    ``fuse`` overrides the config's ``fuse_solids``: fused tiles are merged
+    into as few solids as possible before export.
+    ``lod`` selects the level of detail (0 full, 1 plain boxes, 2 one slab);
+    slab brick tiles return the mortar lines they stand in for as ``mortar``.
+    Stage timings are returned in the ``Server-Timing`` header; ``debug``
+    adds the full span tree and counters to the response and ``profile``
+    (cprofile/pyinstrument) captures a profile of the request.
+    Cache hits are answered from a worker thread; only misses take a slot on
+    the bounded offload executor. When it is saturated the request is
+    answered with 429 and a ``Retry-After`` header.
+    """
+    params = (tile_type, quality, max_triangles, max_bytes, fuse, lod, profile)
+    try:
+        result, trace = await sync_to_async(_traced_generate, thread_sensitive=False)(*params, cached_only=True)
+        if result is None:
+            result, trace = await offload(_traced_generate, *params)
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+
+    response["Server-Timing"] = trace.server_timing()
+    if debug or profile:
+        result["timings"] = trace.to_dict()
+    return result
+
+
+def resolve_request(tile_type: str, quality: str = None, max_triangles: int = None, max_bytes: int = None,
+                    fuse: bool = None, overrides: dict = None, lod: int = None):
+    """
+    Resolve generate parameters into ``(config, tessellation, export_formats)``.
+    :raises ValueError: If the overrides or tessellation options are invalid.
+    """
+    config = load_config(config_path_for(tile_type))
+    if overrides:
+        config = config.with_overrides(**overrides)
+    if fuse is not None:
+        config = config.with_overrides(fuse_solids=fuse)
+    if lod is not None:
+        config = config.with_overrides(lod=lod)
+    tessellation = resolve_tessellation(
+        config, quality=quality, max_triangles=max_triangles, max_bytes=max_bytes
+    )
+    return config, tessellation, list(config.get("export_formats", ["step", "stl"]))
+
+
+def _traced_generate(tile_type: str, quality: str, max_triangles: int, max_bytes: int, fuse: bool, lod: int,
+                     profile: str, cached_only: bool = False):
+    # Traced on the executor thread, so profiles capture the generation itself
+    with trace_request(profile=profile) as trace:
+        with span("request.generate"):
+            result = _generate_tile(tile_type, quality, max_triangles, max_bytes, fuse, lod, cached_only)
+    return result, trace
+
+
+def _generate_tile(tile_type: str, quality: str, max_triangles: int, max_bytes: int, fuse: bool = None,
+                   lod: int = None, cached_only: bool = False):
+    """Build the generate response; with ``cached_only``, return ``None`` instead of generating on a miss."""
+    config, tessellation, export_formats = resolve_request(
+        tile_type, quality, max_triangles, max_bytes, fuse, lod=lod
+    )
+
+    # Assemble and export the tile, or reuse the cached artifacts
+    if cached_only:
+        manifest = cached_tile(config, tile_type=tile_type, export_formats=export_formats, tessellation=tessellation)
+        if manifest is None:
+            return None
+        cached = True
+    else:
+        manifest, cached = get_or_generate_tile(
+            config, tile_type=tile_type, version="v1.0", export_formats=export_formats,
+            tessellation=tessellation,
+        )
+
+    exports = manifest.get("exports", {})
+    result = {
+        "message": f"{tile_type.capitalize()} tile generated successfully.",
+        "cached": cached,
+        "cache_key": manifest["key"],
+        "lod": lod_level(config),
+        "files": {fmt: media_url(path) for fmt, path in manifest["paths"].items()},
+        "downloads": {fmt: download_url(manifest["key"], fmt) for fmt in manifest["paths"]},
+        "exports": exports,
+        "triangles": exports.get("stl", {}).get("triangles"),
+    }
+    if lod_level(config) >= SLAB_LOD and mortar_hint(config):
+        result["mortar"] = mortar_hint(config)
+    return result
+
+
+def download_url(cache_key: str, fmt: str) -> str:
+    """
+    Return the streaming download URL for one cached artifact.
+    """
+    return f"/api/tiles/files/{cache_key}/{fmt}/"
+
+
+def serialize_job(job: dict) -> dict:
+    """
+    Convert a job record into the public status payload.
+    """
+    result = job["result"] or {}
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "tile_type": job["tile_type"],
+        "cache_key": job["key"],
+        "error": job["error"],
+        "files": {fmt: media_url(path) for fmt, path in result.get("files", {}).items()},
+    }
+
+
+@tile_router.post("/batch/")
+async def generate_batch(request, payload: BatchRequest):
+    """
+    Generate every variant of a parameter sweep over a base configuration.
+    Results are streamed back as newline-delimited JSON as each variant finishes.
+    A batch takes one slot on the bounded offload executor for its whole run
+    (429 with ``Retry-After`` when saturated); its variants run on the process
+    pool shared by all batches. A client that disconnects stops the batch:
+    variants that have not started are cancelled.
+    """
+    try:
+        base_config = await sync_to_async(_batch_config, thread_sensitive=False)(payload)
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {payload.tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+
+    results = queue.Queue()
+    # Set when the response is closed, e.g. because the client disconnected
+    cancelled = threading.Event()
+    # Admitted before the response starts, so a saturated server still answers 429
+    done = submit_offload(_run_batch_into, results, cancelled, base_config, payload)
+    batch_lines = _batch_lines_async if streams_async(request) else _batch_lines
+    lines = batch_lines(results, cancelled, done)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+_BATCH_DONE = object()
+
+
+def _batch_config(payload: BatchRequest):
+    base_config = load_config(config_path_for(payload.tile_type)).with_overrides(**payload.overrides)
+    expand_sweep(base_config, payload.sweep)
+    return base_config
+
+
+def _run_batch_into(results: queue.Queue, cancelled: threading.Event, base_config, payload: BatchRequest):
+    variants = run_batch(
+        base_config, payload.sweep, tile_type=payload.tile_type, export_formats=payload.export_formats,
+        executor=get_batch_executor(),
+    )
+    try:
+        for result in variants:
+            if cancelled.is_set():
+                break
+            results.put(result)
+    finally:
+        # Closing the batch cancels the variants that have not started yet
+        variants.close()
+        results.put(_BATCH_DONE)
+
+
+def _batch_line(result: dict) -> str:
+    files = {fmt: media_url(path) for fmt, path in result.pop("files", {}).items()}
+    return json.dumps({**result, "files": files}) + "\n"
+
+
+def _batch_error(done) -> str:
+    """Trailing line reporting a batch that failed as a whole, or ``None``."""
+    error = done.exception()
+    return None if error is None else json.dumps({"status": "failed", "error": str(error)}) + "\n"
+
+
+def _batch_lines(results: queue.Queue, cancelled: threading.Event, done):
+    try:
+        while (result := results.get()) is not _BATCH_DONE:
+            yield _batch_line(result)
+        error = _batch_error(done)
+        if error:
+            yield error
+    finally:
+        cancelled.set()
+
+
+async def _batch_lines_async(results: queue.Queue, cancelled: threading.Event, done):
+    # Waiting for the next result happens in a worker thread, never on the event loop
+    next_result = sync_to_async(results.get, thread_sensitive=False)
+    try:
+        while (result := await next_result()) is not _BATCH_DONE:
+            yield _batch_line(result)
+        error = await sync_to_async(_batch_error, thread_sensitive=False)(done)
+        if error:
+            yield error
+    finally:
+        cancelled.set()
+
+
+@tile_router.post("/wall/")
+async def generate_wall(request, tile_type: str, wall_width: int, wall_rows: int, chunk_width: int = None,
+                        chunk_rows: int = None, mode: str = "combined"):
+    """
+    Generate a large wall from cached sub-tiles aligned to the bond period.
+    ``mode=combined`` returns one file per format; ``mode=chunks`` returns the
+    distinct chunk files and where to place each one.
+    Runs on the bounded offload executor (429 with ``Retry-After`` when saturated).
+    """
+    try:
+        manifest = await offload(_export_wall, tile_type, wall_width, wall_rows, chunk_width, chunk_rows, mode)
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    except RuntimeError as e:
+        # Assembly, fusion or export failed; report why instead of a bare 500
+        raise HttpError(500, str(e))
+
+    result = {
+        "cached": manifest["cached"],
+        "wall_key": manifest["key"],
+        "wall": manifest["wall"],
+        "chunk": manifest["chunk"],
+        "distinct_chunks": manifest["distinct_chunks"],
+        "placements": len(manifest["placements"]),
+        "files": {fmt: media_url(entry["path"]) for fmt, entry in manifest["files"].items()},
+        "manifest": media_url(manifest["manifest_path"]),
+        "seconds": manifest["generation_seconds"],
+    }
+    if mode == "chunks":
+        result["chunk_files"] = {
+            key: {fmt: media_url(path) for fmt, path in paths.items()} for key, paths in manifest["chunk_files"].items()
+        }
+        result["placements"] = manifest["placements"]
+    return result
+
+
+def _export_wall(tile_type: str, wall_width: int, wall_rows: int, chunk_width: int, chunk_rows: int, mode: str):
+    from resources.helpers.wall_tiling import export_wall
+
+    config = load_config(config_path_for(tile_type))
+    if config["tile_type"] != "bricks":
+        raise ValueError(f"Walls can only be built from brick tiles, not {config['tile_type']}")
+    config = config.with_overrides(tile_width=wall_width, row_repetition=wall_rows)
+    return export_wall(
+        config, tile_type=f"{tile_type}_wall", mode=mode, chunk_width=chunk_width, chunk_rows=chunk_rows
+    )
+
+
+@tile_router.post("/jobs/")
+async def submit_tile(request, tile_type: str):
     """
-    config_path = f"resources/configs/bricks/{tile_type}.yaml"
-    config = load_config(config_path)
+    Queue tile generation and return a job id immediately.
+    Identical requests that are still in flight share the same job.
+    """
+    try:
+        job, created = await sync_to_async(_submit_tile, thread_sensitive=False)(tile_type)
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    return {**serialize_job(job), "coalesced": not created}
+
 
-    # Dynamically assemble the tile
-    tile = assemble_tile(config)
+def _submit_tile(tile_type: str):
+    config = load_config(config_path_for(tile_type))
 
-    # Export the tile
     export_formats = config.get("export_formats", ["step", "stl"])
-    export_tile(tile, version="v1.0", tile_type=tile_type, export_formats=export_formats)
+    return submit_tile_job(config, tile_type=tile_type, version="v1.0", export_formats=export_formats)
+
+
+@tile_router.get("/jobs/{job_id}/")
+async def get_tile_job_status(request, job_id: str):
+    """
+    Report status, progress and artifact URLs for a tile job.
+    """
+    job = await sync_to_async(get_tile_job, thread_sensitive=False)(job_id)
+    if job is None:
+        raise HttpError(404, f"Tile job not found: {job_id}")
+    return serialize_job(job)
+
+
+@tile_router.get("/files/{cache_key}/{fmt}/")
+async def download_artifact(request, cache_key: str, fmt: str):
+    """
+    Stream a cached artifact with ETag revalidation and HTTP Range support.
+    Precompressed variants are served to clients that accept them.
+    """
+    manifest = None
+    if CACHE_KEY_PATTERN.fullmatch(cache_key):
+        manifest = await sync_to_async(lookup, thread_sensitive=False)(cache_key)
+    if manifest is None or fmt not in manifest["paths"]:
+        raise HttpError(404, f"Artifact not found: {cache_key}/{fmt}")
+
+    return await sync_to_async(serve_artifact, thread_sensitive=False)(
+        request,
+        manifest["paths"][fmt],
+        digest=manifest.get("exports", {}).get(fmt, {}).get("sha256"),
+        content_type=CONTENT_TYPES.get(fmt, "application/octet-stream"),
+    )
+
+
+@tile_router.get("/preview/{tile_type}/")
+async def get_tile_preview(request, tile_type: str, lod: int = None, fuse: bool = None):
+    """
+    Serve a PNG preview of a tile's default configuration.
+    Previews are cached like any other artifact: once rendered, serving one is
+    a cache lookup and a file read, never a CAD rebuild.
+    """
+    return await _preview_response(request, tile_type, fuse=fuse, lod=lod)
+
+
+@tile_router.post("/preview/")
+async def find_tile_preview(request, query: ArtifactQuery):
+    """
+    Serve a PNG preview of any variant, given its generate parameters.
+    Renders (and caches) the preview on first use.
+    """
+    return await _preview_response(request, query.tile_type, query.fuse, query.overrides, query.lod)
+
+
+def _preview_manifest(tile_type: str, fuse: bool, overrides: dict, lod: int, cached_only: bool = False):
+    config, tessellation, _ = resolve_request(tile_type, fuse=fuse, overrides=overrides, lod=lod)
+    if cached_only:
+        return cached_tile(config, tile_type=tile_type, export_formats=["png"], tessellation=tessellation)
+    manifest, _ = get_or_generate_tile(
+        config, tile_type=tile_type, version="v1.0", export_formats=["png"], tessellation=tessellation,
+    )
+    return manifest
+
+
+async def _preview_response(request, tile_type: str, fuse: bool = None, overrides: dict = None, lod: int = None):
+    try:
+        # A cached preview is a lookup and a file read; only rendering a missing one takes an executor slot
+        manifest = await sync_to_async(_preview_manifest, thread_sensitive=False)(
+            tile_type, fuse, overrides, lod, cached_only=True
+        )
+        if manifest is None:
+            manifest = await offload(_preview_manifest, tile_type, fuse, overrides, lod)
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+
+    return await sync_to_async(serve_artifact, thread_sensitive=False)(
+        request,
+        manifest["paths"]["png"],
+        digest=manifest.get("exports", {}).get("png", {}).get("sha256"),
+        content_type=CONTENT_TYPES["png"],
+    )
+
+
+def serialize_artifact(artifact) -> dict:
+    """
+    Convert a ``TileArtifact`` into the public index payload.
+    """
+    entry_dir = os.path.join(get_cache_root(), artifact.cache_key)
+    return {
+        "cache_key": artifact.cache_key,
+        "config_hash": artifact.config_hash,
+        "tile_type": artifact.tile_type,
+        "version": artifact.version,
+        "formats": artifact.formats.split(","),
+        "code_version": artifact.code_version,
+        "bounding_box": artifact.bounding_box,
+        "triangle_count": artifact.triangle_count,
+        "total_bytes": artifact.total_bytes,
+        "generation_seconds": artifact.generation_seconds,
+        "created_at": artifact.created_at.isoformat(),
+        "last_used_at": artifact.last_used_at.isoformat(),
+        "use_count": artifact.use_count,
+        "files": {
+            file.format: {
+                "url": media_url(os.path.join(entry_dir, file.file_name)),
+                "download": download_url(artifact.cache_key, file.format),
+                "bytes": file.bytes,
+                "sha256": file.sha256,
+                "triangles": file.triangles,
+            }
+            for file in artifact.files.all()
+        },
+    }
+
+
+def _indexed_artifact(cache_key: str):
+    """Return the indexed artifact if its files are still cached, else ``None``."""
+    artifact = find_artifact(cache_key)
+    if artifact is None:
+        return None
+    if lookup(cache_key) is None:
+        # Stale row: the files were removed behind the index's back
+        artifact.delete()
+        return None
+    return artifact
+
+
+@tile_router.post("/artifacts/find/")
+def find_tile_artifact(request, query: ArtifactQuery):
+    """
+    Find an existing artifact by its generate parameters without generating anything.
+    The parameters resolve to the same cache key as ``/generate/``, which is
+    looked up on the artifact index's unique key. Returns 404 if none exists yet.
+    """
+    try:
+        config, tessellation, export_formats = resolve_request(
+            query.tile_type, query.quality, query.max_triangles, query.max_bytes, query.fuse, query.overrides,
+            lod=query.lod,
+        )
+    except FileNotFoundError:
+        raise HttpError(404, f"Unknown tile type: {query.tile_type}")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+
+    key = artifact_key(config, query.tile_type, "v1.0", query.export_formats or export_formats, tessellation)
+    artifact = _indexed_artifact(key)
+    if artifact is None:
+        raise HttpError(404, f"No artifact for these parameters: {key}")
+    record_use(key)
+    artifact.refresh_from_db()
+    return serialize_artifact(artifact)
+
+
+@tile_router.get("/artifacts/")
+def list_tile_artifacts(request, tile_type: str = None, config_hash: str = None, fmt: str = None,
+                        limit: int = 50):
+    """
+    List indexed artifacts, most recently used first.
+    ``fmt`` keeps artifacts that include that export format.
+    """
+    from resources.models import TileArtifact
+
+    artifacts = TileArtifact.objects.prefetch_related("files")
+    if tile_type:
+        artifacts = artifacts.filter(tile_type=tile_type)
+    if config_hash:
+        artifacts = artifacts.filter(config_hash=config_hash)
+    if fmt:
+        artifacts = artifacts.filter(files__format=fmt)
+    limit = max(1, min(limit, 500))
+    return {"artifacts": [serialize_artifact(artifact) for artifact in artifacts[:limit]]}
+
+
+@tile_router.get("/artifacts/{cache_key}/")
+def get_tile_artifact(request, cache_key: str):
+    """
+    Return the indexed metadata of one artifact.
+    """
+    artifact = _indexed_artifact(cache_key) if CACHE_KEY_PATTERN.fullmatch(cache_key) else None
+    if artifact is None:
+        raise HttpError(404, f"Artifact not found: {cache_key}")
+    return serialize_artifact(artifact)
+
+
+@tile_router.get("/workers/")
+def get_worker_stats(request):
+    """
+    Report utilization of the warm tile worker pool and the load of the request offload executor.
+    """
+    return {"workers": worker_stats(get_job_database_path()), "offload": offload_stats()}
+
+
+@tile_router.get("/metrics/")
+def get_metrics(request):
+    """
+    Expose stage timings and pipeline counters in Prometheus text format.
+    """
+    cache = cache_stats()
+    prototypes = prototype_cache_stats()
+    extra = {
+        "tile_cache_hits": cache["hits"],
+        "tile_cache_misses": cache["misses"],
+        "tile_cache_coalesced": cache["coalesced"],
+        "tile_cache_evictions": cache["evictions"],
+        "prototype_cache_hits": prototypes["hits"],
+        "prototype_cache_misses": prototypes["misses"],
+        "offload_completed": offload_stats()["completed"],
+    }
+    return HttpResponse(prometheus_text(extra), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@tile_router.get("/cache/stats/")
+def get_cache_stats(request):
+    """
+    Report tile cache, brick prototype and build graph hit/miss counters for this process.
+    """
+    from resources.helpers.build_graph import get_build_graph
 
-    return {"message": f"{tile_type.capitalize()} tile generated successfully."}
+    return {**cache_stats(), "prototypes": prototype_cache_stats(), "build_graph": get_build_graph().stats()}
@@ -1,52 +1,297 @@
-import yaml
+"""
+yaml_config.py - Handles loading, validating and caching tile configurations.
+
+This is the single config service. YAML files are parsed once and re-read
+only when their mtime/size changes and their content hash differs. Each tile
+type has a pydantic schema whose validator is compiled once, when the class is
+defined, and every load returns an immutable, normalized ``TileConfig``.
+
+A config may inherit from another file with ``extends: <path>`` (relative to
+the file itself); its own keys override the parent's, nested mappings are
+merged key by key.
+"""
+
+import hashlib
+import json
 import os
+import threading
+from collections.abc import Mapping
+from typing import Literal, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from resources.helpers.brick_layout import SUPPORTED_BOND_PATTERNS
+from resources.helpers.instrumentation import span
+from resources.helpers.tessellation import TESSELLATION_PRESETS
+
+EXTENDS_KEY = "extends"
+
+TILE_TYPE_ALIASES = {
+    "brick_tile": "bricks",
+    "plain_tracks": "plain_track",
+}
+
+ExportFormats = Tuple[Literal["step", "stl", "glb", "3mf", "png"], ...]
 
-def load_config(config_path: str) -> dict:
+
+class TileConfig(BaseModel):
     """
-    Load configuration from a YAML file.
-    :param config_path: Path to the YAML configuration file.
-    :return: Dictionary containing the configuration.
-    """
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Configuration file not found: {config_path}")
-    
-    with open(config_path, "r") as file:
-        config = yaml.safe_load(file)
-
-    # Ensure tile_type exists
-    if "tile_type" not in config:
-        raise ValueError(f"Missing 'tile_type' key in {config_path}")
-
-    return config
-
-
-def validate_config(config: dict, tile_type: str):
-    """
-    Validate the loaded configuration for required keys based on the tile type.
-    :param config: Dictionary containing the configuration.
-    :param tile_type: The type of tile (e.g., "bricks", "plain_track").
-    :raises ValueError: If a required key is missing.
-    """
-    required_keys = {
-        "bricks": [
-            "brick_length", "brick_width", "brick_height",
-            "mortar_chamfer",
-            "row_repetition", "tile_width", "export_formats",
-        ],
-        "plain_track": [
-            "track_length", "track_width", "track_height",
-            "spacing",
-            "export_formats",
-        ],
-    }
+    Immutable configuration shared by every tile type.
+    Behaves like a read-only mapping (``config["key"]``, ``config.get``,
+    ``dict(config)``) and is hashable, so it can key downstream caches.
+    """
+
+    model_config = ConfigDict(frozen=True, extra="allow", str_strip_whitespace=True)
+
+    tile_type: str
+    export_formats: ExportFormats = ("step", "stl")
+    stl_quality: Literal[tuple(TESSELLATION_PRESETS)] = "print"
+    stl_max_triangles: Optional[int] = Field(default=None, gt=0)
+    stl_max_bytes: Optional[int] = Field(default=None, gt=0)
+    mesh_quantize: bool = False
+    lod: int = Field(default=0, ge=0, le=2)  # 0 full, 1 plain boxes, 2 slab (see helpers/lod.py)
+    fuse_solids: bool = False
+    fuse_tolerance: float = Field(default=0.001, gt=0)
+
+    def keys(self):
+        return [*self.__class__.model_fields, *(self.__pydantic_extra__ or {})]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return key in self.keys()
 
-    keys = required_keys.get(tile_type)
-    if not keys:
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    @property
+    def fingerprint(self) -> str:
+        """Canonical hash of the normalized configuration."""
+        canonical = json.dumps(dict(self), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def with_overrides(self, **overrides) -> "TileConfig":
+        """Return a new, re-validated config with some keys replaced."""
+        return build_config({**dict(self), **overrides})
+
+
+Mapping.register(TileConfig)
+
+
+class BrickTileConfig(TileConfig):
+    tile_type: Literal["bricks"]
+    brick_length: float = Field(gt=0)
+    brick_width: float = Field(gt=0)
+    brick_height: float = Field(gt=0)
+    mortar_chamfer: float = Field(ge=0)
+    offset_x: float = 0.0
+    offset_y: float = 0.0
+    offset_z: float = 0.0
+    row_repetition: int = Field(ge=1)
+    tile_width: int = Field(ge=1)
+    bond_pattern: Literal[SUPPORTED_BOND_PATTERNS] = "flemish"
+    mesh_engine: Literal["auto", "occ"] = "auto"
+
+
+class TrackTileConfig(TileConfig):
+    tile_type: Literal["plain_track"]
+    track_length: float = Field(gt=0)  # along the rails
+    track_width: float = Field(gt=0)  # sleeper length across the track
+    track_height: float = Field(gt=0)  # sleeper depth
+    spacing: float = Field(gt=0)  # sleeper pitch
+    sleeper_width: float = Field(default=250.0, gt=0)
+    gauge: float = Field(default=1435.0, gt=0)
+    chair_length: float = Field(default=180.0, gt=0)
+    chair_width: float = Field(default=300.0, gt=0)
+    chair_height: float = Field(default=30.0, gt=0)
+    rail_height: float = Field(default=172.0, gt=0)
+    rail_head_width: float = Field(default=72.0, gt=0)
+    rail_head_height: float = Field(default=50.0, gt=0)
+    rail_foot_width: float = Field(default=150.0, gt=0)
+    rail_foot_thickness: float = Field(default=20.0, gt=0)
+    rail_web_thickness: float = Field(default=17.0, gt=0)
+
+
+CONFIG_SCHEMAS = {
+    "bricks": BrickTileConfig,
+    "plain_track": TrackTileConfig,
+}
+
+_lock = threading.Lock()
+_files = {}  # absolute path -> (mtime_ns, size, sha256, raw mapping)
+_configs = {}  # ((path, sha256), ...) -> TileConfig
+_stats = {"parses": 0, "hits": 0}
+
+
+def normalize_tile_type(tile_type: str) -> str:
+    """Map aliases such as ``brick_tile`` onto their schema name."""
+    return TILE_TYPE_ALIASES.get(tile_type, tile_type)
+
+
+def get_schema(tile_type: str):
+    """
+    Return the schema class for a tile type.
+    :raises ValueError: If the tile type is not supported.
+    """
+    schema = CONFIG_SCHEMAS.get(normalize_tile_type(tile_type))
+    if schema is None:
         raise ValueError(f"Unsupported tile type: {tile_type}")
+    return schema
+
+
+def build_config(raw, source: str = "configuration") -> TileConfig:
+    """
+    Validate a raw mapping against the schema of its ``tile_type``.
+    :param raw: Mapping with at least a ``tile_type`` key.
+    :param source: Name used in error messages.
+    :return: Immutable ``TileConfig``.
+    :raises ValueError: If the tile type is missing/unsupported or a value is invalid.
+    """
+    if not isinstance(raw, Mapping) or "tile_type" not in raw:
+        raise ValueError(f"Missing 'tile_type' key in {source}")
+    raw = {**raw, "tile_type": normalize_tile_type(raw["tile_type"])}
+    schema = get_schema(raw["tile_type"])
+    try:
+        return schema.model_validate(raw)
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+        raise ValueError(f"Invalid configuration in {source}: {problems}")
+
+
+def _read_yaml(path: str):
+    """Return ``(sha256, raw)`` for a YAML file, re-parsing only when its content changed."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Configuration file not found: {path}")
+
+    cached = _files.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2], cached[3]
+
+    with open(path, "rb") as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached and cached[2] == digest:
+        # Touched but unchanged: keep the parsed mapping
+        raw = cached[3]
+    else:
+        raw = yaml.safe_load(content) or {}
+        _stats["parses"] += 1
+        if not isinstance(raw, Mapping):
+            raise ValueError(f"Configuration in {path} must be a mapping")
+    _files[path] = (stat.st_mtime_ns, stat.st_size, digest, raw)
+    return digest, raw
+
+
+def _merge(base: dict, overrides: dict) -> dict:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _resolve(path: str, seen=()):
+    """Return ``(chain, raw)`` where chain lists ``(path, sha256)`` from the root parent down."""
+    if path in seen:
+        raise ValueError(f"Circular 'extends' in configuration: {' -> '.join((*seen, path))}")
+    digest, raw = _read_yaml(path)
+    parent = raw.get(EXTENDS_KEY)
+    if not parent:
+        return ((path, digest),), raw
+
+    parent_path = os.path.abspath(os.path.join(os.path.dirname(path), parent))
+    parent_chain, parent_raw = _resolve(parent_path, (*seen, path))
+    own = {key: value for key, value in raw.items() if key != EXTENDS_KEY}
+    return (*parent_chain, (path, digest)), _merge(parent_raw, own)
+
+
+def load_config(config_path: str) -> TileConfig:
+    """
+    Load, resolve and validate a configuration from a YAML file.
+    :param config_path: Path to the YAML configuration file.
+    :return: Immutable ``TileConfig`` (cached until the file or a parent changes).
+    :raises FileNotFoundError: If the file (or a parent) does not exist.
+    :raises ValueError: If the configuration is invalid.
+    """
+    path = os.path.abspath(config_path)
+    with span("config.load"), _lock:
+        chain, raw = _resolve(path)
+        config = _configs.get(chain)
+        if config is not None:
+            _stats["hits"] += 1
+            return config
+        config = build_config(raw, source=config_path)
+        _configs[chain] = config
+        return config
+
+
+def validate_config(config, tile_type: str = None) -> TileConfig:
+    """
+    Validate a configuration against the schema of a tile type.
+    :param config: Mapping or ``TileConfig``.
+    :param tile_type: Expected tile type (e.g., "bricks", "plain_track"); defaults to the config's.
+    :return: The validated ``TileConfig``.
+    :raises ValueError: If the tile type is unsupported or a required key is missing or invalid.
+    """
+    if tile_type is None:
+        return config if isinstance(config, TileConfig) else build_config(config)
+
+    schema = get_schema(tile_type)
+    declared = normalize_tile_type(config.get("tile_type", tile_type))
+    if declared != normalize_tile_type(tile_type):
+        raise ValueError(f"Configuration is for '{config['tile_type']}', expected '{tile_type}'")
+    if isinstance(config, schema):
+        return config
+    return build_config({**config, "tile_type": declared})
+
+
+def config_cache_stats() -> dict:
+    """Return parse/hit counters of the config cache."""
+    with _lock:
+        return {**_stats, "files": len(_files), "configs": len(_configs)}
+
+
+def clear_config_cache():
+    """Drop every cached file and config (mainly for tests)."""
+    with _lock:
+        _files.clear()
+        _configs.clear()
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def list_supported_tile_types() -> list:
+    """
+    Return a list of supported tile types for validation.
+    :return: List of supported tile types.
+    """
+    return list(CONFIG_SCHEMAS)
 
-    for key in keys:
-        if key not in config:
-            raise ValueError(f"Missing required configuration key: {key}")
 
 def get_default_config_path(tile_type: str) -> str:
     """
@@ -56,22 +301,23 @@ def get_default_config_path(tile_type: str) -> str:
     """
     base_dir = "resources/configs"
     file_paths = {
-        "brick_tile": os.path.join(base_dir, "bricks/brick_tile.yaml"),  # Ensure correct naming
+        "bricks": os.path.join(base_dir, "bricks/brick_tile.yaml"),
         "plain_track": os.path.join(base_dir, "tracks/plain_track.yaml"),
     }
 
-    # Convert aliases (e.g., "bricks" → "brick_tile")
-    tile_type_mappings = {
-        "bricks": "brick_tile",  # Normalize to match the correct YAML file
-        "plain_tracks": "plain_track",
-    }
-
-    # Convert if necessary
-    normalized_type = tile_type_mappings.get(tile_type, tile_type)
-
+    normalized_type = normalize_tile_type(tile_type)
     if normalized_type not in file_paths:
         raise ValueError(f"Unsupported tile type: {tile_type}")
 
-    # Debugging: Print the resolved path
-    print(f"Resolved config path: {file_paths[normalized_type]}")
-    return file_paths[normalized_type]
\ No newline at end of file
+    return file_paths[normalized_type]
+
+
+def config_path_for(tile_type: str) -> str:
+    """
+    Resolve a tile name to its YAML file: non-brick tile types (e.g. ``plain_track``)
+    use their default configuration, anything else names a file in ``configs/bricks``.
+    """
+    normalized = normalize_tile_type(tile_type)
+    if normalized != "bricks" and normalized in list_supported_tile_types():
+        return get_default_config_path(normalized)
+    return f"resources/configs/bricks/{tile_type}.yaml"
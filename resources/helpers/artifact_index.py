@@ -0,0 +1,178 @@
+"""
+artifact_index.py - Handles the database index of generated tile artifacts.
+
+Every tile cache entry is mirrored as a ``TileArtifact`` row (config hash,
+tile type, formats, bounding box, triangle count, sizes, generation time and
+code version), so clients can find an existing artifact by its parameters
+with one indexed lookup. Each cache hit bumps the row's usage counters, which
+rank entries for eviction.
+
+The index is best effort: the files on disk stay the source of truth and
+database errors never fail a generate request. Set ``TILE_ARTIFACT_INDEX =
+False`` to turn it off.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# SQLite allows at most 999 parameters per query.
+_QUERY_CHUNK = 500
+
+
+def index_enabled() -> bool:
+    """Return True if artifacts should be recorded in the database."""
+    return getattr(settings, "TILE_ARTIFACT_INDEX", True)
+
+
+def config_hash(config) -> str:
+    """Canonical hash of a resolved configuration (the ``TileConfig`` fingerprint)."""
+    canonical = json.dumps(dict(config), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def format_list(formats) -> str:
+    """Return the canonical, sorted form of a list of formats."""
+    return ",".join(sorted(formats))
+
+
+def _union_bounds(exports: dict):
+    boxes = [entry["bounds"] for entry in exports.values() if entry.get("bounds")]
+    if not boxes:
+        return None
+    return {
+        "min": [min(box["min"][axis] for box in boxes) for axis in range(3)],
+        "max": [max(box["max"][axis] for box in boxes) for axis in range(3)],
+    }
+
+
+def _warn(action: str, error: Exception):
+    print(f"❌ Artifact index {action} failed: {error}")
+
+
+def record_artifact(manifest: dict, config):
+    """
+    Insert or replace the index row of a tile cache entry.
+    :param manifest: Tile cache manifest (see ``tile_cache.get_or_generate_tile``).
+    :param config: Resolved configuration the entry was generated from.
+    :return: The ``TileArtifact``, or ``None`` if the index is off or unavailable.
+    """
+    if not index_enabled():
+        return None
+    from resources.models import ArtifactFile, TileArtifact
+
+    exports = manifest.get("exports", {})
+    try:
+        with transaction.atomic():
+            artifact, _ = TileArtifact.objects.update_or_create(
+                cache_key=manifest["key"],
+                defaults={
+                    "config_hash": config_hash(config),
+                    "tile_type": manifest["tile_type"],
+                    "version": manifest["version"],
+                    "formats": format_list(manifest["formats"]),
+                    "code_version": manifest["geometry_version"],
+                    "config": json.loads(json.dumps(dict(config), default=str)),
+                    "bounding_box": _union_bounds(exports),
+                    "triangle_count": exports.get("stl", {}).get("triangles"),
+                    "total_bytes": sum(entry.get("bytes", 0) for entry in exports.values()),
+                    "generation_seconds": manifest.get("generation_seconds", 0.0),
+                    "last_used_at": timezone.now(),
+                },
+            )
+            artifact.files.all().delete()
+            ArtifactFile.objects.bulk_create([
+                ArtifactFile(
+                    artifact=artifact,
+                    format=fmt,
+                    file_name=file_name,
+                    bytes=exports.get(fmt, {}).get("bytes", 0),
+                    sha256=exports.get(fmt, {}).get("sha256", ""),
+                    triangles=exports.get(fmt, {}).get("triangles"),
+                    seconds=exports.get(fmt, {}).get("seconds", 0.0),
+                )
+                for fmt, file_name in manifest["files"].items()
+            ])
+    except DatabaseError as e:
+        _warn("update", e)
+        return None
+    return artifact
+
+
+def record_use(cache_key: str, manifest: dict = None, config=None) -> bool:
+    """
+    Count one use of an artifact.
+    Entries generated before the index existed are recorded from ``manifest``.
+    :return: True if the use was recorded.
+    """
+    if not index_enabled():
+        return False
+    from resources.models import TileArtifact
+
+    try:
+        updated = TileArtifact.objects.filter(cache_key=cache_key).update(
+            use_count=F("use_count") + 1, last_used_at=timezone.now()
+        )
+    except DatabaseError as e:
+        _warn("update", e)
+        return False
+    if not updated and manifest is not None and config is not None:
+        return record_artifact(manifest, config) is not None
+    return bool(updated)
+
+
+def find_artifact(cache_key: str):
+    """Return the ``TileArtifact`` for a cache key with its files, or ``None``."""
+    if not index_enabled():
+        return None
+    from resources.models import TileArtifact
+
+    try:
+        return TileArtifact.objects.prefetch_related("files").filter(cache_key=cache_key).first()
+    except DatabaseError as e:
+        _warn("lookup", e)
+        return None
+
+
+def usage_counts(cache_keys) -> dict:
+    """Return ``{cache_key: use_count}`` for the indexed keys among ``cache_keys``."""
+    if not index_enabled():
+        return {}
+    from resources.models import TileArtifact
+
+    cache_keys = list(cache_keys)
+    counts = {}
+    try:
+        for start in range(0, len(cache_keys), _QUERY_CHUNK):
+            chunk = cache_keys[start:start + _QUERY_CHUNK]
+            counts.update(
+                TileArtifact.objects.filter(cache_key__in=chunk).values_list("cache_key", "use_count")
+            )
+    except DatabaseError as e:
+        _warn("lookup", e)
+        return {}
+    return counts
+
+
+def forget_artifacts(cache_keys) -> int:
+    """
+    Delete the index rows of evicted cache entries.
+    :return: Number of deleted artifacts.
+    """
+    if not index_enabled():
+        return 0
+    from resources.models import TileArtifact
+
+    cache_keys = list(cache_keys)
+    deleted = 0
+    try:
+        for start in range(0, len(cache_keys), _QUERY_CHUNK):
+            chunk = cache_keys[start:start + _QUERY_CHUNK]
+            deleted += TileArtifact.objects.filter(cache_key__in=chunk).delete()[1].get("resources.TileArtifact", 0)
+    except DatabaseError as e:
+        _warn("update", e)
+    return deleted
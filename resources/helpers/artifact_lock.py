@@ -0,0 +1,117 @@
+"""
+artifact_lock.py - Handles single-flight locking of artifact builds.
+
+``artifact_lock(key)`` takes an exclusive OS file lock (``fcntl.flock`` on
+POSIX, ``msvcrt.locking`` on Windows) on ``MEDIA_ROOT/resources/tiles/locks/
+<key>.lock``. It coordinates threads and every process sharing MEDIA_ROOT
+(e.g. several gunicorn workers): the first caller builds the artifact, the
+rest wait and then reuse its result. Callers look the artifact up again once
+they hold the lock, whether or not they waited: a build may have finished
+between their first lookup and the acquire. Locks are released by the OS if
+the holder dies.
+
+On POSIX the lock file is removed on release; callers re-check that the file
+they locked is still the one on disk, so a lock never outlives its file.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from resources.helpers.instrumentation import count, span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TIMEOUT = 600.0  # seconds
+POLL_INTERVAL = 0.05  # seconds
+
+
+def get_lock_root() -> str:
+    """Return the directory that holds the artifact lock files."""
+    return os.path.join(settings.MEDIA_ROOT, "resources", "tiles", "locks")
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _is_current(fd: int, lock_path: str) -> bool:
+    """True if ``fd`` still refers to the file at ``lock_path`` (not one removed by a release)."""
+    try:
+        on_disk = os.stat(lock_path)
+    except FileNotFoundError:
+        return False
+    held = os.fstat(fd)
+    return (held.st_dev, held.st_ino) == (on_disk.st_dev, on_disk.st_ino)
+
+
+@contextmanager
+def artifact_lock(key: str, timeout: float = None):
+    """
+    Hold the build lock of one artifact.
+    :param key: Artifact key (e.g. a tile cache key).
+    :param timeout: Seconds to wait for another holder (defaults to
+                    ``settings.TILE_LOCK_TIMEOUT``).
+    :return: Context manager yielding True if the caller had to wait for
+             another holder. It does not tell whether the artifact exists:
+             re-check it after acquiring either way.
+    :raises RuntimeError: If the lock is not acquired within ``timeout``.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "TILE_LOCK_TIMEOUT", DEFAULT_TIMEOUT)
+    lock_root = get_lock_root()
+    os.makedirs(lock_root, exist_ok=True)
+    lock_path = os.path.join(lock_root, f"{key}.lock")
+
+    deadline = time.monotonic() + timeout
+    waited = False
+    with span("lock.wait"):
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            if _try_lock(fd):
+                if fcntl is None or _is_current(fd, lock_path):
+                    break
+                # The previous holder removed this file on release; lock the new one
+                _unlock(fd)
+                os.close(fd)
+                continue
+            os.close(fd)
+            waited = True
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"❌ Timed out after {timeout}s waiting for the build lock of {key}")
+            time.sleep(POLL_INTERVAL)
+    if waited:
+        count("lock_waits")
+
+    try:
+        yield waited
+    finally:
+        if fcntl is not None:
+            # Removed while still locked, so waiters notice and re-create it
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+        _unlock(fd)
+        os.close(fd)
@@ -0,0 +1,193 @@
+"""
+batch.py - Handles batch / parameter-sweep tile generation.
+
+A sweep expands a base configuration into the cartesian product of the swept
+values. Variants that resolve to the same artifacts are generated once, and
+the rest run across a process pool whose workers keep their brick prototype
+registry between variants. Results are yielded as each variant finishes.
+
+The CLI starts a pool per run. The API shares one pool of
+``TILE_BATCH_WORKERS`` processes between all batch requests, so concurrent
+sweeps queue for the same workers instead of each forking a pool.
+"""
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from resources.configs.yaml_config import TileConfig
+from resources.helpers.tile_cache import artifact_key, get_or_generate_tile
+
+
+def expand_sweep(base_config, sweep: dict) -> list:
+    """
+    Expand a sweep specification into variant configurations.
+    :param base_config: Configuration shared by every variant.
+    :param sweep: Mapping of configuration key to the list of values to try.
+    :return: List of ``(params, config)`` tuples in a deterministic order.
+             Validated base configs yield validated variants.
+    :raises ValueError: If a sweep entry is not a non-empty list or a variant is invalid.
+    """
+    for key, values in sweep.items():
+        if not isinstance(values, (list, tuple)) or not values:
+            raise ValueError(f"Sweep values for '{key}' must be a non-empty list")
+
+    keys = sorted(sweep)
+    variants = []
+    for combination in itertools.product(*(sweep[key] for key in keys)):
+        params = dict(zip(keys, combination))
+        if isinstance(base_config, TileConfig):
+            config = base_config.with_overrides(**params)
+        else:
+            config = {**dict(base_config), **params}
+        variants.append((params, config))
+    return variants
+
+
+def dedupe_variants(variants: list, tile_type: str, version: str, export_formats=None) -> dict:
+    """
+    Group variants that produce identical artifacts.
+    :return: Ordered mapping of cache key to the indices of its variants.
+    """
+    groups = {}
+    for index, (_params, config) in enumerate(variants):
+        formats = export_formats or config.get("export_formats", ["step", "stl"])
+        key = artifact_key(config, tile_type, version, formats)
+        groups.setdefault(key, []).append(index)
+    return groups
+
+
+def _init_batch_worker(settings_overrides: dict, base_config):
+    """Apply settings overrides and prime the prototypes shared by the batch."""
+    from django.conf import settings as worker_settings
+
+    for name, value in settings_overrides.items():
+        setattr(worker_settings, name, value)
+
+    if base_config.get("tile_type") == "bricks":
+        from resources.helpers.brick_geometry import get_brick_prototype
+
+        for kind in ("full", "half"):
+            try:
+                get_brick_prototype(base_config, kind)
+            except (KeyError, ValueError):
+                return
+
+
+def generate_variant(config, tile_type: str, version: str, export_formats=None) -> dict:
+    """
+    Generate (or fetch from the cache) a single variant.
+    Errors are returned in the result instead of being raised.
+    """
+    started = time.perf_counter()
+    try:
+        manifest, cached = get_or_generate_tile(
+            config, tile_type=tile_type, version=version, export_formats=export_formats
+        )
+    except Exception as e:
+        return {"status": "failed", "error": str(e), "seconds": round(time.perf_counter() - started, 4)}
+    return {
+        "status": "succeeded",
+        "cache_key": manifest["key"],
+        "cached": cached,
+        "files": manifest["paths"],
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def _generate_in_worker(settings_overrides: dict, config, tile_type: str, version: str, export_formats=None) -> dict:
+    """Run one variant in a shared pool worker, under the caller's settings."""
+    from django.conf import settings as worker_settings
+
+    for name, value in settings_overrides.items():
+        setattr(worker_settings, name, value)
+    return generate_variant(config, tile_type, version, export_formats)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor() -> ProcessPoolExecutor:
+    """Return the lazily created process pool shared by API batch requests."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, "TILE_BATCH_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def shutdown_batch_executor(wait: bool = True):
+    """Stop the shared batch pool (it is recreated on the next batch)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def run_batch(base_config, sweep: dict, tile_type: str, version: str = "v1.0", export_formats=None,
+              max_workers: int = None, executor: ProcessPoolExecutor = None):
+    """
+    Generate every variant of a sweep, yielding results as they finish.
+    :param base_config: Configuration shared by every variant.
+    :param sweep: Mapping of configuration key to the list of values to try.
+    :param tile_type: Name used for the exported files.
+    :param version: Version label used for the exported files.
+    :param export_formats: Formats to export (defaults to each variant's list).
+    :param max_workers: Worker processes to use; defaults to all cores, ``0`` runs in-process.
+    :param executor: Existing pool to run on (e.g. ``get_batch_executor()``); ``max_workers`` is then ignored.
+    :return: Generator of result dictionaries, one per variant, each with its
+             ``index``, swept ``params`` and, for duplicates, ``duplicate_of``.
+    """
+    variants = expand_sweep(base_config, sweep)
+    groups = dedupe_variants(variants, tile_type, version, export_formats)
+
+    def results_for(indices, result):
+        for position, index in enumerate(indices):
+            entry = {"index": index, "params": variants[index][0], "total": len(variants), **result}
+            if position:
+                entry["duplicate_of"] = indices[0]
+            yield entry
+
+    def run_on(pool, worker_settings):
+        futures = {
+            pool.submit(
+                _generate_in_worker, worker_settings, variants[indices[0]][1], tile_type, version, export_formats
+            ): indices
+            for indices in groups.values()
+        }
+        try:
+            for future in as_completed(futures):
+                yield from results_for(futures[future], future.result())
+        finally:
+            # A consumer that stops early frees the shared pool for other batches
+            for future in futures:
+                future.cancel()
+
+    worker_settings = {"MEDIA_ROOT": settings.MEDIA_ROOT}
+    if executor is not None:
+        yield from run_on(executor, worker_settings)
+        return
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(groups))
+
+    if max_workers <= 0:
+        for indices in groups.values():
+            config = variants[indices[0]][1]
+            yield from results_for(indices, generate_variant(config, tile_type, version, export_formats))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_batch_worker,
+        initargs=(worker_settings, dict(base_config)),
+    ) as pool:
+        yield from run_on(pool, worker_settings)
@@ -0,0 +1,359 @@
+"""
+benchmarks.py - Handles benchmarking of the tile generation pipeline.
+
+Every stage (brick constructors, row and tile assembly, STEP/STL export, the
+mesh engine and solid fusion) is timed across size sweeps and bond patterns; track stages
+are timed across sleeper counts. Each case
+runs in a forked child process so its peak RSS is measured in isolation.
+Results are written as JSON and can be compared against a stored baseline;
+``compare_results`` lists every metric that regressed beyond its tolerance.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+from resources.helpers.worker_pool import current_rss_bytes
+
+BENCHMARK_VERSION = 1
+
+FULL_SIZES = ((4, 4), (8, 8), (16, 16))
+QUICK_SIZES = ((2, 2), (4, 4))
+BOND_PATTERNS = ("flemish", "stretcher", "stack")
+FULL_SLEEPER_COUNTS = (25, 100, 200)
+QUICK_SLEEPER_COUNTS = (10, 25)
+
+BASE_CONFIG = {
+    "tile_type": "bricks",
+    "brick_length": 250,
+    "brick_width": 120,
+    "brick_height": 60,
+    "mortar_chamfer": 5,
+}
+
+TRACK_CONFIG = {
+    "tile_type": "plain_track",
+    "track_width": 2600,
+    "track_height": 130,
+    "spacing": 700,
+    "sleeper_width": 250,
+    "gauge": 1435,
+    "chair_length": 180,
+    "chair_width": 300,
+    "chair_height": 30,
+    "rail_height": 172,
+    "rail_head_width": 72,
+    "rail_head_height": 50,
+    "rail_foot_width": 150,
+    "rail_foot_thickness": 20,
+    "rail_web_thickness": 17,
+}
+
+# Relative slow-down allowed per metric before a case counts as a regression,
+# and an absolute floor below which differences are treated as noise.
+DEFAULT_TOLERANCES = {
+    "seconds": (0.25, 0.005),
+    "peak_rss_bytes": (0.20, 16 * 1024 * 1024),
+    "output_bytes": (0.05, 0),
+}
+
+
+def peak_rss_bytes():
+    """Return this process's peak resident set size, or ``None`` if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return current_rss_bytes()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _stage_constructors(config, output_dir):
+    from resources.helpers.brick_geometry import create_full_brick, create_half_brick
+
+    def run():
+        create_full_brick(config)
+        create_half_brick(config)
+    return run
+
+
+def _stage_brick_row(config, output_dir):
+    from resources.helpers.brick_geometry import clear_prototype_cache
+    from resources.helpers.brick_helpers import assemble_brick_row
+
+    def run():
+        clear_prototype_cache()
+        assemble_brick_row(config, 0)
+        assemble_brick_row(config, 1)
+    return run
+
+
+def _stage_assemble_tile(config, output_dir):
+    from resources.helpers.brick_geometry import clear_prototype_cache
+    from resources.helpers.tile_assembly import assemble_tile
+
+    def run():
+        clear_prototype_cache()
+        assemble_tile(config)
+    return run
+
+
+def _stage_assemble_track(config, output_dir):
+    from resources.helpers.brick_geometry import clear_prototype_cache
+    from resources.helpers.tile_assembly import assemble_tile
+
+    def run():
+        clear_prototype_cache()
+        assemble_tile(config)
+    return run
+
+
+def _stage_fuse_tile(config, output_dir):
+    from resources.helpers.brick_geometry import clear_prototype_cache
+    from resources.helpers.fusion import fuse_tile
+    from resources.helpers.tile_assembly import assemble_tile
+
+    tile = assemble_tile(config)
+
+    def run():
+        clear_prototype_cache()
+        fuse_tile(config, tile=tile)
+    return run
+
+
+def _export_stage(fmt, fused=False):
+    def stage(config, output_dir):
+        from resources.helpers.file_helper import export_tile
+        from resources.helpers.fusion import fuse_tile
+        from resources.helpers.tile_assembly import assemble_tile
+
+        tile = assemble_tile(config)
+        compound = None
+        if fused:
+            tile = compound = fuse_tile(config, tile=tile)
+
+        def run():
+            manifest = export_tile(tile, version="bench", tile_type="bench", export_formats=[fmt],
+                                   output_dir=output_dir, compound=compound)
+            return manifest["files"][fmt]["bytes"]
+        return run
+    return stage
+
+
+def _stage_mesh_engine(config, output_dir):
+    from resources.helpers.mesh_engine import export_tile_mesh
+
+    def run():
+        manifest = export_tile_mesh(config, version="bench", tile_type="bench", output_dir=output_dir)
+        return manifest["files"]["stl"]["bytes"]
+    return run
+
+
+# Each stage builds its untimed inputs and returns the callable to time.
+STAGES = {
+    "brick_constructors": _stage_constructors,
+    "assemble_brick_row": _stage_brick_row,
+    "assemble_tile": _stage_assemble_tile,
+    "export_step": _export_stage("step"),
+    "export_stl": _export_stage("stl"),
+    "mesh_engine_stl": _stage_mesh_engine,
+    "fuse_tile": _stage_fuse_tile,
+    "export_fused_stl": _export_stage("stl", fused=True),
+    "assemble_track": _stage_assemble_track,
+    "export_track_stl": _export_stage("stl"),
+}
+
+# Stages that run on track tiles, swept by sleeper count instead of size and bond pattern.
+TRACK_STAGES = ("assemble_track", "export_track_stl")
+
+# Stages whose cost does not depend on the tile size are only run once per pattern.
+SIZE_INDEPENDENT_STAGES = ("brick_constructors", "assemble_brick_row")
+
+
+def benchmark_cases(stages=None, sizes=FULL_SIZES, bond_patterns=BOND_PATTERNS,
+                    sleeper_counts=FULL_SLEEPER_COUNTS) -> list:
+    """
+    Expand stages, sizes and bond patterns (or sleeper counts) into benchmark cases.
+    :return: List of ``(name, stage, config)`` tuples.
+    """
+    cases = []
+    for stage in stages or STAGES:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown benchmark stage: {stage}")
+        if stage in TRACK_STAGES:
+            for sleepers in sleeper_counts:
+                config = {**TRACK_CONFIG, "track_length": sleepers * TRACK_CONFIG["spacing"]}
+                cases.append((f"{stage}[{sleepers}-sleepers]", stage, config))
+            continue
+        for bond_pattern in bond_patterns:
+            stage_sizes = sizes[:1] if stage in SIZE_INDEPENDENT_STAGES else sizes
+            for rows, width in stage_sizes:
+                config = {**BASE_CONFIG, "bond_pattern": bond_pattern, "row_repetition": rows, "tile_width": width}
+                cases.append((f"{stage}[{bond_pattern}-{rows}x{width}]", stage, config))
+    return cases
+
+
+def measure(stage: str, config, repeat: int = 3, warmup: int = 1) -> dict:
+    """
+    Time one stage in the current process.
+    :return: Dictionary with median/min seconds, peak RSS and output size.
+    """
+    # Exporters report every file they write; keep that out of the benchmark output
+    with tempfile.TemporaryDirectory() as output_dir, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        rss_before = current_rss_bytes()
+        run = STAGES[stage](config, output_dir)
+        for _ in range(warmup):
+            run()
+
+        timings = []
+        output_bytes = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output_bytes = run()
+            timings.append(time.perf_counter() - started)
+
+    peak = peak_rss_bytes()
+    return {
+        "seconds": round(statistics.median(timings), 6),
+        "min_seconds": round(min(timings), 6),
+        "repeat": repeat,
+        "peak_rss_bytes": peak,
+        "rss_growth_bytes": peak - rss_before if peak is not None and rss_before is not None else None,
+        "output_bytes": output_bytes,
+    }
+
+
+def _measure_in_child(connection, stage, config, repeat, warmup):
+    try:
+        connection.send(measure(stage, config, repeat=repeat, warmup=warmup))
+    except Exception:
+        connection.send({"error": traceback.format_exc()})
+    finally:
+        connection.close()
+
+
+def measure_isolated(stage: str, config, repeat: int = 3, warmup: int = 1) -> dict:
+    """
+    Run ``measure`` in a forked child so peak RSS covers only this case.
+    Falls back to measuring in-process where ``fork`` is unavailable.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure(stage, config, repeat=repeat, warmup=warmup)
+
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(sender, stage, config, repeat, warmup))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": f"Benchmark process exited with code {process.exitcode}"}
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"❌ Benchmark failed for {stage}: {result['error']}")
+    return result
+
+
+def run_suite(stages=None, sizes=FULL_SIZES, bond_patterns=BOND_PATTERNS, repeat: int = 3, warmup: int = 1,
+              isolate: bool = True, progress=None, sleeper_counts=FULL_SLEEPER_COUNTS) -> dict:
+    """
+    Run the benchmark suite.
+    :param stages: Stage names to run (defaults to all of ``STAGES``).
+    :param sizes: ``(row_repetition, tile_width)`` pairs to sweep.
+    :param bond_patterns: Bond patterns to sweep.
+    :param sleeper_counts: Sleepers per tile to sweep for the track stages.
+    :param repeat: Timed runs per case; the median is reported.
+    :param warmup: Untimed runs per case.
+    :param isolate: Run each case in its own forked process.
+    :param progress: Optional ``callback(name, result)`` called after each case.
+    :return: Results document with ``meta`` and one entry per case.
+    """
+    # Import CadQuery once in the parent so forked children start warm
+    import resources.helpers.tile_assembly  # noqa: F401
+
+    results = {}
+    for name, stage, config in benchmark_cases(stages, sizes, bond_patterns, sleeper_counts):
+        runner = measure_isolated if isolate else measure
+        if stage in TRACK_STAGES:
+            parameters = {"sleepers": int(config["track_length"] // config["spacing"])}
+        else:
+            parameters = {key: config[key] for key in ("bond_pattern", "row_repetition", "tile_width")}
+        result = {
+            "stage": stage,
+            **parameters,
+            **runner(stage, config, repeat=repeat, warmup=warmup),
+        }
+        results[name] = result
+        if progress is not None:
+            progress(name, result)
+
+    return {
+        "meta": {
+            "version": BENCHMARK_VERSION,
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "isolated": isolate,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: dict, baseline: dict, tolerances: dict = None) -> list:
+    """
+    Compare a results document against a baseline.
+    :param current: Output of ``run_suite``.
+    :param baseline: Previously saved output of ``run_suite``.
+    :param tolerances: Mapping of metric to ``(relative, absolute_floor)``.
+    :return: List of regressions, each with ``name``, ``metric``, ``baseline``,
+             ``current`` and ``ratio``. Cases missing from either side are skipped.
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        for metric, (relative, floor) in tolerances.items():
+            old, new = reference.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + relative) and new - old > floor:
+                regressions.append({
+                    "name": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "ratio": round(new / old, 3) if old else None,
+                })
+    return regressions
+
+
+def save_results(results: dict, path: str):
+    """Write a results document as JSON."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> dict:
+    """
+    Read a results document.
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Benchmark results not found: {path}")
+    with open(path, "r") as file:
+        return json.load(file)
@@ -2,22 +2,105 @@
 brick_geometry.py - Handles brick creation logic.
 """
 
-import cadquery as cq
+import threading
+from collections import OrderedDict
+
+from resources.helpers.instrumentation import count, span
+from resources.helpers.lod import FULL_LOD, lod_level
+
+# Upper bound on distinct prototype solids kept alive per process.
+PROTOTYPE_CACHE_SIZE = 64
+
+_prototype_cache = OrderedDict()
+_prototype_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_prototype_lock = threading.Lock()
+
+def brick_chamfer(config):
+    """Returns the mortar chamfer of a brick; below full detail bricks are plain boxes."""
+    return config["mortar_chamfer"] if lod_level(config) == FULL_LOD else 0
+
+def _create_brick(config, length):
+    # CadQuery/OCP take seconds to import; defer them to the first brick built
+    import cadquery as cq
+
+    brick = cq.Workplane("XY").box(length, config["brick_width"], config["brick_height"])
+    chamfer = brick_chamfer(config)
+    return brick.edges("|Z or |X").chamfer(chamfer) if chamfer > 0 else brick
 
 def create_full_brick(config):
     """Creates a full-sized brick with chamfered edges to simulate mortar."""
-    return (
-        cq.Workplane("XY")
-        .box(config["brick_length"], config["brick_width"], config["brick_height"])
-        .edges("|Z or |X")
-        .chamfer(config["mortar_chamfer"])
-    )
+    return _create_brick(config, config["brick_length"])
 
 def create_half_brick(config):
     """Creates a half-sized brick with chamfered edges to simulate mortar."""
+    return _create_brick(config, config["brick_length"] / 2)
+
+BRICK_BUILDERS = {
+    "full": create_full_brick,
+    "half": create_half_brick,
+}
+
+def prototype_key(config, kind):
+    """Returns the registry key identifying a brick prototype."""
     return (
-        cq.Workplane("XY")
-        .box(config["brick_length"] / 2, config["brick_width"], config["brick_height"])
-        .edges("|Z or |X")
-        .chamfer(config["mortar_chamfer"])
+        config["brick_length"],
+        config["brick_width"],
+        config["brick_height"],
+        brick_chamfer(config),
+        kind,
     )
+
+def get_brick_prototype(config, kind="full"):
+    """
+    Returns a shared, chamfered brick solid of the requested kind.
+    Each distinct (length, width, height, chamfer, kind) is built once per
+    process; callers place the returned shape by location and must not mutate it.
+    """
+    if kind not in BRICK_BUILDERS:
+        raise ValueError(f"Unsupported brick kind: {kind}")
+
+    return get_prototype(prototype_key(config, kind), lambda: BRICK_BUILDERS[kind](config))
+
+def get_prototype(key, builder):
+    """
+    Returns the shared solid registered under ``key``, calling ``builder()``
+    to create it on first use. Keys must be hashable and unique per shape.
+    """
+    with _prototype_lock:
+        prototype = _prototype_cache.get(key)
+        if prototype is not None:
+            _prototype_cache.move_to_end(key)
+            _prototype_stats["hits"] += 1
+            return prototype
+
+    # Build outside the lock; a concurrent miss at worst builds a duplicate.
+    with span("prototype.build"):
+        prototype = builder()
+    count("shapes_created")
+
+    with _prototype_lock:
+        _prototype_stats["misses"] += 1
+        prototype = _prototype_cache.setdefault(key, prototype)
+        _prototype_cache.move_to_end(key)
+        while len(_prototype_cache) > PROTOTYPE_CACHE_SIZE:
+            _prototype_cache.popitem(last=False)
+            _prototype_stats["evictions"] += 1
+
+    return prototype
+
+def prototype_cache_stats():
+    """Returns hit/miss counters and the current size of the prototype registry."""
+    with _prototype_lock:
+        stats = dict(_prototype_stats)
+        stats["size"] = len(_prototype_cache)
+    stats["max_size"] = PROTOTYPE_CACHE_SIZE
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+def clear_prototype_cache():
+    """Drops all cached prototypes and resets the counters."""
+    with _prototype_lock:
+        _prototype_cache.clear()
+        for counter in _prototype_stats:
+            _prototype_stats[counter] = 0
@@ -0,0 +1,63 @@
+"""
+brick_layout.py - Handles brick placement rules for each bond pattern.
+
+These rules are shared by the CadQuery assembly path and the NumPy mesh
+engine, so both produce bricks at exactly the same positions.
+"""
+
+SUPPORTED_BOND_PATTERNS = ("flemish", "stretcher", "stack")
+
+
+def row_layout_key(config, row_index):
+    """
+    Returns a key identifying the brick layout of a row.
+    Rows with equal keys are geometrically identical and can share one assembly.
+    """
+    bond_pattern = config.get("bond_pattern", "flemish")
+    if bond_pattern == "flemish":
+        return (bond_pattern, row_index % 2)
+    return (bond_pattern, 0)
+
+
+def brick_row_layout(config, row_index):
+    """
+    Returns the bricks of a single row as ``(kind, x_offset)`` pairs.
+    :param config: Brick tile configuration.
+    :param row_index: Index of the row within the tile.
+    :return: List of ``("full" | "half", x_offset)`` tuples.
+    """
+    bond_pattern = config.get("bond_pattern", "flemish")
+    tile_width = config["tile_width"]
+    brick_length = config["brick_length"]
+
+    # Determine row shift for proper alignment
+    row_x_offset = (-brick_length / 2) if row_index % 2 != 0 and bond_pattern == "flemish" else 0
+    x_offset = row_x_offset
+
+    layout = []
+    for j in range(tile_width):
+        if bond_pattern in ["flemish", "stretcher"]:
+            if j % 2 == 0:
+                layout.append(("full", x_offset))
+                x_offset += brick_length
+            else:
+                layout.append(("half", x_offset))
+                x_offset += brick_length / 2
+        elif bond_pattern == "stack":
+            layout.append(("full", x_offset))
+            x_offset += brick_length
+
+    return layout
+
+
+def brick_tile_placements(config):
+    """
+    Returns every brick of a tile as ``(kind, (x, y, z))`` placements.
+    :param config: Brick tile configuration.
+    """
+    placements = []
+    for i in range(config["row_repetition"]):
+        z_offset = i * config["brick_height"]
+        for kind, x_offset in brick_row_layout(config, i):
+            placements.append((kind, (x_offset, 0, z_offset)))
+    return placements
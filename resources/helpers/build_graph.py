@@ -0,0 +1,365 @@
+"""
+build_graph.py - Handles incremental, dependency-tracked tile regeneration.
+
+The pipeline is modelled as a graph of stages:
+
+    config -> prototypes -> rows -> tile -> compound -> per-format files
+
+Each node is keyed only by the configuration values it depends on, so a
+change invalidates just the nodes downstream of it:
+
+* rows depend on the brick dimensions, bond pattern, tile width and row layout,
+  so adding rows reuses every existing row assembly;
+* the tile and compound additionally depend on ``row_repetition`` (and any
+  other geometric key);
+* each exported file depends on the geometry, its format, whether the tile is
+  fused and, for mesh formats, the tessellation options, but not on which other
+  formats were requested, so changing ``export_formats`` only writes the
+  formats that are new.
+
+Fused tiles (``fuse_solids``) add fused-row and fused-tile nodes, so the
+boolean fusion runs once per geometry and tolerance.
+
+Rows, tiles, compounds and fused shapes are memoized in-process. Exported files are kept in
+a content-addressed artifact store on disk and hard-linked into new cache
+entries.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from resources.helpers.brick_helpers import assemble_brick_row
+from resources.helpers.brick_layout import row_layout_key
+from resources.helpers.file_helper import atomic_output, export_tile, file_entry
+from resources.helpers.fusion import DEFAULT_FUZZY_TOLERANCE, fuse_row, fuse_tile, uses_fused_rows
+from resources.helpers.instrumentation import span
+from resources.helpers.mesh_engine import MESH_ENGINE_FORMATS, export_tile_mesh, supports_mesh_engine
+from resources.helpers.preview import PREVIEW_SIZE, PREVIEW_VIEW
+from resources.helpers.tile_assembly import assemble_tile
+
+# Keys that never change the geometry; only the file nodes that use them depend on them.
+NON_GEOMETRY_KEYS = (
+    "export_formats", "stl_quality", "stl_max_triangles", "stl_max_bytes", "mesh_quantize", "mesh_engine",
+    "fuse_solids", "fuse_tolerance",
+)
+
+# Keys a single row assembly depends on (plus its row layout).
+ROW_KEYS = ("brick_length", "brick_width", "brick_height", "mortar_chamfer", "bond_pattern", "tile_width", "lod")
+
+DEFAULT_MAX_ROWS = 256
+DEFAULT_MAX_TILES = 2
+DEFAULT_MAX_ARTIFACTS = 1024
+
+NODE_TYPES = ("row", "tile", "compound", "fused_row", "fused_tile", "file")
+
+
+def _digest(payload) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def geometry_config(config) -> dict:
+    """Return the part of a configuration that determines the geometry."""
+    return {key: value for key, value in dict(config).items() if key not in NON_GEOMETRY_KEYS}
+
+
+def geometry_key(config) -> str:
+    """Key of the tile and compound nodes."""
+    return _digest(geometry_config(config))
+
+
+def row_key(config, row_index: int) -> tuple:
+    """Key of a row node."""
+    return tuple(config.get(key) for key in ROW_KEYS) + (row_layout_key(config, row_index),)
+
+
+def fusion_tolerance(config):
+    """Return the fuzzy tolerance of a fused tile, or ``None`` if it is not fused."""
+    if not config.get("fuse_solids"):
+        return None
+    return config.get("fuse_tolerance", DEFAULT_FUZZY_TOLERANCE)
+
+
+def file_key(config, fmt: str, tessellation: dict, geometry_version: str) -> str:
+    """Key of a per-format file node."""
+    payload = {
+        "geometry": geometry_config(config),
+        "format": fmt,
+        "geometry_version": geometry_version,
+        "fused": fusion_tolerance(config),
+    }
+    if fmt == "stl":
+        payload["tessellation"] = {name: value for name, value in tessellation.items() if name != "quantize"}
+        payload["mesh_engine"] = config.get("mesh_engine", "auto")
+    elif fmt in ("glb", "3mf"):
+        # Instanced meshes use the quality preset; budgets only apply to STL
+        payload["quality"] = tessellation["quality"]
+        if fmt == "glb":
+            payload["quantize"] = tessellation.get("quantize", False)
+    elif fmt == "png":
+        payload["preview"] = [PREVIEW_SIZE, PREVIEW_VIEW]
+    return _digest(payload)
+
+
+def get_artifact_root() -> str:
+    """Return the directory of the content-addressed artifact store."""
+    return os.path.join(settings.MEDIA_ROOT, "resources", "tiles", "build")
+
+
+def _link(source: str, target: str):
+    """Hard-link ``source`` to ``target`` atomically, copying across filesystems."""
+    with atomic_output(target) as temp_path:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+
+
+class BuildGraph:
+    """
+    Memoized pipeline nodes plus the on-disk artifact store.
+    Safe to share between threads; concurrent misses at worst build twice.
+    """
+
+    def __init__(self, max_rows: int = DEFAULT_MAX_ROWS, max_tiles: int = DEFAULT_MAX_TILES):
+        self.max_rows = max_rows
+        self.max_tiles = max_tiles
+        self._rows = OrderedDict()
+        self._tiles = OrderedDict()  # geometry key -> [tile, compound or None, lock]
+        self._fused_rows = OrderedDict()
+        self._fused_tiles = OrderedDict()  # (geometry key, tolerance) -> [fused shape, lock]
+        self._lock = threading.Lock()
+        self._stats = {node: {"hits": 0, "misses": 0} for node in NODE_TYPES}
+
+    def _hit(self, node: str, hit: bool):
+        with self._lock:
+            self._stats[node]["hits" if hit else "misses"] += 1
+
+    def _remember(self, store: OrderedDict, key, value, limit: int):
+        with self._lock:
+            value = store.setdefault(key, value)
+            store.move_to_end(key)
+            while len(store) > limit:
+                store.popitem(last=False)
+        return value
+
+    def _recall(self, store: OrderedDict, key):
+        with self._lock:
+            value = store.get(key)
+            if value is not None:
+                store.move_to_end(key)
+        return value
+
+    def row(self, config, row_index: int):
+        """Return the row assembly for ``row_index``, reusing an identical row."""
+        key = row_key(config, row_index)
+        row = self._recall(self._rows, key)
+        self._hit("row", row is not None)
+        if row is None:
+            row = self._remember(self._rows, key, assemble_brick_row(config, row_index), self.max_rows)
+        return row
+
+    def _tile_node(self, config):
+        key = geometry_key(config)
+        node = self._recall(self._tiles, key)
+        self._hit("tile", node is not None)
+        if node is None:
+            tile = assemble_tile(config, row_builder=self.row)
+            node = self._remember(self._tiles, key, [tile, None, threading.Lock()], self.max_tiles)
+        return node
+
+    def tile(self, config):
+        """Return the tile assembly for a configuration."""
+        return self._tile_node(config)[0]
+
+    def compound(self, config):
+        """Return the compound of a tile, built once per geometry."""
+        node = self._tile_node(config)
+        self._hit("compound", node[1] is not None)
+        if node[1] is None:
+            with span("export.compound"):
+                node[1] = node[0].toCompound()
+        return node[1]
+
+    def fused_row(self, config, row_index: int):
+        """Return the fused shape of one row, reusing an identical fused row."""
+        key = (row_key(config, row_index), fusion_tolerance(config))
+        fused = self._recall(self._fused_rows, key)
+        self._hit("fused_row", fused is not None)
+        if fused is None:
+            fused = self._remember(
+                self._fused_rows, key, fuse_row(config, row_index, row_builder=self.row), self.max_rows
+            )
+        return fused
+
+    def _fused_node(self, config):
+        key = (geometry_key(config), fusion_tolerance(config))
+        node = self._recall(self._fused_tiles, key)
+        self._hit("fused_tile", node is not None)
+        if node is None:
+            # Brick tiles are fused from fused rows and never need the tile assembly
+            tile = None if uses_fused_rows(config) else self.tile(config)
+            fused = fuse_tile(config, tile=tile, row_fuser=self.fused_row)
+            node = self._remember(self._fused_tiles, key, [fused, threading.Lock()], self.max_tiles)
+        return node
+
+    def fused(self, config):
+        """Return the tile fused into as few solids as possible, fused once per geometry and tolerance."""
+        return self._fused_node(config)[0]
+
+    def build_files(self, config, tile_type: str, version: str, export_formats, output_dir: str, tessellation: dict,
+                    geometry_version: str, progress=None) -> dict:
+        """
+        Produce every requested format in ``output_dir``, writing only the
+        files that are not already in the artifact store.
+        :return: Mapping of format to its export entry (as from ``export_tile``);
+                 entries taken from the store have ``"reused": True``.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        store = get_artifact_root()
+        exports = {}
+        missing = {}
+        for fmt in export_formats:
+            key = file_key(config, fmt, tessellation, geometry_version)
+            stored_path = os.path.join(store, f"{key}.{fmt}")
+            target = os.path.join(output_dir, f"{tile_type}_{version}.{fmt}")
+            details = self._stored_details(stored_path)
+            self._hit("file", details is not None)
+            if details is None:
+                missing[fmt] = stored_path
+                continue
+            _link(stored_path, target)
+            os.utime(stored_path)
+            exports[fmt] = {**file_entry(target, 0.0), **details, "reused": True}
+
+        mesh_formats = [fmt for fmt in missing if fmt in MESH_ENGINE_FORMATS] \
+            if supports_mesh_engine(config, list(missing)) else []
+        brep_formats = [fmt for fmt in missing if fmt not in mesh_formats]
+
+        if mesh_formats:
+            _report(progress, "meshing", 0.1)
+            exports.update(export_tile_mesh(
+                config, version=version, tile_type=tile_type, output_dir=output_dir, tessellation=tessellation,
+                export_formats=mesh_formats,
+            )["files"])
+
+        if brep_formats:
+            _report(progress, "assembling", 0.3)
+            if fusion_tolerance(config) is not None:
+                _report(progress, "fusing", 0.4)
+                node = self._fused_node(config)
+                # A bare shape makes the STEP writer export the fused solid instead of the assembly
+                tile = compound = node[0]
+            else:
+                node = self._tile_node(config)
+                # Writers walk the assembly; the whole tile is never merged into one compound
+                tile, compound = node[0], None
+            _report(progress, "exporting", 0.6)
+            # STL export re-meshes the shared shape, so one export per geometry at a time
+            with node[-1]:
+                exports.update(export_tile(
+                    tile, version=version, tile_type=tile_type, export_formats=brep_formats,
+                    output_dir=output_dir, tessellation=tessellation, compound=compound,
+                )["files"])
+
+        for fmt, stored_path in missing.items():
+            self._store(exports[fmt], stored_path)
+        if missing:
+            prune_artifacts()
+        return {fmt: exports[fmt] for fmt in export_formats}
+
+    @staticmethod
+    def _stored_details(stored_path: str):
+        try:
+            with open(f"{stored_path}.json", "r") as file:
+                details = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return details if os.path.exists(stored_path) else None
+
+    @staticmethod
+    def _store(entry: dict, stored_path: str):
+        os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+        _link(entry["path"], stored_path)
+        details = {name: value for name, value in entry.items() if name not in ("path", "bytes", "seconds")}
+        with atomic_output(f"{stored_path}.json") as temp_path, open(temp_path, "w") as file:
+            json.dump(details, file)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters per node type and the number of memoized nodes."""
+        with self._lock:
+            stats = {node: dict(counters) for node, counters in self._stats.items()}
+            stats["rows_cached"] = len(self._rows)
+            stats["tiles_cached"] = len(self._tiles)
+            stats["fused_tiles_cached"] = len(self._fused_tiles)
+        return stats
+
+    def clear(self):
+        """Drop memoized nodes and counters (mainly for tests)."""
+        with self._lock:
+            self._rows.clear()
+            self._tiles.clear()
+            self._fused_rows.clear()
+            self._fused_tiles.clear()
+            for counters in self._stats.values():
+                counters["hits"] = counters["misses"] = 0
+
+
+def _report(progress, stage: str, fraction: float):
+    if progress is not None:
+        progress(stage, fraction)
+
+
+def prune_artifacts(max_files: int = None) -> int:
+    """
+    Remove the least recently used files from the artifact store.
+    :param max_files: Maximum number of stored files (setting ``TILE_BUILD_MAX_ARTIFACTS``).
+    :return: Number of removed files.
+    """
+    if max_files is None:
+        max_files = getattr(settings, "TILE_BUILD_MAX_ARTIFACTS", DEFAULT_MAX_ARTIFACTS)
+    store = get_artifact_root()
+    if not os.path.isdir(store):
+        return 0
+
+    files = []
+    for name in os.listdir(store):
+        path = os.path.join(store, name)
+        if name.endswith(".json") or name.startswith("."):
+            continue
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            pass
+
+    removed = 0
+    for _mtime, path in sorted(files)[: max(len(files) - max_files, 0)]:
+        for stale in (path, f"{path}.json"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        removed += 1
+    return removed
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_build_graph() -> BuildGraph:
+    """Return the process-wide build graph (sized by ``TILE_BUILD_MAX_ROWS``/``TILE_BUILD_MAX_TILES``)."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = BuildGraph(
+                max_rows=getattr(settings, "TILE_BUILD_MAX_ROWS", DEFAULT_MAX_ROWS),
+                max_tiles=getattr(settings, "TILE_BUILD_MAX_TILES", DEFAULT_MAX_TILES),
+            )
+        return _graph
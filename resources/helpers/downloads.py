@@ -0,0 +1,258 @@
+"""
+downloads.py - Handles streaming, range-capable downloads of tile artifacts.
+
+Artifacts are streamed in chunks rather than buffered, carry a strong ETag
+derived from their SHA-256 so unchanged files revalidate with ``304``, and
+honour single ``Range`` requests for resumable downloads. Precompressed
+``.zst``/``.gz`` siblings are served when the client accepts them.
+
+Under ASGI the body is an async iterator whose reads run in worker threads;
+Django would otherwise buffer a synchronous iterator in memory before sending it.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import shutil
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from resources.helpers.file_helper import atomic_output
+
+CHUNK_SIZE = 256 * 1024
+
+# Preferred encoding first.
+PRECOMPRESSED_SUFFIXES = {
+    "zstd": ".zst",
+    "gzip": ".gz",
+}
+
+CONTENT_TYPES = {
+    "step": "application/step",
+    "stl": "model/stl",
+    "glb": "model/gltf-binary",
+    "3mf": "model/3mf",
+    "png": "image/png",
+}
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_digest(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress_zstd(source, target):
+    import zstandard
+
+    zstandard.ZstdCompressor(level=10).copy_stream(source, target)
+
+
+def _compress_gzip(source, target):
+    with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6, mtime=0) as compressed:
+        shutil.copyfileobj(source, compressed, CHUNK_SIZE)
+
+
+COMPRESSORS = {
+    "zstd": _compress_zstd,
+    "gzip": _compress_gzip,
+}
+
+
+def precompress(file_path: str, encodings) -> dict:
+    """
+    Write precompressed copies of a file next to it.
+    Encodings whose library is not installed are skipped.
+    :param file_path: File to compress.
+    :param encodings: Encodings to produce (``"gzip"``, ``"zstd"``).
+    :return: Mapping of encoding to compressed size in bytes.
+    """
+    sizes = {}
+    for encoding in encodings:
+        if encoding not in COMPRESSORS:
+            raise ValueError(f"Unsupported precompression encoding: {encoding}")
+        target_path = file_path + PRECOMPRESSED_SUFFIXES[encoding]
+        try:
+            with atomic_output(target_path) as temp_path:
+                with open(file_path, "rb") as source, open(temp_path, "wb") as target:
+                    COMPRESSORS[encoding](source, target)
+        except ImportError:
+            print(f"⚠️ Skipping {encoding} precompression: library not installed")
+            continue
+        sizes[encoding] = os.path.getsize(target_path)
+    return sizes
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single-range ``Range`` header.
+    :param header: Value of the ``Range`` header (may be empty).
+    :param size: Size of the representation in bytes.
+    :return: Inclusive ``(start, end)`` or ``None`` to serve the whole file.
+    :raises ValueError: If the range cannot be satisfied.
+    """
+    match = _RANGE_PATTERN.match((header or "").strip())
+    if not match:
+        # Absent, malformed or multi-range requests get the full file
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against an ETag."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header.split(",")]
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def if_range_matches(header: str, etag: str) -> bool:
+    """
+    Strong comparison of an ``If-Range`` header against an ETag (RFC 9110 13.1.5).
+    Only the identical, non-weak tag matches; weak tags, lists and dates never
+    do, so ranges are never spliced across different representations.
+    """
+    value = (header or "").strip()
+    return not value.startswith("W/") and value == etag
+
+
+def choose_encoding(accept_encoding: str, file_path: str):
+    """
+    Pick the preferred precompressed variant that exists and is accepted.
+    :return: Tuple of ``(encoding, path)``; encoding is ``None`` for the original file.
+    """
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in (accept_encoding or "").split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+        if encoding in accepted and os.path.exists(file_path + suffix):
+            return encoding, file_path + suffix
+    return None, file_path
+
+
+def streams_async(request) -> bool:
+    """True if the response to ``request`` is sent by an ASGI server and should stream an async iterator."""
+    return isinstance(request, ASGIRequest)
+
+
+def _read_range(file_path: str, start: int, length: int):
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def _aread_range(file_path: str, start: int, length: int):
+    # Each blocking read runs in a worker thread; only one chunk is held at a time
+    read = sync_to_async(lambda file, size: file.read(size), thread_sensitive=False)
+    file = await sync_to_async(open, thread_sensitive=False)(file_path, "rb")
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = await read(file, min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve_artifact(request, file_path: str, digest: str = None, content_type: str = "application/octet-stream"):
+    """
+    Build a streaming response for an artifact.
+    :param request: Incoming Django request.
+    :param file_path: Artifact on disk.
+    :param digest: SHA-256 of the artifact (computed if not given).
+    :param content_type: MIME type of the uncompressed artifact.
+    :return: ``200``, ``206``, ``304`` or ``416`` response.
+    """
+    if digest is None:
+        digest = file_digest(file_path)
+
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and if_range and not if_range_matches(if_range, f'"{digest}"'):
+        # The client's partial copy is stale: send the whole file
+        range_header = None
+
+    # Ranges always address the original bytes so resumed downloads stay consistent
+    encoding, served_path = (None, file_path) if range_header else choose_encoding(
+        request.headers.get("Accept-Encoding"), file_path
+    )
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=304)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    size = os.path.getsize(served_path)
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file_name = os.path.basename(file_path)
+    asynchronous = streams_async(request)
+    if byte_range is None and not asynchronous:
+        response = FileResponse(
+            open(served_path, "rb"), as_attachment=True, filename=file_name, content_type=content_type
+        )
+    else:
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1
+        reader = _aread_range if asynchronous else _read_range
+        response = StreamingHttpResponse(reader(served_path, start, length), status=206 if byte_range else 200,
+                                         content_type=content_type)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+        response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    if encoding:
+        response["Content-Encoding"] = encoding
+
+    for name, value in headers.items():
+        response[name] = value
+    return response
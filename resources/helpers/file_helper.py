@@ -1,30 +1,180 @@
+import contextvars
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from django.conf import settings
+from resources.helpers.instrumentation import span
+from resources.helpers.tessellation import resolve_tessellation
 
-def export_tile(tile, version="v2.0", tile_type="brick_tile", export_formats=None):
+@contextmanager
+def atomic_output(file_path):
+    """
+    Yields a temporary path next to ``file_path`` and renames it into place
+    once the block succeeds, so readers never see a partially written file.
+    """
+    directory, name = os.path.split(file_path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield temp_path
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def file_entry(file_path, seconds):
+    """Describes one exported file for an export manifest."""
+    return {
+        "path": file_path,
+        "bytes": os.path.getsize(file_path),
+        "seconds": round(seconds, 4),
+    }
+
+def shape_bounds(shape):
+    """Returns the axis-aligned bounding box of a shape as ``{"min": [x, y, z], "max": [x, y, z]}``."""
+    box = shape.BoundingBox()
+    return {
+        "min": [round(box.xmin, 4), round(box.ymin, 4), round(box.zmin, 4)],
+        "max": [round(box.xmax, 4), round(box.ymax, 4), round(box.zmax, 4)],
+    }
+
+def tile_bounds(tile, compound=None):
+    """
+    Returns the bounds of a tile, shaped like ``shape_bounds``. Assemblies
+    without a prebuilt compound are not merged: the bounding box of each
+    prototype is placed at every location instead.
+    """
+    import cadquery as cq
+    if compound is not None or not isinstance(tile, cq.Assembly):
+        return shape_bounds(compound if compound is not None else tile)
+
+    import numpy as np
+    from resources.helpers.instanced_export import iter_instances
+    lower, upper = np.full(3, np.inf), np.full(3, -np.inf)
+    boxes = {}
+    # Placements are walked lazily; only one box per prototype is kept
+    for key, shape, transform in iter_instances(tile):
+        if key not in boxes:
+            box = shape.BoundingBox()
+            boxes[key] = np.array([[x, y, z] for x in (box.xmin, box.xmax) for y in (box.ymin, box.ymax)
+                                   for z in (box.zmin, box.zmax)])
+        placed = boxes[key] @ transform[:3, :3].T + transform[:3, 3]
+        lower = np.minimum(lower, placed.min(axis=0))
+        upper = np.maximum(upper, placed.max(axis=0))
+    if not np.isfinite(lower).all():
+        return None
+    return {
+        "min": [round(float(value), 4) for value in lower],
+        "max": [round(float(value), 4) for value in upper],
+    }
+
+def _write_step(tile, compound, file_path, tessellation):
+    import cadquery as cq
+    if isinstance(tile, cq.Assembly):
+        # Assembly export keeps shared row/brick instances instead of duplicating B-reps
+        tile.export(file_path, exportType="STEP")
+    else:
+        cq.exporters.export(compound if compound is not None else tile, file_path, exportType="STEP")
+    return {"bounds": tile_bounds(tile, compound)}
+
+def _write_stl(tile, compound, file_path, tessellation):
+    from resources.helpers.stl_stream import stream_tile_stl
+    # Streams facets prototype by prototype at the finest preset within budget
+    return stream_tile_stl(tile, file_path, tessellation)
+
+def _write_glb(tile, compound, file_path, tessellation):
+    from resources.helpers.instanced_export import export_glb
+    # One mesh per prototype, placed by GPU instances
+    details = export_glb(tile, file_path, tessellation)
+    return {**details, "bounds": tile_bounds(tile, compound)}
+
+def _write_3mf(tile, compound, file_path, tessellation):
+    from resources.helpers.instanced_export import export_3mf
+    details = export_3mf(tile, file_path, tessellation)
+    return {**details, "bounds": tile_bounds(tile, compound)}
+
+def _write_png(tile, compound, file_path, tessellation):
+    from resources.helpers.preview import export_png
+    # Previews always use the draft preset: a thumbnail cannot show finer facets
+    details = export_png(tile, file_path)
+    return {**details, "bounds": tile_bounds(tile, compound)}
+
+FORMAT_WRITERS = {
+    "step": _write_step,
+    "stl": _write_stl,
+    "glb": _write_glb,
+    "3mf": _write_3mf,
+    "png": _write_png,
+}
+
+def _export_format(fmt, tile, compound, file_path, tessellation):
+    started = time.perf_counter()
+    try:
+        with span(f"export.{fmt}"), atomic_output(file_path) as temp_path:
+            details = FORMAT_WRITERS[fmt](tile, compound, temp_path, tessellation)
+    except Exception as e:
+        raise RuntimeError(f"❌ Export failed for format {fmt}: {e}")
+    print(f"✅ {fmt.upper()} file exported to: {file_path}")
+    return {**file_entry(file_path, time.perf_counter() - started), **details}
+
+def export_tile(tile, version="v2.0", tile_type="brick_tile", export_formats=None, output_dir=None, parallel=True,
+                tessellation=None, compound=None):
     """
     Exports the tile to specified formats in a versioned directory.
+
+    Format writers run concurrently when ``parallel`` is set. None of them
+    merges an assembly into one compound: STEP is written from the assembly
+    and STL is streamed prototype by prototype (see ``stl_stream``), so peak
+    memory does not grow with the tile. Writers mesh copies of the prototypes,
+    so they only share read-only B-reps.
+    Every file is written to a temporary name and renamed into place.
+
+    STL is always binary. ``tessellation`` (see ``resolve_tessellation``)
+    selects the quality preset and an optional triangle/byte budget.
+    A ``compound`` already built from ``tile`` (e.g. a fused tile) is
+    exported in its place by the STEP writer and used for bounds.
+
+    Returns a manifest with the output directory, total seconds and, per
+    format, the file path, byte size and export time. STL entries also carry
+    the chosen preset, tolerances and triangle count.
     """
     if export_formats is None:
         export_formats = ["step", "stl"]
 
-    output_dir = os.path.join(settings.MEDIA_ROOT, "resources", "tiles", tile_type, f"v{version}")
+    for fmt in export_formats:
+        if fmt not in FORMAT_WRITERS:
+            raise RuntimeError(f"❌ Export failed for format {fmt}: Unsupported export format: {fmt}")
+
+    if output_dir is None:
+        output_dir = os.path.join(settings.MEDIA_ROOT, "resources", "tiles", tile_type, f"v{version}")
 
     # ✅ **Ensure `MEDIA_ROOT` exists**
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    for fmt in export_formats:
-        file_path = os.path.join(output_dir, f"{tile_type}_{version}.{fmt}")
-        try:
-            if fmt == "step":
-                from cadquery import exporters
-                exporters.export(tile.toCompound(), file_path)
-            elif fmt == "stl":
-                from cadquery import exporters
-                exporters.export(tile.toCompound(), file_path)
-            else:
-                raise ValueError(f"Unsupported export format: {fmt}")
-            print(f"✅ {fmt.upper()} file exported to: {file_path}")
-        except Exception as e:
-            raise RuntimeError(f"❌ Export failed for format {fmt}: {e}")
+    if tessellation is None:
+        tessellation = resolve_tessellation()
+
+    started = time.perf_counter()
+    jobs = {
+        fmt: (fmt, tile, compound, os.path.join(output_dir, f"{tile_type}_{version}.{fmt}"), tessellation)
+        for fmt in export_formats
+    }
+
+    if parallel and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="tile-export") as executor:
+            # Each writer runs in a copy of this context so its spans join the current trace
+            futures = {
+                fmt: executor.submit(contextvars.copy_context().run, _export_format, *args)
+                for fmt, args in jobs.items()
+            }
+            files = {fmt: future.result() for fmt, future in futures.items()}
+    else:
+        files = {fmt: _export_format(*args) for fmt, args in jobs.items()}
+
+    return {
+        "output_dir": output_dir,
+        "seconds": round(time.perf_counter() - started, 4),
+        "files": files,
+    }
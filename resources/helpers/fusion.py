@@ -0,0 +1,98 @@
+"""
+fusion.py - Handles merging tile solids into as few solids as possible.
+
+Each fusion is one batched ``BRepAlgoAPI_Fuse`` call (first shape as the
+argument, the rest as tools) run in parallel with a fuzzy tolerance, instead
+of a chain of pairwise unions. Coplanar faces left behind are merged with
+``ShapeUpgrade_UnifySameDomain``.
+
+Brick tiles are fused hierarchically: each distinct row layout is fused once,
+then the placed rows are fused into the tile. Pieces that do not touch stay
+separate solids of the result.
+"""
+
+import cadquery as cq
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Fuse
+from OCP.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+from OCP.TopTools import TopTools_ListOfShape
+
+from resources.helpers.brick_helpers import assemble_brick_row
+from resources.helpers.brick_layout import row_layout_key
+from resources.helpers.instrumentation import count, span
+from resources.helpers.lod import SLAB_LOD, lod_level
+
+DEFAULT_FUZZY_TOLERANCE = 0.001  # mm
+
+
+def fuse_shapes(shapes, fuzzy_tolerance: float = DEFAULT_FUZZY_TOLERANCE, parallel: bool = True) -> cq.Shape:
+    """
+    Fuse shapes in a single batched boolean operation.
+    :param shapes: CadQuery shapes to merge.
+    :param fuzzy_tolerance: Gap below which faces are treated as touching.
+    :param parallel: Let OpenCascade run the operation on multiple threads.
+    :return: The fused shape (a solid, or a compound of disjoint solids).
+    :raises ValueError: If no shapes are given.
+    :raises RuntimeError: If OpenCascade cannot fuse the shapes.
+    """
+    shapes = list(shapes)
+    if not shapes:
+        raise ValueError("Nothing to fuse")
+    if len(shapes) == 1:
+        return shapes[0]
+
+    arguments, tools = TopTools_ListOfShape(), TopTools_ListOfShape()
+    arguments.Append(shapes[0].wrapped)
+    for shape in shapes[1:]:
+        tools.Append(shape.wrapped)
+
+    operation = BRepAlgoAPI_Fuse()
+    operation.SetArguments(arguments)
+    operation.SetTools(tools)
+    operation.SetRunParallel(parallel)
+    operation.SetFuzzyValue(fuzzy_tolerance)
+    operation.Build()
+    if not operation.IsDone():
+        raise RuntimeError(f"❌ Fusion failed for {len(shapes)} shapes")
+
+    unify = ShapeUpgrade_UnifySameDomain(operation.Shape(), True, True, True)
+    unify.Build()
+    count("shapes_fused", len(shapes))
+    return cq.Shape.cast(unify.Shape())
+
+
+def fuse_row(config, row_index: int, row_builder=assemble_brick_row) -> cq.Shape:
+    """Fuse the bricks of one row into a single shape."""
+    with span("fusion.row"):
+        solids = row_builder(config, row_index).toCompound().Solids()
+        return fuse_shapes(solids, config.get("fuse_tolerance", DEFAULT_FUZZY_TOLERANCE))
+
+
+def uses_fused_rows(config) -> bool:
+    """True if a tile is fused row by row (brick tiles below the slab level)."""
+    return config["tile_type"] == "bricks" and lod_level(config) < SLAB_LOD
+
+
+def fuse_tile(config, tile=None, row_fuser=fuse_row) -> cq.Shape:
+    """
+    Fuse a whole tile.
+    :param config: Tile configuration.
+    :param tile: Assembled tile; required unless ``uses_fused_rows(config)``.
+    :param row_fuser: ``callable(config, row_index)`` returning a fused row;
+                      lets callers supply memoized rows (brick tiles only).
+    :return: The fused tile shape.
+    """
+    tolerance = config.get("fuse_tolerance", DEFAULT_FUZZY_TOLERANCE)
+    if not uses_fused_rows(config):
+        with span("fusion.tile"):
+            return fuse_shapes(tile.toCompound().Solids(), tolerance)
+
+    # Fuse each distinct row layout once, then fuse the placed rows
+    rows = {}
+    placed = []
+    for i in range(config["row_repetition"]):
+        layout_key = row_layout_key(config, i)
+        if layout_key not in rows:
+            rows[layout_key] = row_fuser(config, i)
+        placed.append(rows[layout_key].moved(cq.Location(cq.Vector(0, 0, i * config["brick_height"]))))
+    with span("fusion.tile"):
+        return fuse_shapes(placed, tolerance)
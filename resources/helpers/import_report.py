@@ -0,0 +1,82 @@
+"""
+import_report.py - Handles measuring module import cost at cold start.
+
+``measure_imports`` imports a module in a fresh interpreter with
+``python -X importtime`` (after ``django.setup()``) and reports the total
+import time, the slowest modules and which heavy geometry libraries were
+loaded. Endpoints that do not build geometry should not load any of them.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Libraries that should only be imported when geometry is actually built.
+HEAVY_MODULES = ("cadquery", "OCP", "numpy", "ocp_vscode")
+
+DEFAULT_MODULE = "railworks_project.urls"
+
+_PROBE = """
+import django, json, sys
+django.setup()
+import {module}
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+"""
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Parse ``-X importtime`` output.
+    :return: List of ``(module, depth, self_us, cumulative_us)`` in the order
+             imports finished; depth 0 marks a top-level import.
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2][1:].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def measure_imports(module: str = DEFAULT_MODULE, top: int = 15,
+                    settings_module: str = "railworks_project.settings") -> dict:
+    """
+    Import a module in a fresh interpreter and report its import cost.
+    :param module: Dotted module path to import after ``django.setup()``.
+    :param top: Number of slowest top-level imports to list.
+    :param settings_module: Django settings for the child interpreter.
+    :return: Dictionary with ``module_seconds`` (the module itself),
+             ``total_seconds`` (including interpreter and Django start-up),
+             the ``slowest`` top-level imports and the ``heavy`` modules loaded.
+    :raises RuntimeError: If the module cannot be imported.
+    """
+    environment = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings_module,
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+    }
+    probe = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, env=environment,
+    )
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ["unknown error"])[-1]
+        raise RuntimeError(f"❌ Import failed for {module}: {error}")
+
+    # Nested imports are already included in their parent's cumulative time
+    top_level = [(name, cumulative) for name, depth, _, cumulative in parse_importtime(process.stderr) if depth == 0]
+    slowest = sorted(top_level, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "module_seconds": round(sum(cumulative for name, cumulative in top_level if name == module) / 1e6, 4),
+        "total_seconds": round(sum(cumulative for _, cumulative in top_level) / 1e6, 4),
+        "slowest": [{"module": name, "seconds": round(cumulative / 1e6, 4)} for name, cumulative in slowest],
+        "heavy": json.loads(process.stdout.strip().splitlines()[-1]),
+    }
@@ -0,0 +1,405 @@
+"""
+instanced_export.py - Handles GLB and 3MF export with shared, instanced meshes.
+
+A tile places a handful of prototype solids (bricks, sleepers, chairs, rails)
+many times. STL bakes every placement into one triangle soup; these writers
+tessellate each distinct prototype once and emit the tile as instances of it:
+
+* GLB (binary glTF 2.0): one mesh per prototype, placed with
+  ``EXT_mesh_gpu_instancing`` so a browser draws each prototype in one call.
+  With ``quantize`` (``mesh_quantize`` in the config) positions are stored as
+  16-bit and normals as 8-bit integers (``KHR_mesh_quantization``).
+* 3MF: one mesh object per prototype, placed by the components of a single
+  build item, in millimetres.
+
+Prototypes are found by walking the assembly: leaves that share the same
+object (see ``brick_geometry.get_prototype``) share one mesh.
+"""
+
+import json
+import struct
+import zipfile
+
+import cadquery as cq
+import numpy as np
+
+from resources.helpers.instrumentation import count, span
+from resources.helpers.tessellation import DEFAULT_QUALITY, TESSELLATION_PRESETS
+
+# glTF constants
+_FLOAT, _BYTE, _SHORT, _UNSIGNED_SHORT, _UNSIGNED_INT = 5126, 5120, 5122, 5123, 5125
+_ARRAY_BUFFER, _ELEMENT_ARRAY_BUFFER = 34962, 34963
+_GLB_MAGIC, _GLB_JSON, _GLB_BIN = 0x46546C67, 0x4E4F534A, 0x004E4942
+
+# CAD tiles are Z-up millimetres, glTF is Y-up metres
+_Z_UP_TO_Y_UP = [-0.7071067811865476, 0.0, 0.0, 0.7071067811865476]
+_MM_TO_M = 0.001
+
+_3MF_CORE = "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"
+_3MF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    "</Types>"
+)
+_3MF_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    "</Relationships>"
+)
+
+
+def _as_shape(obj):
+    """Return the shape held by an assembly node (a shape or a workplane), or ``None``."""
+    if isinstance(obj, cq.Shape):
+        return obj
+    shapes = [value for value in obj.vals() if isinstance(value, cq.Shape)]
+    if not shapes:
+        return None
+    return shapes[0] if len(shapes) == 1 else cq.Compound.makeCompound(shapes)
+
+
+def location_matrix(location: cq.Location) -> np.ndarray:
+    """Return the 4x4 matrix of a CadQuery location."""
+    transformation = location.wrapped.Transformation()
+    matrix = np.eye(4)
+    for row in range(3):
+        for column in range(4):
+            matrix[row, column] = transformation.Value(row + 1, column + 1)
+    return matrix
+
+
+def iter_instances(tile, transforms: bool = True):
+    """
+    Walk the placements of a tile lazily, in assembly order; only the current branch is held.
+    :param tile: ``cq.Assembly``, or a bare shape (e.g. a fused tile).
+    :param transforms: False skips computing placements (``transform`` is then ``None``).
+    :return: Generator of ``(key, shape, transform)``. ``key`` identifies the prototype
+             across walks of the same tile; ``transform`` is its ``(4, 4)`` placement.
+    """
+    if not isinstance(tile, cq.Assembly):
+        yield id(tile), tile, np.eye(4) if transforms else None
+        return
+
+    shapes = {}
+
+    def visit(node, parent):
+        location = parent * node.loc if transforms else None
+        if node.obj is not None:
+            key = id(node.obj)
+            if key not in shapes:
+                shapes[key] = _as_shape(node.obj)
+            if shapes[key] is not None:
+                yield key, shapes[key], location_matrix(location) if transforms else None
+        for child in node.children:
+            yield from visit(child, location)
+
+    yield from visit(tile, cq.Location())
+
+
+def count_instances(tile) -> list:
+    """
+    Count the placements of every prototype without keeping them.
+    :return: List of ``(key, shape, placements)``, one per prototype.
+    """
+    counts = {}
+    for key, shape, _transform in iter_instances(tile, transforms=False):
+        if key in counts:
+            counts[key][2] += 1
+        else:
+            counts[key] = [key, shape, 1]
+    return [tuple(entry) for entry in counts.values()]
+
+
+def collect_instances(tile) -> list:
+    """
+    Group the solids of a tile by prototype.
+    :param tile: ``cq.Assembly``, or a bare shape (e.g. a fused tile).
+    :return: List of ``(shape, transforms)``, one ``(n, 4, 4)`` array of placements per prototype.
+    """
+    groups = {}
+    for key, shape, transform in iter_instances(tile):
+        groups.setdefault(key, (shape, []))[1].append(transform)
+    return [(shape, np.array(matrices)) for shape, matrices in groups.values()]
+
+
+def tessellate_prototype(shape, quality: str = DEFAULT_QUALITY):
+    """
+    Tessellate one prototype at a quality preset.
+    :return: Tuple of ``(positions, indices)`` arrays of shape ``(v, 3)`` and ``(t, 3)``.
+    """
+    preset = TESSELLATION_PRESETS[quality]
+    # Mesh a copy: the STL writer may be re-meshing the shared original concurrently
+    vertices, triangles = shape.copy().tessellate(preset["tolerance"], preset["angular_tolerance"])
+    positions = np.array([vertex.toTuple() for vertex in vertices], dtype=float).reshape(-1, 3)
+    indices = np.array(triangles, dtype=np.uint32).reshape(-1, 3)
+    return positions, indices
+
+
+def vertex_normals(positions: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Area-weighted unit vertex normals (faces do not share vertices, so planar faces stay flat)."""
+    corners = positions[indices]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals = np.zeros_like(positions)
+    for corner in range(3):
+        np.add.at(normals, indices[:, corner], face_normals)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def weld(positions: np.ndarray, indices: np.ndarray, decimals: int = 6):
+    """
+    Merge coincident vertices and drop triangles that collapse, so the mesh is
+    manifold as 3MF requires.
+    :return: Tuple of ``(positions, indices)``.
+    """
+    unique, inverse = np.unique(np.round(positions, decimals), axis=0, return_inverse=True)
+    indices = inverse.reshape(-1)[indices]
+    keep = (indices[:, 0] != indices[:, 1]) & (indices[:, 1] != indices[:, 2]) & (indices[:, 0] != indices[:, 2])
+    return unique, indices[keep]
+
+
+def build_prototypes(tile, quality: str = DEFAULT_QUALITY) -> list:
+    """
+    Tessellate every distinct prototype of a tile once.
+    :return: List of ``(positions, indices, transforms)``.
+    """
+    prototypes = []
+    with span("instanced.tessellate"):
+        for shape, transforms in collect_instances(tile):
+            positions, indices = tessellate_prototype(shape, quality)
+            if len(indices):
+                prototypes.append((positions, indices, transforms))
+    count("prototypes_tessellated", len(prototypes))
+    return prototypes
+
+
+def _summary(prototypes: list, quality: str) -> dict:
+    """Details shared by both writers for the export manifest."""
+    return {
+        "quality": quality,
+        "prototypes": len(prototypes),
+        "instances": sum(len(transforms) for _, _, transforms in prototypes),
+        "mesh_triangles": sum(len(indices) for _, indices, _ in prototypes),
+        "triangles": sum(len(indices) * len(transforms) for _, indices, transforms in prototypes),
+    }
+
+
+def _quaternions(rotations: np.ndarray) -> np.ndarray:
+    """Convert ``(n, 3, 3)`` rotation matrices to ``(n, 4)`` unit quaternions (x, y, z, w)."""
+    m = rotations
+    quaternions = np.empty((len(m), 4))
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    for i, r in enumerate(m):
+        if trace[i] > 0:
+            s = 2.0 * np.sqrt(trace[i] + 1.0)
+            quaternions[i] = [(r[2, 1] - r[1, 2]) / s, (r[0, 2] - r[2, 0]) / s, (r[1, 0] - r[0, 1]) / s, 0.25 * s]
+        elif r[0, 0] > r[1, 1] and r[0, 0] > r[2, 2]:
+            s = 2.0 * np.sqrt(1.0 + r[0, 0] - r[1, 1] - r[2, 2])
+            quaternions[i] = [0.25 * s, (r[0, 1] + r[1, 0]) / s, (r[0, 2] + r[2, 0]) / s, (r[2, 1] - r[1, 2]) / s]
+        elif r[1, 1] > r[2, 2]:
+            s = 2.0 * np.sqrt(1.0 + r[1, 1] - r[0, 0] - r[2, 2])
+            quaternions[i] = [(r[0, 1] + r[1, 0]) / s, 0.25 * s, (r[1, 2] + r[2, 1]) / s, (r[0, 2] - r[2, 0]) / s]
+        else:
+            s = 2.0 * np.sqrt(1.0 + r[2, 2] - r[0, 0] - r[1, 1])
+            quaternions[i] = [(r[0, 2] + r[2, 0]) / s, (r[1, 2] + r[2, 1]) / s, 0.25 * s, (r[1, 0] - r[0, 1]) / s]
+    return quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+
+class _GltfBuffer:
+    """Accumulates the binary chunk of a GLB with its buffer views and accessors."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.views = []
+        self.accessors = []
+
+    def add(self, array: np.ndarray, component_type: int, accessor_type: str, components: int = None,
+            target: int = None, normalized: bool = False, bounds: bool = False) -> int:
+        """
+        Append an array and return the index of its accessor.
+        :param components: Components used per element when rows are padded for alignment.
+        """
+        self.data += b"\0" * (-len(self.data) % 4)
+        view = {"buffer": 0, "byteOffset": len(self.data), "byteLength": array.nbytes}
+        if target is not None:
+            view["target"] = target
+        if array.ndim == 2 and components is not None and components != array.shape[1]:
+            view["byteStride"] = array.strides[0]
+        self.data += array.tobytes()
+        self.views.append(view)
+
+        accessor = {
+            "bufferView": len(self.views) - 1,
+            "componentType": component_type,
+            "count": len(array),
+            "type": accessor_type,
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if bounds:
+            used = array[:, :components] if components is not None else array
+            accessor["min"] = used.min(axis=0).tolist()
+            accessor["max"] = used.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+def write_glb(file_path: str, prototypes: list, quantize: bool = False, extras: dict = None):
+    """
+    Write prototypes and their placements as an instanced GLB.
+    :param file_path: Destination path.
+    :param prototypes: List of ``(positions, indices, transforms)`` in millimetres.
+    :param quantize: Store positions as int16 and normals as int8.
+    :param extras: JSON-serializable application data stored on the root node (e.g., mortar hints).
+    """
+    # Quantized positions are integers on a uniform grid; the root node scales them back
+    step = 1.0
+    if quantize:
+        extent = max(np.abs(positions).max() for positions, _, _ in prototypes)
+        step = max(extent / 32767.0, 1e-9)
+
+    buffer = _GltfBuffer()
+    meshes, nodes = [], []
+    for positions, indices, transforms in prototypes:
+        normals = vertex_normals(positions, indices)
+        if quantize:
+            padded = np.zeros((len(positions), 4), dtype=np.int16)
+            padded[:, :3] = np.round(positions / step)
+            position_accessor = buffer.add(padded, _SHORT, "VEC3", components=3, target=_ARRAY_BUFFER, bounds=True)
+            packed = np.zeros((len(normals), 4), dtype=np.int8)
+            packed[:, :3] = np.round(normals * 127)
+            normal_accessor = buffer.add(packed, _BYTE, "VEC3", components=3, target=_ARRAY_BUFFER, normalized=True)
+        else:
+            position_accessor = buffer.add(positions.astype(np.float32), _FLOAT, "VEC3", target=_ARRAY_BUFFER,
+                                           bounds=True)
+            normal_accessor = buffer.add(normals.astype(np.float32), _FLOAT, "VEC3", target=_ARRAY_BUFFER)
+
+        if len(positions) < 65536:
+            index_accessor = buffer.add(indices.astype(np.uint16).reshape(-1), _UNSIGNED_SHORT, "SCALAR",
+                                        target=_ELEMENT_ARRAY_BUFFER)
+        else:
+            index_accessor = buffer.add(indices.astype(np.uint32).reshape(-1), _UNSIGNED_INT, "SCALAR",
+                                        target=_ELEMENT_ARRAY_BUFFER)
+
+        meshes.append({"primitives": [{
+            "attributes": {"POSITION": position_accessor, "NORMAL": normal_accessor},
+            "indices": index_accessor,
+            "material": 0,
+        }]})
+
+        linear = transforms[:, :3, :3]
+        scales = np.linalg.norm(linear, axis=1)
+        attributes = {
+            "TRANSLATION": buffer.add((transforms[:, :3, 3] / step).astype(np.float32), _FLOAT, "VEC3"),
+        }
+        rotations = linear / scales[:, None, :]
+        if not np.allclose(rotations, np.eye(3)):
+            attributes["ROTATION"] = buffer.add(_quaternions(rotations).astype(np.float32), _FLOAT, "VEC4")
+        if not np.allclose(scales, 1.0):
+            attributes["SCALE"] = buffer.add(scales.astype(np.float32), _FLOAT, "VEC3")
+        nodes.append({"mesh": len(meshes) - 1, "extensions": {"EXT_mesh_gpu_instancing": {"attributes": attributes}}})
+
+    extensions = ["EXT_mesh_gpu_instancing"] + (["KHR_mesh_quantization"] if quantize else [])
+    scale = _MM_TO_M * step
+    root = {"name": "tile", "rotation": _Z_UP_TO_Y_UP, "scale": [scale] * 3, "children": list(range(1, len(nodes) + 1))}
+    if extras:
+        root["extras"] = extras
+    document = {
+        "asset": {"version": "2.0", "generator": "railworks instanced_export"},
+        "extensionsUsed": extensions,
+        "extensionsRequired": extensions,
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [root, *nodes],
+        "meshes": meshes,
+        "materials": [{"pbrMetallicRoughness": {
+            "baseColorFactor": [0.8, 0.8, 0.8, 1.0], "metallicFactor": 0.0, "roughnessFactor": 0.9,
+        }}],
+        "buffers": [{"byteLength": len(buffer.data)}],
+        "bufferViews": buffer.views,
+        "accessors": buffer.accessors,
+    }
+
+    json_chunk = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    binary_chunk = bytes(buffer.data) + b"\0" * (-len(buffer.data) % 4)
+    with open(file_path, "wb") as file:
+        file.write(struct.pack("<III", _GLB_MAGIC, 2, 12 + 8 + len(json_chunk) + 8 + len(binary_chunk)))
+        file.write(struct.pack("<II", len(json_chunk), _GLB_JSON))
+        file.write(json_chunk)
+        file.write(struct.pack("<II", len(binary_chunk), _GLB_BIN))
+        file.write(binary_chunk)
+
+
+def _3mf_transform(matrix: np.ndarray) -> str:
+    """3MF transforms are 4x3, row-vector convention: the transposed linear part, then the translation."""
+    values = np.concatenate([matrix[:3, :3].T.reshape(-1), matrix[:3, 3]])
+    return " ".join(f"{value:.6g}" for value in values)
+
+
+def write_3mf(file_path: str, prototypes: list):
+    """
+    Write prototypes and their placements as a 3MF package in millimetres.
+    :param file_path: Destination path.
+    :param prototypes: List of ``(positions, indices, transforms)``.
+    """
+    objects, components = [], []
+    for object_id, (positions, indices, transforms) in enumerate(prototypes, start=1):
+        positions, indices = weld(positions, indices)
+        vertices = "".join(f'<vertex x="{x:.6g}" y="{y:.6g}" z="{z:.6g}"/>' for x, y, z in positions)
+        triangles = "".join(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in indices)
+        objects.append(
+            f'<object id="{object_id}" type="model"><mesh><vertices>{vertices}</vertices>'
+            f"<triangles>{triangles}</triangles></mesh></object>"
+        )
+        components.extend(
+            f'<component objectid="{object_id}" transform="{_3mf_transform(matrix)}"/>' for matrix in transforms
+        )
+
+    tile_id = len(prototypes) + 1
+    model = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<model unit="millimeter" xml:lang="en-US" xmlns="{_3MF_CORE}"><resources>'
+        + "".join(objects)
+        + f'<object id="{tile_id}" type="model"><components>{"".join(components)}</components></object>'
+        + f'</resources><build><item objectid="{tile_id}"/></build></model>'
+    )
+    with zipfile.ZipFile(file_path, "w", compression=zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", _3MF_CONTENT_TYPES)
+        package.writestr("_rels/.rels", _3MF_RELS)
+        package.writestr("3D/3dmodel.model", model)
+
+
+def export_glb(tile, file_path: str, tessellation: dict) -> dict:
+    """
+    Export a tile as an instanced GLB.
+    :param tessellation: Options from ``resolve_tessellation``; uses ``quality`` and ``quantize``.
+    :return: Export details (prototype, instance and triangle counts).
+    """
+    quality = tessellation.get("quality", DEFAULT_QUALITY)
+    prototypes = build_prototypes(tile, quality)
+    if not prototypes:
+        raise ValueError("Tile has no geometry to export")
+    quantize = bool(tessellation.get("quantize", False))
+    with span("instanced.glb"):
+        write_glb(file_path, prototypes, quantize=quantize, extras=getattr(tile, "metadata", None))
+    return {**_summary(prototypes, quality), "quantized": quantize}
+
+
+def export_3mf(tile, file_path: str, tessellation: dict) -> dict:
+    """
+    Export a tile as a 3MF package with one mesh per prototype.
+    :param tessellation: Options from ``resolve_tessellation``; uses ``quality``.
+    :return: Export details (prototype, instance and triangle counts).
+    """
+    quality = tessellation.get("quality", DEFAULT_QUALITY)
+    prototypes = build_prototypes(tile, quality)
+    if not prototypes:
+        raise ValueError("Tile has no geometry to export")
+    with span("instanced.3mf"):
+        write_3mf(file_path, prototypes)
+    return _summary(prototypes, quality)
@@ -0,0 +1,233 @@
+"""
+instrumentation.py - Handles timing spans, counters and per-request profiling.
+
+``span(name)`` times a block and ``count(name)`` bumps a counter. Both always
+feed process-wide aggregates, exposed in Prometheus text format by
+``prometheus_text``. Inside ``trace_request`` they are also recorded as a
+nested span tree for that request. Optionally the request is profiled with
+cProfile or pyinstrument.
+
+The current trace lives in a context variable. Work handed to a thread pool
+must be submitted through ``contextvars.copy_context().run`` to stay in the
+same trace.
+"""
+
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+METRIC_PREFIX = "railworks"
+
+# Upper bounds (seconds) of the stage duration histogram buckets.
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+_current_trace = contextvars.ContextVar("railworks_trace", default=None)
+_current_span = contextvars.ContextVar("railworks_span", default=None)
+
+_metrics_lock = threading.Lock()
+_span_metrics = {}  # name -> {"count", "sum", "buckets"}
+_counters = {}
+
+
+class Trace:
+    """Span tree and counters collected for one request."""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def add_span(self, record: dict, parent: dict = None):
+        with self._lock:
+            (parent["children"] if parent is not None else self.spans).append(record)
+
+    def count(self, name: str, amount):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            result = {"spans": self.spans, "counters": dict(self.counters)}
+        if self.profile is not None:
+            result["profile"] = self.profile
+        return result
+
+    def totals(self) -> dict:
+        """Total seconds per span name across the whole tree, in first-seen order."""
+        totals = {}
+        with self._lock:
+            pending = list(self.spans)
+            while pending:
+                record = pending.pop(0)
+                totals[record["name"]] = totals.get(record["name"], 0.0) + record["seconds"]
+                pending.extend(record["children"])
+        return totals
+
+    def server_timing(self) -> str:
+        """Span totals as a ``Server-Timing`` header value (milliseconds)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.totals().items())
+
+
+def _observe(name: str, seconds: float):
+    with _metrics_lock:
+        metric = _span_metrics.get(name)
+        if metric is None:
+            metric = _span_metrics[name] = {"count": 0, "sum": 0.0, "buckets": [0] * len(HISTOGRAM_BUCKETS)}
+        metric["count"] += 1
+        metric["sum"] += seconds
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                metric["buckets"][index] += 1
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block of work.
+    Nested spans become children of the enclosing span in the current trace.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    record = {"name": name, "seconds": 0.0, "children": []} if trace is not None else None
+    token = _current_span.set(record) if record is not None else None
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - started
+        _observe(name, seconds)
+        if record is not None:
+            _current_span.reset(token)
+            record["seconds"] = round(seconds, 6)
+            trace.add_span(record, parent)
+
+
+def timed(name: str):
+    """Decorator form of ``span``."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, amount=1):
+    """Increment a counter globally and in the current trace."""
+    with _metrics_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, amount)
+
+
+def current_trace():
+    """Return the active ``Trace`` or ``None``."""
+    return _current_trace.get()
+
+
+def _pyinstrument_profile():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        raise ValueError("Profiler 'pyinstrument' is not installed")
+    return Profiler()
+
+
+@contextmanager
+def trace_request(profile: str = None, profile_limit: int = 30):
+    """
+    Collect spans and counters for the enclosed block.
+    :param profile: ``"cprofile"`` or ``"pyinstrument"`` to also capture a profile.
+    :param profile_limit: Number of cProfile rows to keep.
+    :raises ValueError: If the profiler is unknown or not installed.
+    """
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"Unsupported profiler: {profile} (expected one of {', '.join(PROFILERS)})")
+
+    profiler = None
+    if profile == "cprofile":
+        profiler = cProfile.Profile()
+    elif profile == "pyinstrument":
+        profiler = _pyinstrument_profile()
+
+    trace = Trace()
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    if profiler is not None:
+        # Only one profiler can be active per interpreter
+        try:
+            profiler.enable() if profile == "cprofile" else profiler.start()
+        except (RuntimeError, ValueError):
+            profiler = None
+            trace.profile = "profiler busy with another request"
+    try:
+        yield trace
+    finally:
+        if profiler is not None and profile == "cprofile":
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(profile_limit)
+            trace.profile = output.getvalue()
+        elif profiler is not None:
+            profiler.stop()
+            trace.profile = profiler.output_text(unicode=False, color=False)
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def metrics_snapshot() -> dict:
+    """Return a copy of the process-wide span aggregates and counters."""
+    with _metrics_lock:
+        return {
+            "spans": {
+                name: {**metric, "buckets": list(metric["buckets"])} for name, metric in _span_metrics.items()
+            },
+            "counters": dict(_counters),
+        }
+
+
+def reset_metrics():
+    """Drop all aggregates (mainly for tests)."""
+    with _metrics_lock:
+        _span_metrics.clear()
+        _counters.clear()
+
+
+def _metric_name(name: str) -> str:
+    return f"{METRIC_PREFIX}_" + "".join(char if char.isalnum() else "_" for char in name)
+
+
+def prometheus_text(extra_counters: dict = None) -> str:
+    """
+    Render the aggregates in the Prometheus text exposition format.
+    :param extra_counters: Additional ``name -> value`` counters to include.
+    """
+    snapshot = metrics_snapshot()
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in each instrumented stage.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+    ]
+    for name, metric in sorted(snapshot["spans"].items()):
+        # Buckets are already cumulative: an observation lands in every bucket it fits
+        for bound, observed in zip(HISTOGRAM_BUCKETS, metric["buckets"]):
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {observed}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {metric["count"]}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{name}"}} {metric["sum"]:.6f}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{name}"}} {metric["count"]}')
+
+    counters = {**snapshot["counters"], **(extra_counters or {})}
+    for name, value in sorted(counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,418 @@
+"""
+job_queue.py - Handles asynchronous tile generation jobs.
+
+Jobs are recorded in a small SQLite database so every web process (and any
+worker process) sees the same status. A local executor runs ``assemble_tile``
+and ``export_tile`` (through the tile cache) outside the request handler;
+no external broker is required.
+
+Backends, selected with ``settings.TILE_JOB_BACKEND``:
+    - ``process`` (default): a local ``ProcessPoolExecutor``.
+    - ``thread``: a ``ThreadPoolExecutor`` in the web process.
+    - ``inline``: run the job synchronously on submit (tests, debugging).
+    - ``pool``: only enqueue; a warm ``worker_pool`` claims and runs the job.
+
+Every in-flight job records the process that owns it, and a running job
+heartbeats while it works. A job whose owner is gone, or whose heartbeat is
+older than ``settings.TILE_JOB_LEASE`` seconds, is abandoned: it is marked
+failed instead of being joined, so a crash or restart cannot wedge a config.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing, contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from resources.helpers.tile_cache import artifact_key, get_or_generate_tile
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+IN_FLIGHT_STATUSES = (QUEUED, RUNNING)
+
+JOB_BACKENDS = ("process", "thread", "inline", "pool")
+
+DEFAULT_JOB_LEASE = 600  # seconds a running job may go without a heartbeat
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tile_jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    tile_type TEXT NOT NULL,
+    version TEXT NOT NULL,
+    config TEXT NOT NULL,
+    export_formats TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS tile_jobs_key_status ON tile_jobs (key, status);
+"""
+
+_JSON_COLUMNS = ("config", "export_formats", "result")
+
+# Columns added after the first release, for databases created before them
+_ADDED_COLUMNS = {"owner_pid": "INTEGER", "heartbeat_at": "REAL"}
+
+
+def get_job_database_path() -> str:
+    """Return the SQLite file that backs the job queue."""
+    default_path = os.path.join(settings.BASE_DIR, "tile_jobs.sqlite3")
+    return str(getattr(settings, "TILE_JOB_DATABASE", default_path))
+
+
+def process_alive(pid) -> bool:
+    """Return False only if ``pid`` is known not to be running on this host."""
+    if not pid or os.name == "nt":
+        # Unknown owner; on Windows os.kill(pid, 0) would send CTRL_C_EVENT
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Alive but owned by another user, or not ours to probe
+        return True
+    return True
+
+
+class JobStore:
+    """
+    SQLite-backed record of tile generation jobs.
+    Safe to use from several processes at once; every call opens its own connection.
+    """
+
+    def __init__(self, path: str, lease: float = None):
+        self.path = path
+        self.lease = lease if lease is not None else getattr(settings, "TILE_JOB_LEASE", DEFAULT_JOB_LEASE)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(tile_jobs)")}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column in columns:
+                    continue
+                try:
+                    connection.execute(f"ALTER TABLE tile_jobs ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError as e:
+                    # Another process added it first
+                    if "duplicate column" not in str(e):
+                        raise
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def abandoned_reason(self, job: dict, now: float = None):
+        """
+        Explain why an in-flight job can no longer finish, or return ``None`` if it still can.
+        Queued jobs without an owner (``pool`` backend) wait for a worker indefinitely.
+        """
+        if job["status"] not in IN_FLIGHT_STATUSES:
+            return None
+        if not process_alive(job["owner_pid"]):
+            return f"Owner process {job['owner_pid']} is gone"
+        if job["status"] == RUNNING:
+            now = time.time() if now is None else now
+            last_seen = job["heartbeat_at"] or job["started_at"] or job["created_at"]
+            if now - last_seen > self.lease:
+                return f"No heartbeat for {now - last_seen:.0f}s (lease {self.lease}s)"
+        return None
+
+    def _expire_abandoned(self, connection, rows) -> list:
+        """Fail the abandoned jobs among ``rows``; return the rows still in flight."""
+        now = time.time()
+        alive = []
+        for row in rows:
+            reason = self.abandoned_reason(row, now)
+            if reason is None:
+                alive.append(row)
+                continue
+            connection.execute(
+                "UPDATE tile_jobs SET status = ?, stage = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (FAILED, FAILED, f"Job abandoned: {reason}", now, row["id"], row["status"]),
+            )
+        return alive
+
+    def get(self, job_id: str):
+        """Return a job as a dictionary, or ``None`` if it does not exist. Abandoned jobs are failed first."""
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT * FROM tile_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and self.abandoned_reason(row) is not None:
+                self._expire_abandoned(connection, [row])
+                row = connection.execute("SELECT * FROM tile_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def create_or_join(self, key: str, tile_type: str, version: str, config, export_formats, owner_pid: int = None):
+        """
+        Create a queued job, or return the live in-flight job with the same key.
+        Abandoned jobs with the key are failed rather than joined.
+        :param owner_pid: Process whose executor will run the job; ``None`` if any worker may claim it.
+        :return: Tuple of ``(job, created)``.
+        """
+        connection = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two processes cannot
+            # both miss the in-flight lookup and enqueue duplicates.
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                "SELECT * FROM tile_jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at",
+                (key, *IN_FLIGHT_STATUSES),
+            ).fetchall()
+            alive = self._expire_abandoned(connection, rows)
+            if alive:
+                connection.execute("COMMIT")
+                return self._to_dict(alive[0]), False
+
+            job_id = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO tile_jobs (id, key, status, stage, tile_type, version, config, export_formats, created_at,"
+                " owner_pid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id, key, QUEUED, QUEUED, tile_type, version,
+                    json.dumps(dict(config), default=str), json.dumps(list(export_formats)), time.time(), owner_pid,
+                ),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+        return self.get(job_id), True
+
+    def update(self, job_id: str, **fields):
+        """Update columns of a job; JSON columns are serialised automatically."""
+        for column in _JSON_COLUMNS:
+            if column in fields and fields[column] is not None:
+                fields[column] = json.dumps(fields[column], default=str)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with closing(self._connect()) as connection:
+            connection.execute(
+                f"UPDATE tile_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+
+    def set_progress(self, job_id: str, stage: str, progress: float):
+        self.update(job_id, stage=stage, progress=progress, heartbeat_at=time.time())
+
+    def heartbeat(self, job_id: str):
+        """Renew the lease of a running job."""
+        self.update(job_id, heartbeat_at=time.time())
+
+    def claim(self, job_id: str) -> bool:
+        """
+        Atomically move a queued job to running, owned by this process.
+        :return: True if this caller now owns the job.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE tile_jobs SET status = ?, stage = ?, started_at = ?, heartbeat_at = ?, owner_pid = ?"
+                " WHERE id = ? AND status = ?",
+                (RUNNING, "starting", now, now, os.getpid(), job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def claim_next(self):
+        """
+        Claim the oldest queued job, failing abandoned running jobs on the way.
+        Queued jobs whose owner process is gone are claimed rather than failed.
+        :return: The claimed job, or ``None`` if the queue is empty.
+        """
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self._expire_abandoned(
+                connection, connection.execute("SELECT * FROM tile_jobs WHERE status = ?", (RUNNING,)).fetchall()
+            )
+            row = connection.execute(
+                "SELECT id FROM tile_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                connection.execute(
+                    "UPDATE tile_jobs SET status = ?, stage = ?, started_at = ?, heartbeat_at = ?, owner_pid = ?"
+                    " WHERE id = ?",
+                    (RUNNING, "starting", now, now, os.getpid(), row["id"]),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+        return self.get(row["id"]) if row is not None else None
+
+
+@contextmanager
+def _heartbeat(store: JobStore, job_id: str):
+    """Renew the job's lease from a background thread while the body runs."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(store.lease / 4):
+            store.heartbeat(job_id)
+
+    thread = threading.Thread(target=beat, name=f"tile-job-heartbeat-{job_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(database_path: str, job_id: str, claimed: bool = False) -> dict:
+    """
+    Execute a queued job and record its outcome. Runs inside the worker.
+    :param database_path: SQLite file holding the job.
+    :param job_id: Identifier of the job to run.
+    :param claimed: True if the caller already claimed the job.
+    :return: The final job record.
+    """
+    store = JobStore(database_path)
+    job = store.get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown tile job: {job_id}")
+
+    # Another executor (e.g. the worker pool) may have picked the job up first
+    if not claimed and not store.claim(job_id):
+        return job
+
+    try:
+        with _heartbeat(store, job_id):
+            manifest, cached = get_or_generate_tile(
+                job["config"],
+                tile_type=job["tile_type"],
+                version=job["version"],
+                export_formats=job["export_formats"],
+                progress=lambda stage, fraction: store.set_progress(job_id, stage, fraction),
+            )
+    except Exception as e:
+        store.update(
+            job_id,
+            status=FAILED,
+            stage=FAILED,
+            error=f"{e}\n{traceback.format_exc()}",
+            finished_at=time.time(),
+        )
+    else:
+        store.update(
+            job_id,
+            status=SUCCEEDED,
+            stage="done",
+            progress=1.0,
+            result={"cache_key": manifest["key"], "cached": cached, "files": manifest["paths"]},
+            finished_at=time.time(),
+        )
+    return store.get(job_id)
+
+
+def _run_executor_job(database_path: str, job_id: str) -> dict:
+    """Run a job on an executor; its threads outlive the job, so drop their database connection."""
+    try:
+        return run_job(database_path, job_id)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the lazily created local executor for the configured backend."""
+    global _executor
+    backend = getattr(settings, "TILE_JOB_BACKEND", "process")
+    if backend not in JOB_BACKENDS:
+        raise ValueError(f"Unsupported tile job backend: {backend}")
+    if backend in ("inline", "pool"):
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            max_workers = getattr(settings, "TILE_JOB_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+            if backend == "process":
+                _executor = ProcessPoolExecutor(max_workers=max_workers)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-job")
+        return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """Stop the local executor (it is recreated on the next submit)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def submit_tile_job(config, tile_type: str, version: str = "v1.0", export_formats=None):
+    """
+    Queue a tile for generation, coalescing identical in-flight requests.
+    :param config: Resolved tile configuration.
+    :param tile_type: Name used for the exported files.
+    :param version: Version label used for the exported files.
+    :param export_formats: Formats to export (defaults to the config's list).
+    :return: Tuple of ``(job, created)``; ``created`` is False when the request
+             joined an existing job.
+    """
+    if export_formats is None:
+        export_formats = config.get("export_formats", ["step", "stl"])
+    export_formats = list(export_formats)
+
+    database_path = get_job_database_path()
+    store = JobStore(database_path)
+    key = artifact_key(config, tile_type, version, export_formats)
+    # Local backends run the job in this process's executor; pool jobs belong to whichever worker claims them
+    owner_pid = None if getattr(settings, "TILE_JOB_BACKEND", "process") == "pool" else os.getpid()
+    job, created = store.create_or_join(key, tile_type, version, config, export_formats, owner_pid=owner_pid)
+    if not created:
+        return job, False
+
+    executor = get_executor()
+    if executor is None:
+        if getattr(settings, "TILE_JOB_BACKEND", "process") == "pool":
+            return job, True
+        return run_job(database_path, job["id"]), True
+
+    try:
+        executor.submit(_run_executor_job, database_path, job["id"])
+    except Exception as e:
+        store.update(job["id"], status=FAILED, stage=FAILED, error=str(e), finished_at=time.time())
+    return store.get(job["id"]), True
+
+
+def get_tile_job(job_id: str):
+    """Return the record of a job, or ``None`` if it does not exist."""
+    return JobStore(get_job_database_path()).get(job_id)
@@ -0,0 +1,95 @@
+"""
+lod.py - Handles level-of-detail variants of tiles.
+
+The ``lod`` configuration key selects how much geometry a tile carries:
+
+* ``0`` (``full``): chamfered bricks, the default;
+* ``1`` (``box``): plain boxes without chamfers (track tiles drop their chairs);
+* ``2`` (``slab``): one box covering the whole tile. For brick tiles the
+  assembly carries a mortar-line hint (course height and joint positions) so
+  a viewer can draw the bond with a texture or normal map.
+
+Each level is an ordinary configuration value, so every level is cached and
+served like any other tile. Nothing here imports CadQuery until a slab is built.
+"""
+
+from resources.helpers.brick_layout import brick_row_layout, brick_tile_placements, row_layout_key
+
+LOD_LEVELS = ("full", "box", "slab")
+FULL_LOD, BOX_LOD, SLAB_LOD = range(len(LOD_LEVELS))
+
+
+def lod_level(config) -> int:
+    """Return the level of detail of a configuration."""
+    return config.get("lod", FULL_LOD)
+
+
+def tile_extent(config) -> tuple:
+    """
+    Return the axis-aligned extent of a tile at full detail without building it.
+    :return: Tuple of ``(min, max)`` corners, each ``(x, y, z)``.
+    :raises ValueError: If the tile type is not supported.
+    """
+    tile_type = config["tile_type"]
+    if tile_type == "bricks":
+        half_height = config["brick_height"] / 2
+        half_lengths = {"full": config["brick_length"] / 2, "half": config["brick_length"] / 4}
+        placements = brick_tile_placements(config)
+        x_min = min(x - half_lengths[kind] for kind, (x, _, _) in placements)
+        x_max = max(x + half_lengths[kind] for kind, (x, _, _) in placements)
+        z_max = (config["row_repetition"] - 1) * config["brick_height"] + half_height
+        return (x_min, -config["brick_width"] / 2, -half_height), (x_max, config["brick_width"] / 2, z_max)
+    if tile_type == "plain_track":
+        height = config["track_height"] + config["chair_height"] + config["rail_height"]
+        return (0.0, -config["track_width"] / 2, 0.0), (config["track_length"], config["track_width"] / 2, height)
+    raise ValueError(f"Unsupported tile type: {tile_type}")
+
+
+def mortar_hint(config):
+    """
+    Describe the mortar lines a slab stands in for, or ``None`` for tiles without bricks.
+    Row ``i`` uses ``row_joints[i % len(row_joints)]``: the X positions of its vertical joints.
+    """
+    if config["tile_type"] != "bricks":
+        return None
+    layouts = {}
+    for row_index in range(config["row_repetition"]):
+        key = row_layout_key(config, row_index)
+        if key in layouts:
+            break
+        lengths = {"full": config["brick_length"], "half": config["brick_length"] / 2}
+        layout = brick_row_layout(config, row_index)
+        # Joints sit between neighbouring bricks
+        layouts[key] = [round(x + lengths[kind] / 2, 4) for kind, x in layout[:-1]]
+    return {
+        "course_height": config["brick_height"],
+        "courses": config["row_repetition"],
+        "joint_width": 2 * config["mortar_chamfer"],
+        "bond_pattern": config.get("bond_pattern", "flemish"),
+        "row_joints": list(layouts.values()),
+    }
+
+
+def create_slab(config):
+    """Creates the single box standing in for a whole tile at the slab level."""
+    import cadquery as cq
+
+    (x_min, y_min, z_min), (x_max, y_max, z_max) = tile_extent(config)
+    return (
+        cq.Workplane("XY")
+        .box(x_max - x_min, y_max - y_min, z_max - z_min, centered=False)
+        .translate((x_min, y_min, z_min))
+    )
+
+
+def assemble_slab_tile(config):
+    """
+    Assembles a tile at the slab level.
+    :return: ``cq.Assembly`` holding the slab; ``metadata["mortar"]`` carries the mortar-line hint.
+    """
+    import cadquery as cq
+
+    hint = mortar_hint(config)
+    assembly = cq.Assembly(name="tile", metadata={"mortar": hint} if hint else None)
+    assembly.add(create_slab(config), name="slab")
+    return assembly
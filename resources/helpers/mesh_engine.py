@@ -0,0 +1,262 @@
+"""
+mesh_engine.py - Handles fast, OCC-free triangle meshes for box-based tiles.
+
+Bricks are chamfered boxes, so their tessellation is known in closed form.
+This engine builds one canonical triangle set per brick kind, tiles it over the
+placements from ``brick_layout`` with NumPy broadcasting and streams the result
+into a binary STL. No CadQuery/OCC shapes are constructed.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from resources.helpers.brick_geometry import brick_chamfer
+from resources.helpers.brick_layout import brick_tile_placements
+from resources.helpers.instrumentation import count, span
+from resources.helpers.lod import SLAB_LOD, lod_level, tile_extent
+
+# Binary STL record: normal, three vertices, attribute byte count.
+STL_DTYPE = np.dtype(
+    [
+        ("normal", "<f4", (3,)),
+        ("vertices", "<f4", (3, 3)),
+        ("attr", "<u2"),
+    ]
+)
+
+MESH_ENGINE_TILE_TYPES = ("bricks",)
+MESH_ENGINE_FORMATS = ("stl", "png")
+
+
+def _quad_triangles(quad: np.ndarray) -> np.ndarray:
+    """Triangulate a planar convex quad so both triangles face outwards."""
+    centroid = quad.mean(axis=0)
+    normal = np.cross(quad[1] - quad[0], quad[2] - quad[0])
+    if np.linalg.norm(normal) < 1e-12:
+        normal = np.cross(quad[2] - quad[0], quad[3] - quad[0])
+    normal /= np.linalg.norm(normal)
+
+    # Order the corners around the face so the fan never crosses itself
+    u = quad[0] - centroid
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+    angles = np.arctan2((quad - centroid) @ v, (quad - centroid) @ u)
+    ordered = quad[np.argsort(angles)]
+
+    triangles = np.array([ordered[[0, 1, 2]], ordered[[0, 2, 3]]])
+    # The solid is centred on the origin, so outward faces point away from it
+    if np.dot(normal, centroid) < 0:
+        triangles = triangles[:, ::-1]
+    return triangles
+
+
+def chamfered_box_triangles(length, width, height, chamfer) -> np.ndarray:
+    """
+    Returns the triangles of a box centred on the origin whose edges parallel
+    to X and Z are chamfered, matching ``create_full_brick``.
+    :return: Array of shape ``(n, 3, 3)``.
+    """
+    a, b, h, c = length / 2, width / 2, height / 2, chamfer
+    signs = (-1, 1)
+    quads = []
+
+    if c <= 0:
+        for s in signs:
+            quads.append([(s * a, sy * b, sz * h) for sy in signs for sz in signs])
+            quads.append([(sx * a, s * b, sz * h) for sx in signs for sz in signs])
+            quads.append([(sx * a, sy * b, s * h) for sx in signs for sy in signs])
+        return np.concatenate([_quad_triangles(np.array(quad, dtype=float)) for quad in quads])
+
+    # Every box corner splits into a vertex on the X/Z faces (A) and one on the Y face (B)
+    def corner_a(sx, sy, sz):
+        return (sx * a, sy * (b - c), sz * h)
+
+    def corner_b(sx, sy, sz):
+        return (sx * (a - c), sy * b, sz * (h - c))
+
+    for s in signs:
+        quads.append([corner_a(s, sy, sz) for sy in signs for sz in signs])  # X faces
+        quads.append([corner_a(sx, sy, s) for sx in signs for sy in signs])  # Z faces
+        quads.append([corner_b(sx, s, sz) for sx in signs for sz in signs])  # Y faces
+
+    for sy in signs:
+        for sz in signs:
+            # Chamfers on the edges parallel to X
+            quads.append([corner_a(sx, sy, sz) for sx in signs] + [corner_b(sx, sy, sz) for sx in signs])
+        for sx in signs:
+            # Chamfers on the edges parallel to Z
+            quads.append([corner_a(sx, sy, sz) for sz in signs] + [corner_b(sx, sy, sz) for sz in signs])
+
+    return np.concatenate([_quad_triangles(np.array(quad, dtype=float)) for quad in quads])
+
+
+def brick_prototype_triangles(config, kind) -> np.ndarray:
+    """Returns the canonical triangles for a ``"full"`` or ``"half"`` brick."""
+    length = config["brick_length"]
+    if kind == "half":
+        length = length / 2
+    elif kind != "full":
+        raise ValueError(f"Unsupported brick kind: {kind}")
+    return chamfered_box_triangles(length, config["brick_width"], config["brick_height"], brick_chamfer(config))
+
+
+def slab_triangles(config) -> np.ndarray:
+    """Returns the triangles of the single box standing in for a tile at the slab level."""
+    lower, upper = np.array(tile_extent(config), dtype=float)
+    size = upper - lower
+    return chamfered_box_triangles(*size, 0) + (lower + size / 2)
+
+
+def iter_tile_mesh(config, batch_triangles: int = None):
+    """
+    Yields the triangles of a brick tile in batches, so a caller can stream
+    them without holding the whole tile.
+    :param config: Brick tile configuration.
+    :param batch_triangles: Approximate triangles per yielded array (all bricks of a kind if ``None``).
+    :return: Iterator of ``(n, 3, 3)`` float32 arrays.
+    """
+    if lod_level(config) >= SLAB_LOD:
+        yield slab_triangles(config).astype(np.float32)
+        return
+
+    placements = brick_tile_placements(config)
+    count("bricks_placed", len(placements))
+    if not placements:
+        return
+
+    kinds = np.array([kind for kind, _ in placements])
+    offsets = np.array([offset for _, offset in placements], dtype=float)
+
+    for kind in ("full", "half"):
+        kind_offsets = offsets[kinds == kind]
+        if not len(kind_offsets):
+            continue
+        prototype = brick_prototype_triangles(config, kind)
+        step = max(1, batch_triangles // len(prototype)) if batch_triangles else len(kind_offsets)
+        for start in range(0, len(kind_offsets), step):
+            batch = kind_offsets[start:start + step]
+            # (bricks, 1, 1, 3) + (triangles, 3, 3) -> (bricks, triangles, 3, 3)
+            yield (batch[:, None, None, :] + prototype[None]).reshape(-1, 3, 3).astype(np.float32)
+
+
+def build_tile_mesh(config) -> np.ndarray:
+    """
+    Builds the triangle buffer for a whole brick tile.
+    :param config: Brick tile configuration.
+    :return: Array of shape ``(n, 3, 3)`` with all triangles of the tile.
+    """
+    meshes = list(iter_tile_mesh(config))
+    return np.concatenate(meshes) if meshes else np.empty((0, 3, 3), dtype=np.float32)
+
+
+def triangle_normals(triangles: np.ndarray) -> np.ndarray:
+    """Returns unit normals for an ``(n, 3, 3)`` triangle array."""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def write_binary_stl(file_path: str, triangles: np.ndarray, header: bytes = b"railworks mesh engine"):
+    """
+    Writes triangles to a binary STL file.
+    :param file_path: Destination path.
+    :param triangles: Array of shape ``(n, 3, 3)``.
+    :return: Number of triangles written.
+    """
+    records = np.zeros(len(triangles), dtype=STL_DTYPE)
+    records["normal"] = triangle_normals(triangles)
+    records["vertices"] = triangles
+
+    with open(file_path, "wb") as file:
+        file.write(header[:80].ljust(80, b"\0"))
+        file.write(np.uint32(len(records)).tobytes())
+        records.tofile(file)
+    return len(records)
+
+
+def supports_mesh_engine(config, export_formats) -> bool:
+    """
+    Returns True if the requested formats can be produced without B-rep geometry.
+    Fused tiles always need B-reps.
+    """
+    if config.get("mesh_engine", "auto") == "occ" or config.get("fuse_solids"):
+        return False
+    return config.get("tile_type") in MESH_ENGINE_TILE_TYPES and any(
+        fmt in MESH_ENGINE_FORMATS for fmt in export_formats
+    )
+
+
+def mesh_bounds(mesh: np.ndarray) -> dict:
+    """
+    Returns the axis-aligned bounding box of a triangle buffer, shaped like
+    ``file_helper.shape_bounds``, or ``None`` for an empty mesh.
+    """
+    vertices = mesh.reshape(-1, 3)
+    if not len(vertices):
+        return None
+    return {
+        "min": [round(float(value), 4) for value in vertices.min(axis=0)],
+        "max": [round(float(value), 4) for value in vertices.max(axis=0)],
+    }
+
+
+def export_tile_mesh(config, version="v2.0", tile_type="brick_tile", output_dir=None, tessellation=None,
+                     export_formats=("stl",)):
+    """
+    Exports a brick tile as binary STL (and/or a PNG preview) straight from its configuration.
+    Returns a manifest shaped like the one from ``export_tile``. The mesh is
+    exact for planar bricks, so the quality preset does not change it; the
+    budget is still checked and reported. STL alone is streamed in batches of
+    bricks; a preview needs the whole mesh, which is then built once for both.
+    """
+    from django.conf import settings
+
+    from resources.helpers.file_helper import atomic_output, file_entry
+    from resources.helpers.preview import write_preview
+    from resources.helpers.stl_stream import STREAM_BATCH_TRIANGLES, StlStreamWriter
+    from resources.helpers.tessellation import resolve_tessellation, triangle_limit
+
+    if tessellation is None:
+        tessellation = resolve_tessellation(config)
+
+    if output_dir is None:
+        output_dir = os.path.join(settings.MEDIA_ROOT, "resources", "tiles", tile_type, f"v{version}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    mesh = None
+    if "png" in export_formats:
+        with span("mesh.build"):
+            mesh = build_tile_mesh(config)
+    files = {}
+    for fmt in export_formats:
+        file_path = os.path.join(output_dir, f"{tile_type}_{version}.{fmt}")
+        with atomic_output(file_path) as temp_path:
+            if fmt == "png":
+                with span("export.png"):
+                    details = {**write_preview(temp_path, mesh), "bounds": mesh_bounds(mesh)}
+            else:
+                batches = [mesh] if mesh is not None else iter_tile_mesh(config, STREAM_BATCH_TRIANGLES)
+                with span("mesh.write"), StlStreamWriter(temp_path, header=b"railworks mesh engine") as writer:
+                    for batch in batches:
+                        writer.write(batch)
+                count("triangles_emitted", writer.triangles)
+                limit = triangle_limit(tessellation)
+                details = {
+                    "quality": tessellation["quality"],
+                    "tolerance": 0.0,
+                    "angular_tolerance": 0.0,
+                    "triangles": writer.triangles,
+                    "budget_met": limit is None or writer.triangles <= limit,
+                    "bounds": writer.bounds,
+                }
+        print(f"✅ {fmt.upper()} file exported to: {file_path}")
+        files[fmt] = {**file_entry(file_path, time.perf_counter() - started), **details}
+
+    return {
+        "output_dir": output_dir,
+        "seconds": round(time.perf_counter() - started, 4),
+        "files": files,
+    }
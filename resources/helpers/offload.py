@@ -0,0 +1,153 @@
+"""
+offload.py - Handles running CPU-bound tile work off the event loop.
+
+Async API handlers hand geometry work (assembly, fusion, export) to a bounded
+thread pool instead of running it on the event loop, so cheap endpoints stay
+responsive while tiles are generated. At most ``TILE_OFFLOAD_WORKERS`` calls
+run and ``TILE_OFFLOAD_QUEUE`` wait; beyond that ``offload`` raises
+``Saturated`` at once, which the API answers with ``429 Too Many Requests``
+and a ``Retry-After`` estimated from recent run times.
+
+The pool uses threads rather than processes so a generation shares this
+process's build graph, prototype registry and tile cache. Work that should
+leave the web process entirely goes through the job queue (``/jobs/``).
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from resources.helpers.instrumentation import count
+
+DEFAULT_RETRY_AFTER = 1  # seconds, until a run time has been observed
+EWMA_WEIGHT = 0.2  # weight of the latest run in the average run time
+
+_executor = None
+_lock = threading.Lock()
+_state = {"in_flight": 0, "completed": 0, "rejected": 0, "average_seconds": None}
+
+
+class Saturated(RuntimeError):
+    """Raised when the offload executor cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"❌ Tile generation is at capacity; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def offload_limits() -> tuple:
+    """Return ``(workers, queue)``: concurrent runs and extra calls allowed to wait."""
+    workers = getattr(settings, "TILE_OFFLOAD_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+    queue = getattr(settings, "TILE_OFFLOAD_QUEUE", 2 * workers)
+    return workers, queue
+
+
+def get_offload_executor() -> ThreadPoolExecutor:
+    """Return the lazily created offload executor."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=offload_limits()[0], thread_name_prefix="tile-offload")
+        return _executor
+
+
+def shutdown_offload_executor(wait: bool = True):
+    """Stop the offload executor (it is recreated on the next call)."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def _retry_after() -> int:
+    # Callers hold _lock. Every queued call waits for the runs ahead of it.
+    workers, _ = offload_limits()
+    average = _state["average_seconds"]
+    if average is None:
+        return DEFAULT_RETRY_AFTER
+    return max(DEFAULT_RETRY_AFTER, math.ceil(average * math.ceil(_state["in_flight"] / workers)))
+
+
+def _admit():
+    workers, queue = offload_limits()
+    with _lock:
+        if _state["in_flight"] >= workers + queue:
+            _state["rejected"] += 1
+            count("offload_rejected")
+            raise Saturated(_retry_after())
+        _state["in_flight"] += 1
+
+
+def _release(seconds: float = None):
+    with _lock:
+        _state["in_flight"] -= 1
+        if seconds is None:
+            return
+        _state["completed"] += 1
+        average = _state["average_seconds"]
+        _state["average_seconds"] = seconds if average is None else (1 - EWMA_WEIGHT) * average + EWMA_WEIGHT * seconds
+
+
+def _run(func, args, kwargs):
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Pool threads outlive the call; do not keep its database connection open
+        close_old_connections()
+        _release(time.perf_counter() - started)
+
+
+def submit_offload(func, *args, **kwargs) -> Future:
+    """
+    Admit a blocking call to the bounded executor and return its future without waiting.
+    Admission happens here, so callers can answer 429 before they start a response.
+    The call runs in a copy of the current context, so its spans join the request's trace.
+    :raises Saturated: If every worker is busy and the queue is full.
+    """
+    _admit()
+    try:
+        future = get_offload_executor().submit(contextvars.copy_context().run, _run, func, args, kwargs)
+    except Exception:
+        _release()
+        raise
+    # A call cancelled while still queued never reaches _run
+    future.add_done_callback(lambda done: _release() if done.cancelled() else None)
+    return future
+
+
+async def offload(func, *args, **kwargs):
+    """
+    Run a blocking function on the bounded executor and await its result.
+    :raises Saturated: If every worker is busy and the queue is full.
+    """
+    return await asyncio.wrap_future(submit_offload(func, *args, **kwargs))
+
+
+def offload_stats() -> dict:
+    """Return the executor's limits, load and counters."""
+    workers, queue = offload_limits()
+    with _lock:
+        average = _state["average_seconds"]
+        return {
+            "workers": workers,
+            "queue": queue,
+            "in_flight": _state["in_flight"],
+            "completed": _state["completed"],
+            "rejected": _state["rejected"],
+            "average_seconds": None if average is None else round(average, 4),
+        }
+
+
+def reset_offload_stats():
+    """Reset the counters (mainly for tests); calls in flight are still tracked."""
+    with _lock:
+        _state.update(completed=0, rejected=0, average_seconds=None)
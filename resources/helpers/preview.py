@@ -0,0 +1,208 @@
+"""
+preview.py - Handles headless PNG previews of tiles.
+
+Previews are rendered on the CPU with NumPy: the tessellated tile is projected
+orthographically (isometric by default), rasterized with a depth buffer and
+flat-shaded by face normal. No GPU, display or imaging library is needed; the
+PNG is encoded with ``zlib``.
+
+A preview is an ordinary export format (``png``), so it is cached and served
+like every other artifact. Brick tiles are meshed by the mesh engine; other
+tiles are tessellated once per prototype at the ``draft`` preset.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+from resources.helpers.instrumentation import count, span
+
+PREVIEW_SIZE = 256  # pixels, square
+PREVIEW_VIEW = "isometric"
+PREVIEW_QUALITY = "draft"
+SUPERSAMPLE = 2
+
+# View direction (from the tile towards the camera) and the world axis that points up on screen
+PREVIEW_VIEWS = {
+    "isometric": ((1.0, -1.0, 1.0), (0.0, 0.0, 1.0)),
+    "top": ((0.0, 0.0, 1.0), (0.0, 1.0, 0.0)),
+    "front": ((0.0, -1.0, 0.0), (0.0, 0.0, 1.0)),
+}
+
+BASE_COLOR = np.array([178.0, 98.0, 72.0])  # brick red
+AMBIENT = 0.35
+MARGIN = 0.05  # fraction of the image left empty on each side
+
+# Upper bound on candidate (triangle, pixel) pairs tested at once
+RASTER_CHUNK = 1 << 21
+
+
+def view_basis(view: str = PREVIEW_VIEW) -> np.ndarray:
+    """
+    Return the camera basis of a view.
+    :return: ``(3, 3)`` array whose rows are the screen right, screen up and towards-camera axes.
+    :raises ValueError: If the view is unknown.
+    """
+    if view not in PREVIEW_VIEWS:
+        raise ValueError(f"Unsupported preview view: {view} (expected one of {', '.join(PREVIEW_VIEWS)})")
+    direction, up = (np.array(vector) for vector in PREVIEW_VIEWS[view])
+    back = direction / np.linalg.norm(direction)
+    right = np.cross(up, back)
+    right /= np.linalg.norm(right)
+    return np.stack([right, np.cross(back, right), back])
+
+
+def _shade(triangles: np.ndarray, basis: np.ndarray) -> np.ndarray:
+    """Lambert intensity per triangle, lit from the upper left of the camera; faces are two-sided."""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    light = -0.4 * basis[0] + 0.6 * basis[1] + basis[2]
+    light /= np.linalg.norm(light)
+    return AMBIENT + (1 - AMBIENT) * np.abs(normals @ light)
+
+
+def rasterize(triangles: np.ndarray, size: int = PREVIEW_SIZE, view: str = PREVIEW_VIEW,
+              supersample: int = SUPERSAMPLE) -> np.ndarray:
+    """
+    Render triangles into an RGBA image with a transparent background.
+    The tile is scaled to fill the image, keeping its aspect ratio.
+    :param triangles: Array of shape ``(n, 3, 3)``.
+    :param size: Width and height of the image in pixels.
+    :param supersample: Samples per pixel along each axis (anti-aliasing).
+    :return: ``(size, size, 4)`` array of ``uint8``.
+    :raises ValueError: If the view is unknown or there is nothing to render.
+    """
+    triangles = np.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+    if not len(triangles):
+        raise ValueError("Tile has no geometry to render")
+    basis = view_basis(view)
+    resolution = size * supersample
+
+    # Orthographic projection into pixel coordinates; larger depth is nearer the camera
+    projected = triangles @ basis.T
+    lower = projected[..., :2].reshape(-1, 2).min(axis=0)
+    upper = projected[..., :2].reshape(-1, 2).max(axis=0)
+    scale = resolution * (1 - 2 * MARGIN) / max(float((upper - lower).max()), 1e-9)
+    centre = (lower + upper) / 2
+    xs = (projected[..., 0] - centre[0]) * scale + resolution / 2
+    ys = resolution / 2 - (projected[..., 1] - centre[1]) * scale
+    depths = projected[..., 2]
+
+    # Pixel centres sit at +0.5; each triangle only tests the pixels of its bounding box
+    x_min = np.clip(np.ceil(xs.min(axis=1) - 0.5), 0, resolution).astype(np.int64)
+    x_max = np.clip(np.floor(xs.max(axis=1) - 0.5), -1, resolution - 1).astype(np.int64)
+    y_min = np.clip(np.ceil(ys.min(axis=1) - 0.5), 0, resolution).astype(np.int64)
+    y_max = np.clip(np.floor(ys.max(axis=1) - 0.5), -1, resolution - 1).astype(np.int64)
+    widths = np.maximum(x_max - x_min + 1, 0)
+    areas = widths * np.maximum(y_max - y_min + 1, 0)
+    doubled_area = (xs[:, 1] - xs[:, 0]) * (ys[:, 2] - ys[:, 0]) - (xs[:, 2] - xs[:, 0]) * (ys[:, 1] - ys[:, 0])
+    visible = np.flatnonzero((areas > 0) & (np.abs(doubled_area) > 1e-12))
+
+    depth_buffer = np.full(resolution * resolution, -np.inf)
+    face_buffer = np.full(resolution * resolution, -1, dtype=np.int64)
+    with span("preview.rasterize"):
+        for chunk in _chunks(visible, areas):
+            counts = areas[chunk]
+            faces = np.repeat(chunk, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            px = x_min[faces] + offsets % widths[faces]
+            py = y_min[faces] + offsets // widths[faces]
+            sx, sy = px + 0.5, py + 0.5
+
+            # Barycentric weights from edge functions; the signed area makes both windings work
+            x, y = xs[faces], ys[faces]
+            w0 = ((x[:, 1] - sx) * (y[:, 2] - sy) - (x[:, 2] - sx) * (y[:, 1] - sy)) / doubled_area[faces]
+            w1 = ((x[:, 2] - sx) * (y[:, 0] - sy) - (x[:, 0] - sx) * (y[:, 2] - sy)) / doubled_area[faces]
+            w2 = 1 - w0 - w1
+            inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+            z = depths[faces, 0] * w0 + depths[faces, 1] * w1 + depths[faces, 2] * w2
+
+            pixels, faces, z = (py * resolution + px)[inside], faces[inside], z[inside]
+            # Nearest sample per pixel within the chunk, then against the buffer
+            order = np.lexsort((-z, pixels))
+            pixels, faces, z = pixels[order], faces[order], z[order]
+            first = np.ones(len(pixels), dtype=bool)
+            first[1:] = pixels[1:] != pixels[:-1]
+            pixels, faces, z = pixels[first], faces[first], z[first]
+            nearer = z > depth_buffer[pixels]
+            depth_buffer[pixels[nearer]] = z[nearer]
+            face_buffer[pixels[nearer]] = faces[nearer]
+    count("preview_triangles", len(visible))
+
+    covered = face_buffer >= 0
+    samples = np.zeros((resolution * resolution, 4))
+    samples[covered, :3] = BASE_COLOR * _shade(triangles, basis)[face_buffer[covered], None]
+    samples[covered, 3] = 1.0
+
+    # Average each block of samples; colours are weighted by coverage so edges fade into the background
+    blocks = samples.reshape(size, supersample, size, supersample, 4).mean(axis=(1, 3))
+    alpha = blocks[..., 3:]
+    rgb = np.divide(blocks[..., :3], alpha, out=np.zeros_like(blocks[..., :3]), where=alpha > 0)
+    return np.round(np.concatenate([rgb, alpha * 255], axis=-1)).clip(0, 255).astype(np.uint8)
+
+
+def _chunks(faces: np.ndarray, areas: np.ndarray):
+    """Split faces into runs whose bounding boxes cover at most ``RASTER_CHUNK`` pixels (one face minimum)."""
+    start = 0
+    cumulative = np.cumsum(areas[faces])
+    while start < len(faces):
+        offset = cumulative[start - 1] if start else 0
+        end = max(int(np.searchsorted(cumulative, offset + RASTER_CHUNK, side="right")), start + 1)
+        yield faces[start:end]
+        start = end
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode an ``(h, w, 4)`` ``uint8`` RGBA image as PNG."""
+    height, width, _ = image.shape
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    # Filter type 0 (none) at the start of every scanline
+    scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_preview(file_path: str, triangles: np.ndarray, size: int = PREVIEW_SIZE, view: str = PREVIEW_VIEW) -> dict:
+    """
+    Render triangles and write them as a PNG.
+    :return: Export details (image size, view and triangle count).
+    """
+    image = rasterize(triangles, size=size, view=view)
+    with span("preview.encode"):
+        data = encode_png(image)
+    with open(file_path, "wb") as file:
+        file.write(data)
+    return {"width": size, "height": size, "view": view, "triangles": len(triangles)}
+
+
+def tile_triangles(tile, quality: str = PREVIEW_QUALITY) -> np.ndarray:
+    """
+    Return every triangle of an assembled tile in tile space.
+    Each prototype is tessellated once and copied to its placements.
+    :return: Array of shape ``(n, 3, 3)``.
+    """
+    from resources.helpers.instanced_export import build_prototypes
+
+    placed = []
+    for positions, indices, transforms in build_prototypes(tile, quality):
+        corners = positions[indices]
+        for transform in transforms:
+            placed.append(corners @ transform[:3, :3].T + transform[:3, 3])
+    return np.concatenate(placed) if placed else np.empty((0, 3, 3))
+
+
+def export_png(tile, file_path: str) -> dict:
+    """
+    Export a PNG preview of an assembled tile (or a bare shape).
+    :return: Export details (image size, view and triangle count).
+    """
+    return write_preview(file_path, tile_triangles(tile))
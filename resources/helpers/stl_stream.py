@@ -0,0 +1,168 @@
+"""
+stl_stream.py - Handles streaming binary STL export.
+
+Writing an STL used to mean building the compound of the whole tile, meshing
+it and letting OCC write the mesh from memory, so peak memory grew with the
+tile. The streaming writer appends facet records to the file as they are
+produced and patches the triangle count into the header once it is known:
+
+* assemblies are walked lazily (see ``instanced_export.iter_instances``);
+  each prototype is tessellated once and written at every placement;
+* brick tiles on the mesh engine stream their placements directly.
+
+Records are written in batches of ``STREAM_BATCH_TRIANGLES``, so memory is
+bounded by the prototype meshes and one batch per prototype, whatever the
+tile size; placements are never collected up front.
+"""
+
+import numpy as np
+
+from resources.helpers.instrumentation import count, span
+from resources.helpers.mesh_engine import STL_DTYPE, triangle_normals
+from resources.helpers.tessellation import (
+    STL_HEADER_BYTES,
+    TESSELLATION_PRESETS,
+    candidate_qualities,
+    triangle_limit,
+)
+
+STREAM_BATCH_TRIANGLES = 1 << 16
+STREAM_BUFFER_BYTES = 1 << 20
+
+
+class StlStreamWriter:
+    """
+    Binary STL file written incrementally.
+    Use as a context manager; the triangle count is patched into the header on
+    a clean exit. Tracks the bounds of everything written.
+    """
+
+    def __init__(self, file_path: str, header: bytes = b"railworks stream"):
+        self.file_path = file_path
+        self.header = header[:80].ljust(80, b"\0")
+        self.triangles = 0
+        self._lower = None
+        self._upper = None
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.file_path, "wb", buffering=STREAM_BUFFER_BYTES)
+        self._file.write(self.header)
+        # Placeholder; the real count is only known at the end
+        self._file.write(np.uint32(0).tobytes())
+        return self
+
+    def write(self, triangles: np.ndarray):
+        """Append an ``(n, 3, 3)`` array of triangles."""
+        if not len(triangles):
+            return
+        records = np.zeros(len(triangles), dtype=STL_DTYPE)
+        records["normal"] = triangle_normals(triangles)
+        records["vertices"] = triangles
+        records.tofile(self._file)
+        self.triangles += len(records)
+
+        vertices = records["vertices"].reshape(-1, 3)
+        lower, upper = vertices.min(axis=0), vertices.max(axis=0)
+        self._lower = lower if self._lower is None else np.minimum(self._lower, lower)
+        self._upper = upper if self._upper is None else np.maximum(self._upper, upper)
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type is None:
+                self._file.seek(STL_HEADER_BYTES - 4)
+                self._file.write(np.uint32(self.triangles).tobytes())
+        finally:
+            self._file.close()
+        return False
+
+    @property
+    def bounds(self):
+        """Bounds of the written triangles, shaped like ``mesh_engine.mesh_bounds``, or ``None``."""
+        if self._lower is None:
+            return None
+        return {
+            "min": [round(float(value), 4) for value in self._lower],
+            "max": [round(float(value), 4) for value in self._upper],
+        }
+
+
+def iter_instance_triangles(tile, meshes: dict, batch: int = STREAM_BATCH_TRIANGLES):
+    """
+    Yield the placed triangles of a tile, a batch at a time, walking its placements lazily.
+    Placements are buffered per prototype and placed once a batch is full, so at most
+    one batch per prototype is held, never every placement of the tile.
+    :param tile: ``cq.Assembly``, or a bare shape.
+    :param meshes: Mapping of prototype key to its ``(t, 3, 3)`` triangle corners,
+                   from ``choose_prototype_tessellation``.
+    :param batch: Approximate number of triangles per yielded array (at least one placement).
+    """
+    from resources.helpers.instanced_export import iter_instances
+
+    pending = {}
+
+    def place(key):
+        group = np.array(pending.pop(key))
+        # (placements, 3, 3) rotations applied to (triangles, 3, 3) corners, then translated
+        placed = np.einsum("pij,tvj->ptvi", group[:, :3, :3], meshes[key]) + group[:, None, None, :3, 3]
+        return placed.reshape(-1, 3, 3)
+
+    for key, _shape, transform in iter_instances(tile):
+        if key not in meshes:
+            continue
+        transforms = pending.setdefault(key, [])
+        transforms.append(transform)
+        if (len(transforms) + 1) * len(meshes[key]) > batch:
+            yield place(key)
+    for key in list(pending):
+        yield place(key)
+
+
+def choose_prototype_tessellation(prototypes: list, options: dict):
+    """
+    Tessellate prototypes at the finest allowed preset whose placed triangles fit the budget.
+    The count is known from the prototype meshes, so nothing is written until a preset fits.
+    :param prototypes: Result of ``instanced_export.count_instances``.
+    :param options: Result of ``resolve_tessellation``.
+    :return: Tuple of ``(meshes, chosen)``: triangle corners per prototype key, and a
+             ``chosen`` dictionary matching ``choose_tessellation``.
+    """
+    from resources.helpers.instanced_export import tessellate_prototype
+
+    limit = triangle_limit(options)
+    candidates = candidate_qualities(options["quality"])
+    if limit is None:
+        candidates = candidates[:1]
+
+    for quality in candidates:
+        preset = TESSELLATION_PRESETS[quality]
+        meshes = {}
+        triangles = 0
+        for key, shape, placements in prototypes:
+            positions, indices = tessellate_prototype(shape, quality)
+            if len(indices):
+                meshes[key] = positions[indices]
+                triangles += len(indices) * placements
+        if limit is None or triangles <= limit:
+            return meshes, {"quality": quality, **preset, "triangles": triangles, "budget_met": True}
+
+    # Nothing fits: keep the coarsest mesh and report the overrun
+    return meshes, {"quality": quality, **preset, "triangles": triangles, "budget_met": False}
+
+
+def stream_tile_stl(tile, file_path: str, tessellation: dict) -> dict:
+    """
+    Write a tile as binary STL without building its compound or collecting its placements.
+    :param tile: ``cq.Assembly``, or a bare shape (e.g. a fused tile).
+    :param tessellation: Options from ``resolve_tessellation``.
+    :return: Chosen ``quality``, tolerances, ``triangles``, ``budget_met`` and ``bounds``.
+    """
+    from resources.helpers.instanced_export import count_instances
+
+    with span("stl.tessellate"):
+        meshes, chosen = choose_prototype_tessellation(count_instances(tile), tessellation)
+    count("triangles_emitted", chosen["triangles"])
+    with span("stl.write"), StlStreamWriter(file_path) as writer:
+        for triangles in iter_instance_triangles(tile, meshes):
+            writer.write(triangles)
+    return {**chosen, "bounds": writer.bounds}
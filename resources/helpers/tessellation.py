@@ -0,0 +1,107 @@
+"""
+tessellation.py - Handles STL tessellation quality presets and size budgets.
+
+Presets trade mesh fidelity for file size. When a triangle or byte budget is
+given, the exporter starts at the requested preset and steps to coarser ones
+until the mesh fits, so the result is the most detailed mesh within budget.
+"""
+
+# Ordered from coarsest to finest.
+TESSELLATION_PRESETS = {
+    "draft": {"tolerance": 1.0, "angular_tolerance": 0.5},
+    "print": {"tolerance": 0.1, "angular_tolerance": 0.1},
+    "archive": {"tolerance": 0.01, "angular_tolerance": 0.05},
+}
+DEFAULT_QUALITY = "print"
+
+STL_HEADER_BYTES = 84
+STL_TRIANGLE_BYTES = 50
+
+
+def stl_size(triangles: int) -> int:
+    """Return the size in bytes of a binary STL with ``triangles`` facets."""
+    return STL_HEADER_BYTES + STL_TRIANGLE_BYTES * triangles
+
+
+def resolve_tessellation(config=None, quality=None, max_triangles=None, max_bytes=None) -> dict:
+    """
+    Combine explicit options with the ``stl_quality``, ``stl_max_triangles``
+    and ``stl_max_bytes`` configuration keys.
+    ``mesh_quantize`` adds ``"quantize": True`` (compact GLB vertex buffers).
+    :return: Dictionary with ``quality``, ``max_triangles`` and ``max_bytes``.
+    :raises ValueError: If the quality preset is unknown.
+    """
+    config = config or {}
+    quality = quality or config.get("stl_quality", DEFAULT_QUALITY)
+    if quality not in TESSELLATION_PRESETS:
+        raise ValueError(
+            f"Unsupported tessellation quality: {quality} (expected one of {', '.join(TESSELLATION_PRESETS)})"
+        )
+    options = {
+        "quality": quality,
+        "max_triangles": max_triangles if max_triangles is not None else config.get("stl_max_triangles"),
+        "max_bytes": max_bytes if max_bytes is not None else config.get("stl_max_bytes"),
+    }
+    if config.get("mesh_quantize"):
+        options["quantize"] = True
+    return options
+
+
+def triangle_limit(options: dict):
+    """Return the triangle budget implied by the options, or ``None`` if unbounded."""
+    limits = []
+    if options.get("max_triangles") is not None:
+        limits.append(int(options["max_triangles"]))
+    if options.get("max_bytes") is not None:
+        limits.append((int(options["max_bytes"]) - STL_HEADER_BYTES) // STL_TRIANGLE_BYTES)
+    return min(limits) if limits else None
+
+
+def candidate_qualities(quality: str) -> list:
+    """Return the requested preset followed by every coarser one."""
+    names = list(TESSELLATION_PRESETS)
+    return list(reversed(names[: names.index(quality) + 1]))
+
+
+def mesh_shape(shape, tolerance: float, angular_tolerance: float) -> int:
+    """
+    Replace the triangulation of an OCC shape and return its triangle count.
+    Existing (possibly finer) triangulations are discarded first, otherwise
+    OCC would silently reuse them.
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.BRepTools import BRepTools
+    from OCP.TopLoc import TopLoc_Location
+
+    BRepTools.Clean_s(shape.wrapped)
+    BRepMesh_IncrementalMesh(shape.wrapped, tolerance, True, angular_tolerance, True)
+
+    triangles = 0
+    for face in shape.Faces():
+        triangulation = BRep_Tool.Triangulation_s(face.wrapped, TopLoc_Location())
+        if triangulation is not None:
+            triangles += triangulation.NbTriangles()
+    return triangles
+
+
+def choose_tessellation(shape, options: dict) -> dict:
+    """
+    Mesh ``shape`` at the finest allowed preset that fits the budget.
+    :param shape: CadQuery shape (usually the tile compound).
+    :param options: Result of ``resolve_tessellation``.
+    :return: Chosen ``quality``, tolerances, ``triangles`` and ``budget_met``.
+    """
+    limit = triangle_limit(options)
+    candidates = candidate_qualities(options["quality"])
+    if limit is None:
+        candidates = candidates[:1]
+
+    for quality in candidates:
+        preset = TESSELLATION_PRESETS[quality]
+        triangles = mesh_shape(shape, preset["tolerance"], preset["angular_tolerance"])
+        if limit is None or triangles <= limit:
+            return {"quality": quality, **preset, "triangles": triangles, "budget_met": True}
+
+    # Nothing fits: keep the coarsest mesh and report the overrun
+    return {"quality": quality, **preset, "triangles": triangles, "budget_met": False}
@@ -4,19 +4,40 @@ tile_assembly.py - Assembles full tile structures dynamically.
 
 import cadquery as cq
 from resources.helpers.brick_helpers import assemble_brick_row
+from resources.helpers.brick_layout import row_layout_key
+from resources.helpers.instrumentation import count, timed
+from resources.helpers.lod import SLAB_LOD, assemble_slab_tile, lod_level
+from resources.helpers.track_geometry import assemble_plain_track_tile
 
-def assemble_tile(config):
+@timed("assembly.tile")
+def assemble_tile(config, row_builder=assemble_brick_row):
     """
     Assembles a full tile using the selected tile type.
+    :param row_builder: ``callable(config, row_index)`` returning a row assembly;
+                        lets callers supply memoized rows (brick tiles only).
     """
     tile_type = config["tile_type"]
     tile_assembly = cq.Assembly()
     
-    if tile_type == "bricks":
+    if lod_level(config) >= SLAB_LOD:
+        # Overviews stand in a single box for the whole tile
+        tile_assembly = assemble_slab_tile(config)
+    elif tile_type == "bricks":
+        # Build each distinct row layout once and place it by reference
+        row_templates = {}
         for i in range(config["row_repetition"]):
-            row_assembly = assemble_brick_row(config, i)
+            layout_key = row_layout_key(config, i)
+            if layout_key not in row_templates:
+                row_templates[layout_key] = row_builder(config, i)
             z_offset = i * config["brick_height"]
-            tile_assembly.add(row_assembly, loc=cq.Location(cq.Vector(0, 0, z_offset)))
+            tile_assembly.add(
+                row_templates[layout_key],
+                loc=cq.Location(cq.Vector(0, 0, z_offset)),
+                name=f"row_{i}",
+            )
+            count("bricks_placed", len(row_templates[layout_key].children))
+    elif tile_type == "plain_track":
+        tile_assembly = assemble_plain_track_tile(config)
     else:
         raise ValueError(f"Unsupported tile type: {tile_type}")
 
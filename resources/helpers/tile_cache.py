@@ -0,0 +1,341 @@
+"""
+tile_cache.py - Handles content-addressed caching of generated tile artifacts.
+
+Artifacts are stored under ``MEDIA_ROOT/resources/tiles/cache/<key>/`` where the
+key is a hash of the resolved configuration and the geometry version. Repeated
+requests for an identical configuration are served straight from disk instead
+of rebuilding the CadQuery assembly and re-exporting it.
+
+Misses are single-flight: the first request for a key builds it under
+``artifact_lock``, concurrent requests (in any process sharing MEDIA_ROOT)
+wait and are then served the leader's files. Files and manifests are written
+to temporary names and renamed into place, so readers never see partial files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from django.conf import settings
+
+from resources.helpers.artifact_lock import artifact_lock
+from resources.helpers.artifact_index import forget_artifacts, record_artifact, record_use, usage_counts
+from resources.helpers.downloads import file_digest, precompress
+from resources.helpers.file_helper import atomic_output
+from resources.helpers.instrumentation import span
+from resources.helpers.tessellation import resolve_tessellation
+
+# Bump whenever geometry or export code changes the produced files, so stale
+# artifacts stop matching new requests.
+GEOMETRY_VERSION = "4"
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+DEFAULT_MAX_ENTRIES = 512
+# Entries used at least this often are only evicted once all one-hit entries are gone.
+PROTECTED_USES = 2
+MANIFEST_NAME = "manifest.json"
+
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(counter: str, amount: int = 1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def cache_stats() -> dict:
+    """
+    Return the in-process hit/miss/eviction counters.
+    ``coalesced`` counts hits found under the build lock, i.e. built concurrently.
+    :return: Dictionary of counters plus the derived hit rate.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """Reset the in-process counters (mainly for tests)."""
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def get_cache_root() -> str:
+    """Return the directory that holds all cached tile artifacts."""
+    return os.path.join(settings.MEDIA_ROOT, "resources", "tiles", "cache")
+
+
+def config_fingerprint(config, **extra) -> str:
+    """
+    Compute a canonical hash for a resolved tile configuration.
+    :param config: Resolved tile configuration.
+    :param extra: Additional values that change the produced artifacts.
+    :return: Hex digest identifying the configuration.
+    """
+    payload = {
+        "geometry_version": GEOMETRY_VERSION,
+        "config": dict(config),
+        "extra": extra,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def artifact_key(config, tile_type: str, version: str, export_formats, tessellation=None) -> str:
+    """
+    Return the cache key for the artifacts of one generate request.
+    :param config: Resolved tile configuration.
+    :param tile_type: Name used for the exported files.
+    :param version: Version label used for the exported files.
+    :param export_formats: Formats to export.
+    :param tessellation: STL options (defaults to those in the config).
+    """
+    if tessellation is None:
+        tessellation = resolve_tessellation(config)
+    return config_fingerprint(
+        config,
+        tile_type=tile_type,
+        version=version,
+        export_formats=list(export_formats),
+        tessellation=tessellation,
+    )
+
+
+def _read_manifest(entry_dir: str):
+    manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    # An entry is only usable if every artifact it lists is still present.
+    for file_name in manifest.get("files", {}).values():
+        if not os.path.exists(os.path.join(entry_dir, file_name)):
+            return None
+    return manifest
+
+
+def _write_manifest(entry_dir: str, manifest: dict):
+    with atomic_output(os.path.join(entry_dir, MANIFEST_NAME)) as temp_path, open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def _touch(entry_dir: str):
+    """Record an access; the manifest mtime drives LRU eviction."""
+    try:
+        os.utime(os.path.join(entry_dir, MANIFEST_NAME))
+    except OSError:
+        pass
+
+
+def _entry_size(entry_dir: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(entry_dir):
+        for file_name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass
+    return total
+
+
+def _list_entries(cache_root: str, manifest_name: str = MANIFEST_NAME) -> list:
+    """Return ``(last_access, size, path)`` for every entry directory under ``cache_root``."""
+    entries = []
+    if not os.path.isdir(cache_root):
+        return entries
+    for name in os.listdir(cache_root):
+        entry_dir = os.path.join(cache_root, name)
+        if not os.path.isdir(entry_dir):
+            continue
+        try:
+            last_access = os.path.getmtime(os.path.join(entry_dir, manifest_name))
+        except OSError:
+            # No manifest yet: possibly being built right now, so age it by the directory
+            last_access = os.path.getmtime(entry_dir)
+        entries.append((last_access, _entry_size(entry_dir), entry_dir))
+    return entries
+
+
+def evict_entries(root: str, max_bytes: int, max_entries: int, keep=(), manifest_name: str = MANIFEST_NAME,
+                  usage=None) -> list:
+    """
+    Delete entry directories under ``root``, least recently used first, until they fit the limits.
+    The manifest's mtime is an entry's last access.
+    :param usage: Optional ``usage(names) -> {name: uses}``; entries used at least
+                  ``PROTECTED_USES`` times are only evicted after all others.
+    :param keep: Entry names that must not be evicted.
+    :return: Names of the evicted entries.
+    """
+    entries = _list_entries(root, manifest_name)
+    total_bytes = sum(size for _, size, _ in entries)
+    if total_bytes <= max_bytes and len(entries) <= max_entries:
+        return []
+
+    uses = usage(os.path.basename(entry_dir) for _, _, entry_dir in entries) if usage else {}
+    entries.sort(key=lambda entry: (
+        uses.get(os.path.basename(entry[2]), 1) >= PROTECTED_USES,
+        entry[0],
+    ))
+    evicted = []
+
+    for _last_access, size, entry_dir in entries:
+        if total_bytes <= max_bytes and len(entries) - len(evicted) <= max_entries:
+            break
+        if os.path.basename(entry_dir) in keep:
+            continue
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_bytes -= size
+        evicted.append(os.path.basename(entry_dir))
+    return evicted
+
+
+def evict(max_bytes: int = None, max_entries: int = None, keep=()) -> int:
+    """
+    Evict entries until the cache fits the limits.
+    Entries used fewer than ``PROTECTED_USES`` times (per the artifact index) go
+    first, least recently used first; without the index this is plain LRU.
+    :param max_bytes: Maximum total size of the cache in bytes.
+    :param max_entries: Maximum number of cached tiles.
+    :param keep: Cache keys that must not be evicted.
+    :return: Number of evicted entries.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "TILE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+    if max_entries is None:
+        max_entries = getattr(settings, "TILE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+
+    evicted_keys = evict_entries(get_cache_root(), max_bytes, max_entries, keep, usage=usage_counts)
+    if evicted_keys:
+        _count("evictions", len(evicted_keys))
+        forget_artifacts(evicted_keys)
+    return len(evicted_keys)
+
+
+def lookup(key: str):
+    """
+    Return the manifest for a cached entry, or ``None`` if it is missing.
+    :param key: Cache key from ``config_fingerprint``.
+    """
+    entry_dir = os.path.join(get_cache_root(), key)
+    manifest = _read_manifest(entry_dir)
+    if manifest is None:
+        return None
+    _touch(entry_dir)
+    manifest["paths"] = {
+        fmt: os.path.join(entry_dir, file_name)
+        for fmt, file_name in manifest["files"].items()
+    }
+    return manifest
+
+
+def _report(progress, stage: str, fraction: float):
+    if progress is not None:
+        progress(stage, fraction)
+
+
+def _resolve_key(config, tile_type: str, version: str, export_formats, tessellation):
+    if export_formats is None:
+        export_formats = config.get("export_formats", ["step", "stl"])
+    export_formats = list(export_formats)
+    if tessellation is None:
+        tessellation = resolve_tessellation(config)
+    return artifact_key(config, tile_type, version, export_formats, tessellation), export_formats, tessellation
+
+
+def cached_tile(config, tile_type: str, version: str = "v1.0", export_formats=None, tessellation=None):
+    """
+    Return the manifest of already generated artifacts without ever generating them.
+    A found entry counts as a cache hit; a missing one is not counted.
+    :return: Manifest as from ``get_or_generate_tile``, or ``None``.
+    """
+    key, _, _ = _resolve_key(config, tile_type, version, export_formats, tessellation)
+    with span("cache.lookup"):
+        manifest = lookup(key)
+    if manifest is not None:
+        _count("hits")
+        record_use(key, manifest, config)
+    return manifest
+
+
+def get_or_generate_tile(config, tile_type: str, version: str = "v1.0", export_formats=None, progress=None,
+                         tessellation=None):
+    """
+    Return cached artifacts for a configuration, generating them on a miss.
+    :param config: Resolved tile configuration.
+    :param tile_type: Name used for the exported files.
+    :param version: Version label used for the exported files.
+    :param export_formats: Formats to export (defaults to the config's list).
+    :param progress: Optional ``callback(stage, fraction)`` for status reporting.
+    :param tessellation: STL options from ``resolve_tessellation`` (defaults to the config's).
+    :return: Tuple of ``(manifest, hit)`` where ``manifest["paths"]`` maps
+             each format to its file on disk.
+    """
+    key, export_formats, tessellation = _resolve_key(config, tile_type, version, export_formats, tessellation)
+    manifest = cached_tile(config, tile_type, version, export_formats, tessellation)
+    if manifest is not None:
+        return manifest, True
+
+    # Single flight: one caller builds the entry, concurrent callers wait for it
+    with artifact_lock(key):
+        # Re-check under the lock: another caller may have finished the build
+        manifest = lookup(key)
+        if manifest is not None:
+            _count("hits")
+            _count("coalesced")
+            record_use(key, manifest, config)
+            return manifest, True
+        return _generate_entry(config, key, tile_type, version, export_formats, tessellation, progress)
+
+
+def _generate_entry(config, key: str, tile_type: str, version: str, export_formats, tessellation, progress):
+    """Build a cache entry; the caller holds its ``artifact_lock``."""
+    _count("misses")
+    entry_dir = os.path.join(get_cache_root(), key)
+    started = time.perf_counter()
+
+    # Only files whose inputs changed are rebuilt; the rest come from the build graph's store
+    from resources.helpers.build_graph import get_build_graph
+
+    exports = get_build_graph().build_files(
+        config, tile_type, version, export_formats, entry_dir, tessellation,
+        geometry_version=GEOMETRY_VERSION, progress=progress,
+    )
+    paths = {fmt: entry["path"] for fmt, entry in exports.items()}
+
+    # Content hashes back the download ETags; precompressed copies are optional
+    encodings = getattr(settings, "TILE_PRECOMPRESS", ())
+    with span("cache.store"):
+        for entry in exports.values():
+            entry["sha256"] = file_digest(entry["path"])
+            if encodings:
+                entry["encodings"] = precompress(entry["path"], encodings)
+
+    manifest = {
+        "key": key,
+        "tile_type": tile_type,
+        "version": version,
+        "geometry_version": GEOMETRY_VERSION,
+        "formats": export_formats,
+        "files": {fmt: os.path.basename(path) for fmt, path in paths.items()},
+        "exports": {
+            fmt: {name: value for name, value in entry.items() if name != "path"} for fmt, entry in exports.items()
+        },
+        "generation_seconds": round(time.perf_counter() - started, 4),
+        "created_at": time.time(),
+    }
+    _write_manifest(entry_dir, manifest)
+    record_artifact(manifest, config)
+    evict(keep=(key,))
+    _report(progress, "done", 1.0)
+
+    manifest["paths"] = dict(paths)
+    return manifest, False
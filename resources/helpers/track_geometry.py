@@ -1,31 +1,140 @@
 """
 Module: track_geometry.py
 Description: Handles the generation of plain track tiles.
+
+The tile runs along X from 0 to ``track_length`` and is centred on Y. Each
+sleeper and its two chairs form one unit that is built once and placed at
+every sleeper position, so adding sleepers only adds placements. Each rail is
+a single profile extruded along the full tile length; both rails share it.
 """
 
 import cadquery as cq
-from resources.helpers.brick_helpers import create_track_section
+from resources.helpers.brick_geometry import get_prototype
+from resources.helpers.instrumentation import count, timed
+from resources.helpers.lod import FULL_LOD, lod_level
+
+
+def create_sleeper(config):
+    """Creates a sleeper lying across the track, its underside at Z=0."""
+    return cq.Workplane("XY").box(
+        config["sleeper_width"], config["track_width"], config["track_height"], centered=(True, True, False)
+    )
+
+
+def create_chair(config):
+    """Creates a rail chair, its underside at Z=0."""
+    return cq.Workplane("XY").box(
+        config["chair_length"], config["chair_width"], config["chair_height"], centered=(True, True, False)
+    )
+
+
+def create_rail(config):
+    """Creates a flat-bottom rail by extruding its I-profile along X for the full track length."""
+    height = config["rail_height"]
+    head, foot, web = config["rail_head_width"] / 2, config["rail_foot_width"] / 2, config["rail_web_thickness"] / 2
+    head_base = height - config["rail_head_height"]
+    foot_top = config["rail_foot_thickness"]
+    profile = [
+        (-foot, 0), (foot, 0), (foot, foot_top), (web, foot_top), (web, head_base), (head, head_base),
+        (head, height), (-head, height), (-head, head_base), (-web, head_base), (-web, foot_top), (-foot, foot_top),
+    ]
+    # The YZ workplane maps local (x, y) onto global (Y, Z) and extrudes along +X
+    return cq.Workplane("YZ").polyline(profile).close().extrude(config["track_length"])
 
-def assemble_plain_track_tile(config: dict) -> cq.Assembly:
+
+def rail_offset(config) -> float:
+    """Returns the distance from the track centre line to each rail's centre line."""
+    return config["gauge"] / 2 + config["rail_head_width"] / 2
+
+
+def sleeper_positions(config) -> list:
+    """
+    Returns the X centre of every sleeper. Sleepers are spaced ``spacing``
+    apart and centred in the tile, so tiles placed end to end keep the pitch.
+    """
+    sleepers = int(config["track_length"] // config["spacing"])
+    start = (config["track_length"] - sleepers * config["spacing"]) / 2 + config["spacing"] / 2
+    return [start + i * config["spacing"] for i in range(sleepers)]
+
+
+def check_track_layout(config):
+    """
+    Checks that the track parts fit together.
+    :raises ValueError: If sleepers overlap, chairs overhang their sleeper or the rail profile is inconsistent.
+    """
+    if config["track_length"] < config["spacing"]:
+        raise ValueError(f"track_length {config['track_length']} is shorter than one sleeper spacing")
+    if config["sleeper_width"] > config["spacing"]:
+        raise ValueError(
+            f"Sleepers overlap: sleeper_width {config['sleeper_width']} exceeds spacing {config['spacing']}"
+        )
+    if config["chair_length"] > config["sleeper_width"]:
+        raise ValueError("chair_length must not exceed sleeper_width")
+    if rail_offset(config) + max(config["chair_width"], config["rail_foot_width"]) / 2 > config["track_width"] / 2:
+        raise ValueError(f"Rails at gauge {config['gauge']} do not fit on sleepers {config['track_width']} long")
+    if config["rail_head_height"] + config["rail_foot_thickness"] >= config["rail_height"]:
+        raise ValueError("rail_head_height plus rail_foot_thickness must be less than rail_height")
+    if config["rail_web_thickness"] > min(config["rail_head_width"], config["rail_foot_width"]):
+        raise ValueError("rail_web_thickness must not exceed the rail head or foot width")
+
+
+def _part_key(config, kind, *keys):
+    return ("track", kind) + tuple(config[key] for key in keys)
+
+
+def get_track_parts(config) -> dict:
+    """Returns the shared sleeper, chair and rail solids for a configuration."""
+    return {
+        "sleeper": get_prototype(
+            _part_key(config, "sleeper", "sleeper_width", "track_width", "track_height"),
+            lambda: create_sleeper(config),
+        ),
+        "chair": get_prototype(
+            _part_key(config, "chair", "chair_length", "chair_width", "chair_height"),
+            lambda: create_chair(config),
+        ),
+        "rail": get_prototype(
+            _part_key(config, "rail", "track_length", "rail_height", "rail_head_width", "rail_head_height",
+                      "rail_foot_width", "rail_foot_thickness", "rail_web_thickness"),
+            lambda: create_rail(config),
+        ),
+    }
+
+
+def assemble_sleeper_unit(config, parts: dict = None) -> cq.Assembly:
+    """Assembles one sleeper with a chair under each rail; below full detail the chairs are left out."""
+    parts = parts or get_track_parts(config)
+    unit = cq.Assembly()
+    unit.add(parts["sleeper"], name="sleeper")
+    if lod_level(config) != FULL_LOD:
+        return unit
+    for side, y_offset in (("left", rail_offset(config)), ("right", -rail_offset(config))):
+        chair_location = cq.Location(cq.Vector(0, y_offset, config["track_height"]))
+        unit.add(parts["chair"], loc=chair_location, name=f"chair_{side}")
+    return unit
+
+
+@timed("assembly.track")
+def assemble_plain_track_tile(config) -> cq.Assembly:
     """
     Assembles a plain track tile based on configuration.
-    :param config: Dictionary containing track parameters.
+    :param config: Track configuration (see ``TrackTileConfig``).
     :return: CadQuery Assembly object representing the track tile.
+    :raises ValueError: If the track parts do not fit together.
     """
+    check_track_layout(config)
+    parts = get_track_parts(config)
     track_assembly = cq.Assembly()
-    track_length = config["track_length"]
-    track_width = config["track_width"]
-    track_height = config["track_height"]
-    spacing = config["spacing"]
-
-    # Create a basic track section
-    track_section = create_track_section(config)
 
-    # Define how many sections to generate
-    num_sections = int(track_length / spacing)
+    # One sleeper unit, placed by reference at every position
+    unit = assemble_sleeper_unit(config, parts)
+    positions = sleeper_positions(config)
+    for i, x_offset in enumerate(positions):
+        track_assembly.add(unit, loc=cq.Location(cq.Vector(x_offset, 0, 0)), name=f"sleeper_{i}")
+    count("sleepers_placed", len(positions))
 
-    for i in range(num_sections):
-        x_offset = i * spacing
-        track_assembly.add(track_section, loc=cq.Location(cq.Vector(x_offset, 0, 0)), name=f"Track Section {i}")
+    rail_z = config["track_height"] + config["chair_height"]
+    for side, y_offset in (("left", rail_offset(config)), ("right", -rail_offset(config))):
+        track_assembly.add(parts["rail"], loc=cq.Location(cq.Vector(0, y_offset, rail_z)), name=f"rail_{side}")
 
     return track_assembly
@@ -0,0 +1,311 @@
+"""
+wall_tiling.py - Handles splitting large brick walls into cached sub-tiles.
+
+A wall is described by an ordinary brick configuration whose ``tile_width``
+and ``row_repetition`` are the size of the whole wall. It is partitioned into
+chunks whose size is a multiple of the bond period, so every chunk is itself a
+valid tile and chunks placed side by side reproduce the monolithic wall
+exactly. Interior chunks are identical, so a wall needs at most four distinct
+sub-tiles (interior, right edge, top edge, corner), each generated once
+through the tile cache.
+
+Walls export either as one combined file per format (STL is streamed chunk
+by chunk, STEP shares chunk instances) or as the distinct chunk files plus a
+placement manifest. Peak memory follows the chunk size, not the wall size.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+
+from resources.helpers.artifact_lock import artifact_lock
+from resources.helpers.brick_layout import brick_row_layout, row_layout_key
+from resources.helpers.file_helper import FORMAT_WRITERS, atomic_output, file_entry
+from resources.helpers.instrumentation import count, span
+from resources.helpers.mesh_engine import STL_DTYPE
+from resources.helpers.tessellation import STL_HEADER_BYTES, resolve_tessellation
+from resources.helpers.tile_cache import artifact_key, config_fingerprint, evict_entries, get_or_generate_tile
+
+DEFAULT_CHUNK_WIDTH = 16  # bricks
+DEFAULT_CHUNK_ROWS = 16
+
+WALL_MODES = ("combined", "chunks")
+WALL_MANIFEST_NAME = "wall.json"
+DEFAULT_WALL_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GiB
+DEFAULT_WALL_MAX_ENTRIES = 64
+
+# Longest bond period searched for, in rows.
+_MAX_ROW_PERIOD = 8
+
+
+def _with_overrides(config, **overrides):
+    if hasattr(config, "with_overrides"):
+        return config.with_overrides(**overrides)
+    return {**dict(config), **overrides}
+
+
+def bond_periods(config):
+    """
+    Return the bond period of a configuration.
+    :return: ``(bricks, rows)``; chunk sizes must be multiples of both.
+    """
+    bond_pattern = config.get("bond_pattern", "flemish")
+    bricks = 1 if bond_pattern == "stack" else 2  # full + half brick repeat
+
+    for rows in range(1, _MAX_ROW_PERIOD + 1):
+        if all(row_layout_key(config, i) == row_layout_key(config, i % rows) for i in range(2 * _MAX_ROW_PERIOD)):
+            return bricks, rows
+    raise ValueError(f"No row period found for bond pattern: {bond_pattern}")
+
+
+def align_to_period(size: int, period: int) -> int:
+    """Round a chunk size up to a positive multiple of the period."""
+    return max(period, -(-int(size) // period) * period)
+
+
+def row_span(config, bricks: int) -> float:
+    """Return the length along X covered by the first ``bricks`` bricks of a row."""
+    layout = brick_row_layout(_with_overrides(config, tile_width=bricks), 0)
+    return sum(config["brick_length"] if kind == "full" else config["brick_length"] / 2 for kind, _ in layout)
+
+
+def plan_wall(config, chunk_width: int = None, chunk_rows: int = None) -> dict:
+    """
+    Partition a wall into chunks aligned to the bond period.
+    :param config: Brick configuration; ``tile_width``/``row_repetition`` give the wall size.
+    :param chunk_width: Bricks per chunk row (rounded up to the bond period).
+    :param chunk_rows: Rows per chunk (rounded up to the bond period).
+    :return: Dictionary with the aligned chunk size, the distinct chunk
+             configurations by key and every placement.
+    :raises ValueError: If the tile type is not ``bricks``.
+    """
+    if config.get("tile_type") != "bricks":
+        raise ValueError(f"Wall tiling only supports brick tiles, got: {config.get('tile_type')}")
+
+    brick_period, row_period = bond_periods(config)
+    chunk_width = align_to_period(chunk_width or DEFAULT_CHUNK_WIDTH, brick_period)
+    chunk_rows = align_to_period(chunk_rows or DEFAULT_CHUNK_ROWS, row_period)
+    wall_width, wall_rows = config["tile_width"], config["row_repetition"]
+
+    chunks = {}
+    placements = []
+    full_span = row_span(config, chunk_width)
+    for row_start in range(0, wall_rows, chunk_rows):
+        for column, brick_start in enumerate(range(0, wall_width, chunk_width)):
+            chunk_config = _with_overrides(
+                config,
+                tile_width=min(chunk_width, wall_width - brick_start),
+                row_repetition=min(chunk_rows, wall_rows - row_start),
+            )
+            key = config_fingerprint(chunk_config)
+            chunks.setdefault(key, chunk_config)
+            placements.append({
+                "chunk": key,
+                "column": column,
+                "row": row_start // chunk_rows,
+                "offset": (column * full_span, 0.0, row_start * config["brick_height"]),
+            })
+
+    return {
+        "chunk_width": chunk_width,
+        "chunk_rows": chunk_rows,
+        "wall_width": wall_width,
+        "wall_rows": wall_rows,
+        "chunks": chunks,
+        "placements": placements,
+    }
+
+
+def assemble_wall(config, chunk_width: int = None, chunk_rows: int = None, plan: dict = None):
+    """
+    Assemble a wall from shared sub-tile assemblies placed by location.
+    Each distinct chunk is assembled once; placements reference it.
+    """
+    import cadquery as cq
+
+    from resources.helpers.tile_assembly import assemble_tile
+
+    plan = plan or plan_wall(config, chunk_width, chunk_rows)
+    with span("wall.assemble"):
+        templates = {key: assemble_tile(chunk_config) for key, chunk_config in plan["chunks"].items()}
+        wall = cq.Assembly()
+        for placement in plan["placements"]:
+            wall.add(
+                templates[placement["chunk"]],
+                loc=cq.Location(cq.Vector(*placement["offset"])),
+                name=f"chunk_{placement['column']}_{placement['row']}",
+            )
+    return wall
+
+
+def read_binary_stl(file_path: str) -> np.ndarray:
+    """Read the facet records of a binary STL file."""
+    return np.fromfile(file_path, dtype=STL_DTYPE, offset=STL_HEADER_BYTES)
+
+
+def write_combined_stl(file_path: str, plan: dict, chunk_stl_paths: dict) -> int:
+    """
+    Stream a wall into one binary STL, translating each chunk's facets.
+    Only the distinct chunk meshes are held in memory.
+    :param chunk_stl_paths: Mapping of chunk key to its binary STL.
+    :return: Number of triangles written.
+    """
+    meshes = {}
+    total = 0
+    for placement in plan["placements"]:
+        key = placement["chunk"]
+        if key not in meshes:
+            meshes[key] = read_binary_stl(chunk_stl_paths[key])
+        total += len(meshes[key])
+
+    with atomic_output(file_path) as temp_path, open(temp_path, "wb") as file:
+        file.write(b"railworks wall".ljust(80, b"\0"))
+        file.write(np.uint32(total).tobytes())
+        for placement in plan["placements"]:
+            records = meshes[placement["chunk"]].copy()
+            records["vertices"] += np.asarray(placement["offset"], dtype=np.float32)
+            records.tofile(file)
+    return total
+
+
+def get_wall_root() -> str:
+    """Return the directory that holds generated walls."""
+    return os.path.join(settings.MEDIA_ROOT, "resources", "tiles", "walls")
+
+
+def evict_walls(max_bytes: int = None, max_entries: int = None, keep=()) -> int:
+    """
+    Evict least recently used walls until the wall directory fits its limits.
+    Walls are bounded separately from the tile cache (``TILE_WALL_MAX_BYTES``/``TILE_WALL_MAX_ENTRIES``).
+    :param keep: Wall keys that must not be evicted.
+    :return: Number of evicted walls.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "TILE_WALL_MAX_BYTES", DEFAULT_WALL_MAX_BYTES)
+    if max_entries is None:
+        max_entries = getattr(settings, "TILE_WALL_MAX_ENTRIES", DEFAULT_WALL_MAX_ENTRIES)
+    evicted = evict_entries(get_wall_root(), max_bytes, max_entries, keep, manifest_name=WALL_MANIFEST_NAME)
+    if evicted:
+        count("wall_evictions", len(evicted))
+    return len(evicted)
+
+
+def _read_wall_manifest(manifest_path: str):
+    """Return a stored wall manifest if it and every file it references still exist; hits count as an access."""
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    paths = [entry["path"] for entry in manifest["files"].values()]
+    paths += [path for chunk in manifest["chunk_files"].values() for path in chunk.values()]
+    # Chunks live in the tile cache and may have been evicted since
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    try:
+        os.utime(manifest_path)
+    except OSError:
+        pass
+    return manifest
+
+
+def export_wall(config, tile_type: str = "brick_wall", version: str = "v1.0", export_formats=None,
+                mode: str = "combined", chunk_width: int = None, chunk_rows: int = None, tessellation=None) -> dict:
+    """
+    Generate a wall from cached sub-tiles.
+    :param config: Brick configuration; ``tile_width``/``row_repetition`` give the wall size.
+    :param tile_type: Name used for the exported files.
+    :param version: Version label used for the exported files.
+    :param export_formats: Formats to export (defaults to the config's list).
+    :param mode: ``"combined"`` for one file per format, ``"chunks"`` for the
+                 distinct chunk files plus placements.
+    :param chunk_width: Bricks per chunk row (rounded up to the bond period).
+    :param chunk_rows: Rows per chunk (rounded up to the bond period).
+    :param tessellation: STL options from ``resolve_tessellation``.
+    :return: Wall manifest with placements, chunk files, (combined) files,
+             ``manifest_path`` and whether it was ``cached``.
+    """
+    if mode not in WALL_MODES:
+        raise ValueError(f"Unsupported wall mode: {mode} (expected one of {', '.join(WALL_MODES)})")
+    if export_formats is None:
+        export_formats = config.get("export_formats", ["step", "stl"])
+    export_formats = list(export_formats)
+    for fmt in export_formats:
+        if fmt not in FORMAT_WRITERS:
+            raise RuntimeError(f"❌ Export failed for format {fmt}: Unsupported export format: {fmt}")
+    if tessellation is None:
+        tessellation = resolve_tessellation(config)
+
+    started = time.perf_counter()
+    plan = plan_wall(config, chunk_width, chunk_rows)
+    key = artifact_key(config, tile_type, version, export_formats, tessellation)
+    wall_key = config_fingerprint({"artifact": key}, mode=mode, chunk=(plan["chunk_width"], plan["chunk_rows"]))
+    output_dir = os.path.join(get_wall_root(), wall_key)
+    manifest_path = os.path.join(output_dir, WALL_MANIFEST_NAME)
+    cached = _read_wall_manifest(manifest_path)
+    if cached is not None:
+        return {**cached, "manifest_path": manifest_path, "cached": True}
+
+    # Single flight: concurrent requests for the same wall wait for one build
+    with artifact_lock(wall_key):
+        cached = _read_wall_manifest(manifest_path)
+        if cached is not None:
+            return {**cached, "manifest_path": manifest_path, "cached": True}
+
+        # Combined STEP is assembled from chunk instances, so chunks only need STL there
+        chunk_formats = export_formats if mode == "chunks" else [fmt for fmt in export_formats if fmt == "stl"]
+        chunk_files = {}
+        with span("wall.chunks"):
+            for chunk_key, chunk_config in plan["chunks"].items():
+                if not chunk_formats:
+                    break
+                chunk_manifest, _ = get_or_generate_tile(
+                    chunk_config, tile_type=f"{tile_type}_chunk", version=version,
+                    export_formats=chunk_formats, tessellation=tessellation,
+                )
+                chunk_files[chunk_key] = chunk_manifest["paths"]
+        count("wall_chunks_generated", len(chunk_files))
+
+        os.makedirs(output_dir, exist_ok=True)
+        files = {}
+        if mode == "combined":
+            wall = None
+            for fmt in export_formats:
+                file_path = os.path.join(output_dir, f"{tile_type}_{version}.{fmt}")
+                fmt_started = time.perf_counter()
+                with span(f"wall.{fmt}"):
+                    if fmt == "stl":
+                        triangles = write_combined_stl(
+                            file_path, plan, {chunk_key: paths["stl"] for chunk_key, paths in chunk_files.items()}
+                        )
+                        details = {"triangles": triangles}
+                    else:
+                        # Every non-STL format is written from the same assembled wall
+                        if wall is None:
+                            wall = assemble_wall(config, plan=plan)
+                        with atomic_output(file_path) as temp_path:
+                            details = FORMAT_WRITERS[fmt](wall, None, temp_path, tessellation)
+                print(f"✅ {fmt.upper()} wall exported to: {file_path}")
+                files[fmt] = {**file_entry(file_path, time.perf_counter() - fmt_started), **details}
+
+        manifest = {
+            "key": wall_key,
+            "mode": mode,
+            "tile_type": tile_type,
+            "version": version,
+            "formats": export_formats,
+            "wall": {"width": plan["wall_width"], "rows": plan["wall_rows"]},
+            "chunk": {"width": plan["chunk_width"], "rows": plan["chunk_rows"]},
+            "distinct_chunks": len(plan["chunks"]),
+            "chunk_files": chunk_files,
+            "placements": [{**placement, "offset": list(placement["offset"])} for placement in plan["placements"]],
+            "files": files,
+            "generation_seconds": round(time.perf_counter() - started, 4),
+        }
+        with atomic_output(manifest_path) as temp_path, open(temp_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+        evict_walls(keep=(wall_key,))
+        return {**manifest, "manifest_path": manifest_path, "cached": False}
@@ -0,0 +1,288 @@
+"""
+worker_pool.py - Handles a warm pool of pre-imported tile generation workers.
+
+Each worker process imports CadQuery/OCP, bootstraps Django and primes the
+brick prototype registry once, then claims jobs from the SQLite job queue
+(see ``job_queue``) until it is recycled. Workers are recycled after
+``max_jobs`` jobs or once their resident memory exceeds ``max_rss_mb`` so
+OCC leaks stay bounded. Per-worker utilization is recorded in the job
+database so the API and CLI can report it.
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from contextlib import closing
+
+from resources.helpers.job_queue import FAILED, RUNNING, JobStore, run_job
+
+DEFAULT_POOL_SIZE = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_MAX_JOBS = 50
+DEFAULT_MAX_RSS_MB = 2048
+DEFAULT_POLL_INTERVAL = 0.5
+
+_WORKER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tile_workers (
+    worker_id TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL,
+    pid INTEGER,
+    state TEXT NOT NULL,
+    current_job TEXT,
+    jobs_done INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    rss_bytes INTEGER,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    exit_reason TEXT
+);
+"""
+
+
+def current_rss_bytes():
+    """Return the resident set size of this process, or ``None`` if unknown."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak RSS is the best portable approximation; macOS reports bytes, Linux KiB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class WorkerRegistry(JobStore):
+    """Job store extended with the ``tile_workers`` metrics table."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with closing(self._connect()) as connection:
+            connection.executescript(_WORKER_SCHEMA)
+
+    def register(self, worker_id: str, slot: int, pid: int):
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO tile_workers (worker_id, slot, pid, state, started_at, last_seen)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (worker_id, slot, pid, "starting", now, now),
+            )
+
+    def update_worker(self, worker_id: str, **fields):
+        fields["last_seen"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with closing(self._connect()) as connection:
+            connection.execute(
+                f"UPDATE tile_workers SET {assignments} WHERE worker_id = ?", (*fields.values(), worker_id)
+            )
+
+    def get_worker(self, worker_id: str):
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT * FROM tile_workers WHERE worker_id = ?", (worker_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def workers(self, include_exited: bool = False) -> list:
+        """Return worker records with derived utilization."""
+        query = "SELECT * FROM tile_workers"
+        if not include_exited:
+            query += " WHERE state != 'exited'"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query + " ORDER BY slot, started_at").fetchall()
+
+        now = time.time()
+        workers = []
+        for row in rows:
+            worker = dict(row)
+            uptime = max(now - worker["started_at"], 1e-9)
+            worker["uptime_seconds"] = round(uptime, 3)
+            worker["utilization"] = round(min(worker["busy_seconds"] / uptime, 1.0), 4)
+            workers.append(worker)
+        return workers
+
+
+def _prime_worker():
+    """Pay the CadQuery import and prototype construction cost up front."""
+    import cadquery  # noqa: F401
+
+    from resources.configs.yaml_config import get_default_config_path, load_config
+    from resources.helpers.brick_geometry import get_brick_prototype
+
+    try:
+        config = load_config(get_default_config_path("brick_tile"))
+    except (OSError, ValueError):
+        return
+    for kind in ("full", "half"):
+        get_brick_prototype(config, kind)
+
+
+def _setup_django(settings_overrides: dict):
+    import django
+    from django.apps import apps
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "railworks_project.settings")
+    if not apps.ready:
+        django.setup()
+
+    from django.conf import settings
+
+    for name, value in settings_overrides.items():
+        setattr(settings, name, value)
+
+
+def worker_main(worker_id: str, slot: int, database_path: str, max_jobs: int, max_rss_mb: float,
+                poll_interval: float, stop_event, settings_overrides: dict):
+    """
+    Entry point of a pool worker process.
+    Claims and runs jobs until stopped, ``max_jobs`` is reached or RSS exceeds the ceiling.
+    """
+    # Ctrl+C is handled by the supervisor, which lets workers finish their job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _setup_django(settings_overrides)
+    registry = WorkerRegistry(database_path)
+    registry.register(worker_id, slot, os.getpid())
+    _prime_worker()
+    registry.update_worker(worker_id, state="idle", rss_bytes=current_rss_bytes())
+
+    jobs_done = 0
+    busy_seconds = 0.0
+    exit_reason = "stopped"
+    while not stop_event.is_set():
+        job = registry.claim_next()
+        if job is None:
+            registry.update_worker(worker_id, state="idle")
+            stop_event.wait(poll_interval)
+            continue
+
+        registry.update_worker(worker_id, state="busy", current_job=job["id"])
+        started = time.perf_counter()
+        run_job(database_path, job["id"], claimed=True)
+        busy_seconds += time.perf_counter() - started
+        jobs_done += 1
+
+        rss = current_rss_bytes()
+        registry.update_worker(
+            worker_id, state="idle", current_job=None, jobs_done=jobs_done,
+            busy_seconds=busy_seconds, rss_bytes=rss,
+        )
+        if max_jobs and jobs_done >= max_jobs:
+            exit_reason = "max_jobs"
+            break
+        if max_rss_mb and rss is not None and rss > max_rss_mb * 1024 * 1024:
+            exit_reason = "max_rss"
+            break
+
+    registry.update_worker(worker_id, state="exited", exit_reason=exit_reason)
+
+
+class WorkerPool:
+    """
+    Supervises a fixed number of warm worker processes and replaces any that exit.
+    """
+
+    def __init__(self, database_path: str, size: int = DEFAULT_POOL_SIZE, max_jobs: int = DEFAULT_MAX_JOBS,
+                 max_rss_mb: float = DEFAULT_MAX_RSS_MB, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 settings_overrides: dict = None, mp_context=None):
+        if size < 1:
+            raise ValueError("Worker pool size must be at least 1")
+        self.database_path = database_path
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.poll_interval = poll_interval
+        self.settings_overrides = settings_overrides or {}
+        self.context = mp_context or multiprocessing.get_context()
+        self.registry = WorkerRegistry(database_path)
+        self.stop_event = self.context.Event()
+        self.processes = {}
+        self.generations = {}
+        self.recycled = 0
+
+    def _spawn(self, slot: int):
+        generation = self.generations.get(slot, -1) + 1
+        self.generations[slot] = generation
+        worker_id = f"{os.getpid()}-{slot}-{generation}"
+        process = self.context.Process(
+            target=worker_main,
+            name=f"tile-worker-{slot}",
+            args=(
+                worker_id, slot, self.database_path, self.max_jobs, self.max_rss_mb,
+                self.poll_interval, self.stop_event, self.settings_overrides,
+            ),
+            daemon=True,
+        )
+        process.start()
+        self.processes[slot] = (worker_id, process)
+
+    def start(self):
+        """Start one worker per slot."""
+        for slot in range(self.size):
+            self._spawn(slot)
+        return self
+
+    def check_workers(self) -> int:
+        """
+        Replace exited workers and fail jobs orphaned by crashed ones.
+        :return: Number of workers replaced.
+        """
+        replaced = 0
+        for slot, (worker_id, process) in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            worker = self.registry.get_worker(worker_id) or {}
+            job_id = worker.get("current_job")
+            if job_id:
+                job = self.registry.get(job_id)
+                if job is not None and job["status"] == RUNNING:
+                    self.registry.update(
+                        job_id, status=FAILED, stage=FAILED,
+                        error=f"Worker {worker_id} exited with code {process.exitcode}",
+                        finished_at=time.time(),
+                    )
+            if worker and worker.get("state") != "exited":
+                self.registry.update_worker(worker_id, state="exited", exit_reason=f"exitcode {process.exitcode}")
+            if not self.stop_event.is_set():
+                self._spawn(slot)
+                self.recycled += 1
+                replaced += 1
+        return replaced
+
+    def run_forever(self):
+        """Supervise workers until interrupted."""
+        try:
+            while not self.stop_event.is_set():
+                self.check_workers()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, timeout: float = 30):
+        """Ask workers to finish their current job and exit."""
+        self.stop_event.set()
+        for _worker_id, process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.check_workers()
+
+    def stats(self) -> dict:
+        """Return pool-level counters and per-worker utilization."""
+        workers = self.registry.workers()
+        return {
+            "size": self.size,
+            "recycled": self.recycled,
+            "workers": workers,
+        }
+
+
+def worker_stats(database_path: str) -> list:
+    """Return utilization metrics of the live workers recorded in a job database."""
+    return WorkerRegistry(database_path).workers()
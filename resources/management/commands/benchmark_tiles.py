@@ -0,0 +1,109 @@
+"""
+benchmark_tiles.py - Benchmarks the tile pipeline and checks for regressions.
+
+Usage:
+    python manage.py benchmark_tiles --output benchmarks/latest.json
+    python manage.py benchmark_tiles --quick --baseline benchmarks/baseline.json
+    python manage.py benchmark_tiles --stage assemble_tile --stage export_stl --size 8x8 --pattern flemish
+    python manage.py benchmark_tiles --stage assemble_track --sleepers 100 --sleepers 400
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.helpers.benchmarks import (
+    BOND_PATTERNS,
+    DEFAULT_TOLERANCES,
+    FULL_SIZES,
+    FULL_SLEEPER_COUNTS,
+    QUICK_SIZES,
+    QUICK_SLEEPER_COUNTS,
+    STAGES,
+    compare_results,
+    load_results,
+    run_suite,
+    save_results,
+)
+
+
+def parse_size(value: str):
+    """Parse ``ROWSxWIDTH`` into a ``(row_repetition, tile_width)`` pair."""
+    try:
+        rows, width = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise CommandError(f"Expected a size like 8x8, got: {value}")
+    return rows, width
+
+
+class Command(BaseCommand):
+    help = (
+        "Time each tile pipeline stage across sizes, bond patterns and sleeper counts, "
+        "optionally against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stage", action="append", choices=list(STAGES),
+                            help="Stage to run (repeatable; defaults to all).")
+        parser.add_argument("--size", action="append", type=parse_size, metavar="ROWSxWIDTH",
+                            help="Tile size to sweep (repeatable).")
+        parser.add_argument("--pattern", action="append", choices=list(BOND_PATTERNS),
+                            help="Bond pattern to sweep (repeatable; defaults to all).")
+        parser.add_argument("--sleepers", action="append", type=int,
+                            help="Sleepers per track tile to sweep (repeatable).")
+        parser.add_argument("--quick", action="store_true", help="Use small sizes for a fast smoke run.")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is reported).")
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--no-isolate", action="store_true",
+                            help="Run cases in this process (peak RSS becomes cumulative).")
+        parser.add_argument("--output", help="Write results JSON to this path.")
+        parser.add_argument("--baseline", help="Compare against this results JSON and fail on regressions.")
+        parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TOLERANCES["seconds"][0],
+                            help="Allowed relative slow-down (0.25 = 25%%).")
+        parser.add_argument("--rss-tolerance", type=float, default=DEFAULT_TOLERANCES["peak_rss_bytes"][0])
+        parser.add_argument("--size-tolerance", type=float, default=DEFAULT_TOLERANCES["output_bytes"][0])
+
+    def handle(self, *args, **options):
+        baseline = load_results(options["baseline"]) if options["baseline"] else None
+        sizes = tuple(options["size"] or (QUICK_SIZES if options["quick"] else FULL_SIZES))
+        sleeper_counts = tuple(
+            options["sleepers"] or (QUICK_SLEEPER_COUNTS if options["quick"] else FULL_SLEEPER_COUNTS)
+        )
+
+        def report(name, result):
+            rss = result["peak_rss_bytes"]
+            self.stdout.write(
+                f"{name:<45} {result['seconds'] * 1000:>10.1f} ms"
+                f"  peak {rss / 2**20 if rss else 0:>7.1f} MiB"
+                f"  out {result['output_bytes'] or 0:>10} B"
+            )
+
+        results = run_suite(
+            stages=options["stage"],
+            sizes=sizes,
+            bond_patterns=options["pattern"] or BOND_PATTERNS,
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            isolate=not options["no_isolate"],
+            progress=report,
+            sleeper_counts=sleeper_counts,
+        )
+
+        if options["output"]:
+            save_results(results, options["output"])
+            self.stdout.write(f"✅ Results written to {options['output']}")
+
+        if baseline is None:
+            return
+
+        tolerances = {
+            "seconds": (options["time_tolerance"], DEFAULT_TOLERANCES["seconds"][1]),
+            "peak_rss_bytes": (options["rss_tolerance"], DEFAULT_TOLERANCES["peak_rss_bytes"][1]),
+            "output_bytes": (options["size_tolerance"], DEFAULT_TOLERANCES["output_bytes"][1]),
+        }
+        regressions = compare_results(results, baseline, tolerances)
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(json.dumps(regression))
+            raise CommandError(f"❌ {len(regressions)} benchmark regression(s) against {options['baseline']}")
+        self.stdout.write(f"✅ No regressions against {options['baseline']}")
@@ -0,0 +1,68 @@
+"""
+generate_batch.py - Generates a parameter sweep of tile variants.
+
+Usage:
+    python manage.py generate_batch brick_tile \
+        --sweep bond_pattern=flemish,stretcher,stack --sweep row_repetition=4,8 \
+        --set tile_width=6 --workers 8
+"""
+
+import json
+
+import yaml
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.configs.yaml_config import config_path_for, load_config
+from resources.helpers.batch import expand_sweep, run_batch
+
+
+def parse_assignment(value: str):
+    """Split ``key=value`` and parse the value as YAML (so numbers stay numbers)."""
+    if "=" not in value:
+        raise CommandError(f"Expected key=value, got: {value}")
+    key, raw = value.split("=", 1)
+    return key.strip(), yaml.safe_load(raw)
+
+
+class Command(BaseCommand):
+    help = "Generate every variant of a parameter sweep and print one JSON line per variant."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tile_type", help="Tile type (e.g. plain_track) or name of a YAML file in resources/configs/bricks/.")
+        parser.add_argument("--sweep", action="append", default=[], metavar="KEY=V1,V2",
+                            help="Configuration key and comma-separated values to sweep.")
+        parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                            help="Override a configuration key for every variant.")
+        parser.add_argument("--formats", help="Comma-separated export formats (defaults to the config's).")
+        # Django already owns --version
+        parser.add_argument("--tile-version", dest="version", default="v1.0",
+                            help="Version label used for the exported files.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (defaults to all cores, 0 runs in-process).")
+
+    def handle(self, *args, **options):
+        base_config = load_config(config_path_for(options["tile_type"]))
+        overrides = dict(parse_assignment(assignment) for assignment in options["set"])
+
+        sweep = {}
+        for assignment in options["sweep"]:
+            key, raw = assignment.split("=", 1) if "=" in assignment else (assignment, "")
+            sweep[key.strip()] = [yaml.safe_load(value) for value in raw.split(",") if value]
+
+        export_formats = options["formats"].split(",") if options["formats"] else None
+        try:
+            base_config = base_config.with_overrides(**overrides)
+            expand_sweep(base_config, sweep)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        failed = 0
+        for result in run_batch(
+            base_config, sweep, tile_type=options["tile_type"], version=options["version"],
+            export_formats=export_formats, max_workers=options["workers"],
+        ):
+            failed += result["status"] == "failed"
+            self.stdout.write(json.dumps(result))
+
+        if failed:
+            raise CommandError(f"{failed} variant(s) failed")
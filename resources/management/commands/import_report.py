@@ -0,0 +1,43 @@
+"""
+import_report.py - Reports cold-start import cost of a module.
+
+Usage:
+    python manage.py import_report
+    python manage.py import_report --module resources.api.tile_api --top 20
+    python manage.py import_report --fail-on-heavy   # CI: non-geometry paths must not load CadQuery
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.helpers.import_report import DEFAULT_MODULE, measure_imports
+
+
+class Command(BaseCommand):
+    help = "Import a module in a fresh interpreter and report import time and heavy libraries loaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", default=DEFAULT_MODULE, help="Dotted module path to import.")
+        parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+        parser.add_argument("--fail-on-heavy", action="store_true",
+                            help="Exit with an error if CadQuery, OCP, NumPy or the viewer were imported.")
+
+    def handle(self, *args, **options):
+        try:
+            report = measure_imports(options["module"], top=options["top"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(f"{report['module']}: {report['module_seconds'] * 1000:.1f} ms "
+                              f"({report['total_seconds'] * 1000:.1f} ms including start-up)")
+            for entry in report["slowest"]:
+                self.stdout.write(f"  {entry['module']:<50} {entry['seconds'] * 1000:>8.1f} ms")
+            self.stdout.write(f"Heavy modules loaded: {', '.join(report['heavy']) or 'none'}")
+
+        if options["fail_on_heavy"] and report["heavy"]:
+            raise CommandError(f"❌ {report['module']} imports {', '.join(report['heavy'])} at start-up")
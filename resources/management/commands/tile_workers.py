@@ -0,0 +1,91 @@
+"""
+tile_workers.py - Runs and talks to the warm tile worker pool.
+
+Usage:
+    python manage.py tile_workers start --size 4 --max-jobs 50 --max-rss-mb 2048
+    python manage.py tile_workers submit brick_tile --wait
+    python manage.py tile_workers stats
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.configs.yaml_config import config_path_for, load_config
+from resources.helpers.job_queue import (
+    FAILED,
+    SUCCEEDED,
+    JobStore,
+    get_job_database_path,
+)
+from resources.helpers.tile_cache import artifact_key
+from resources.helpers.worker_pool import (
+    DEFAULT_MAX_JOBS,
+    DEFAULT_MAX_RSS_MB,
+    DEFAULT_POOL_SIZE,
+    WorkerPool,
+    worker_stats,
+)
+
+
+class Command(BaseCommand):
+    help = "Start the warm tile worker pool, submit tile jobs to it or report worker metrics."
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest="action", required=True)
+
+        start = subcommands.add_parser("start", help="Run the worker pool in the foreground.")
+        start.add_argument("--size", type=int, default=DEFAULT_POOL_SIZE)
+        start.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS,
+                           help="Recycle a worker after this many jobs (0 disables).")
+        start.add_argument("--max-rss-mb", type=float, default=DEFAULT_MAX_RSS_MB,
+                           help="Recycle a worker once its RSS exceeds this many MiB (0 disables).")
+
+        submit = subcommands.add_parser("submit", help="Queue a tile job for the pool.")
+        submit.add_argument("tile_type", help="Tile type (e.g. plain_track) or name of a YAML file in resources/configs/bricks/.")
+        submit.add_argument("--version", default="v1.0")
+        submit.add_argument("--wait", action="store_true", help="Block until the job finishes.")
+        submit.add_argument("--timeout", type=float, default=600)
+
+        subcommands.add_parser("stats", help="Print per-worker utilization as JSON.")
+
+    def handle(self, *args, **options):
+        database_path = get_job_database_path()
+        action = options["action"]
+
+        if action == "start":
+            pool = WorkerPool(
+                database_path,
+                size=options["size"],
+                max_jobs=options["max_jobs"],
+                max_rss_mb=options["max_rss_mb"],
+                settings_overrides={"MEDIA_ROOT": settings.MEDIA_ROOT},
+            )
+            self.stdout.write(f"Starting {pool.size} tile workers on {database_path}")
+            pool.start().run_forever()
+
+        elif action == "submit":
+            config = load_config(config_path_for(options["tile_type"]))
+            export_formats = config.get("export_formats", ["step", "stl"])
+            key = artifact_key(config, options["tile_type"], options["version"], export_formats)
+            store = JobStore(database_path)
+            job, created = store.create_or_join(
+                key, options["tile_type"], options["version"], config, export_formats
+            )
+            self.stdout.write(json.dumps({"job_id": job["id"], "coalesced": not created}))
+
+            if options["wait"]:
+                deadline = time.monotonic() + options["timeout"]
+                while job["status"] not in (SUCCEEDED, FAILED):
+                    if time.monotonic() > deadline:
+                        raise CommandError(f"Timed out waiting for job {job['id']}")
+                    time.sleep(0.5)
+                    job = store.get(job["id"])
+                self.stdout.write(json.dumps({"status": job["status"], "result": job["result"], "error": job["error"]}))
+                if job["status"] == FAILED:
+                    raise CommandError(job["error"])
+
+        elif action == "stats":
+            self.stdout.write(json.dumps(worker_stats(database_path), indent=2))
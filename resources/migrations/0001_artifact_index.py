@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TileArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('config_hash', models.CharField(db_index=True, max_length=64)),
+                ('tile_type', models.CharField(max_length=64)),
+                ('version', models.CharField(max_length=32)),
+                ('formats', models.CharField(help_text='Exported formats, sorted and comma-separated.', max_length=64)),
+                ('code_version', models.CharField(help_text='Geometry version of the code that built it.', max_length=16)),
+                ('config', models.JSONField()),
+                ('bounding_box', models.JSONField(blank=True, null=True)),
+                ('triangle_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_bytes', models.PositiveBigIntegerField(default=0)),
+                ('generation_seconds', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+                ('use_count', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+                'indexes': [models.Index(fields=['tile_type', 'config_hash', 'code_version'], name='artifact_params_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArtifactFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(max_length=8)),
+                ('file_name', models.CharField(max_length=255)),
+                ('bytes', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('triangles', models.PositiveIntegerField(blank=True, null=True)),
+                ('seconds', models.FloatField(default=0.0)),
+                ('artifact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='resources.tileartifact')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('artifact', 'format'), name='unique_artifact_format')],
+            },
+        ),
+    ]
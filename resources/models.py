@@ -1,3 +1,53 @@
 from django.db import models
 
-# Create your models here.
+
+class TileArtifact(models.Model):
+    """
+    One generated tile: a configuration exported to a set of formats.
+    Mirrors an entry of the tile cache, so clients can find existing artifacts
+    by their parameters and eviction can rank entries by usage.
+    """
+
+    cache_key = models.CharField(max_length=64, unique=True)
+    config_hash = models.CharField(max_length=64, db_index=True)
+    tile_type = models.CharField(max_length=64)
+    version = models.CharField(max_length=32)
+    formats = models.CharField(max_length=64, help_text="Exported formats, sorted and comma-separated.")
+    code_version = models.CharField(max_length=16, help_text="Geometry version of the code that built it.")
+    config = models.JSONField()
+    bounding_box = models.JSONField(null=True, blank=True)
+    triangle_count = models.PositiveIntegerField(null=True, blank=True)
+    total_bytes = models.PositiveBigIntegerField(default=0)
+    generation_seconds = models.FloatField(default=0.0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    use_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+        indexes = [
+            models.Index(fields=["tile_type", "config_hash", "code_version"], name="artifact_params_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tile_type} {self.version} [{self.formats}] {self.cache_key[:12]}"
+
+
+class ArtifactFile(models.Model):
+    """One exported file of a ``TileArtifact``."""
+
+    artifact = models.ForeignKey(TileArtifact, related_name="files", on_delete=models.CASCADE)
+    format = models.CharField(max_length=8)
+    file_name = models.CharField(max_length=255)
+    bytes = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    triangles = models.PositiveIntegerField(null=True, blank=True)
+    seconds = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["artifact", "format"], name="unique_artifact_format"),
+        ]
+
+    def __str__(self):
+        return self.file_name
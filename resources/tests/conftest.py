@@ -0,0 +1,16 @@
+"""
+Shared fixtures for the resources test suite.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def artifact_index(request, settings):
+    """
+    Keep the artifact index off unless a test is allowed to use the database.
+    Tests marked ``django_db`` (or using the ``db`` fixture) exercise it.
+    """
+    uses_db = request.node.get_closest_marker("django_db") is not None or "db" in request.fixturenames
+    settings.TILE_ARTIFACT_INDEX = uses_db
+    return uses_db
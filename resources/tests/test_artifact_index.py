@@ -0,0 +1,121 @@
+"""
+Test Script: test_artifact_index.py
+Description: Test suite for the database index of generated tile artifacts.
+"""
+
+import os
+import shutil
+import pytest
+from resources.api.tile_api import resolve_request
+from resources.helpers import artifact_index, tile_cache
+from resources.models import TileArtifact
+
+pytestmark = pytest.mark.django_db
+
+SMALL_TILE = {"tile_width": 2, "row_repetition": 2, "export_formats": ["stl"]}
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and reset counters."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+    return str(tmpdir)
+
+
+@pytest.fixture
+def generated():
+    """Fixture generating a small brick tile the way ``/generate/`` would."""
+    config, tessellation, export_formats = resolve_request("brick_tile", overrides=SMALL_TILE)
+    manifest, _ = tile_cache.get_or_generate_tile(
+        config, tile_type="brick_tile", export_formats=export_formats, tessellation=tessellation
+    )
+    return config, manifest
+
+
+def test_generation_records_artifact(generated):
+    """A cache miss indexes the artifact with its metadata."""
+    config, manifest = generated
+    artifact = TileArtifact.objects.get(cache_key=manifest["key"])
+
+    assert artifact.config_hash == artifact_index.config_hash(config)
+    assert artifact.tile_type == "brick_tile"
+    assert artifact.formats == "stl"
+    assert artifact.code_version == tile_cache.GEOMETRY_VERSION
+    assert artifact.triangle_count == manifest["exports"]["stl"]["triangles"] > 0
+    assert artifact.total_bytes == manifest["exports"]["stl"]["bytes"]
+    assert artifact.use_count == 1
+
+    box = artifact.bounding_box
+    assert all(high > low for low, high in zip(box["min"], box["max"]))
+    assert artifact.files.get().sha256 == manifest["exports"]["stl"]["sha256"]
+
+
+def test_cache_hit_counts_use(generated):
+    """Every cache hit bumps the artifact's usage."""
+    config, manifest = generated
+    _, hit = tile_cache.get_or_generate_tile(
+        config, tile_type="brick_tile", export_formats=manifest["formats"],
+        tessellation=resolve_request("brick_tile", overrides=SMALL_TILE)[1],
+    )
+
+    assert hit
+    assert TileArtifact.objects.get(cache_key=manifest["key"]).use_count == 2
+
+
+def test_find_returns_existing_artifact(client, generated):
+    """The parameters of a generated tile resolve to its indexed artifact without generating."""
+    _, manifest = generated
+    misses = tile_cache.cache_stats()["misses"]
+
+    response = client.post(
+        "/api/tiles/artifacts/find/",
+        data={"tile_type": "brick_tile", "overrides": SMALL_TILE},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["cache_key"] == manifest["key"]
+    assert body["use_count"] == 2
+    assert body["files"]["stl"]["download"] == f"/api/tiles/files/{manifest['key']}/stl/"
+    assert tile_cache.cache_stats()["misses"] == misses
+
+
+def test_find_unknown_parameters(client, generated):
+    """Parameters nobody generated yet are a 404, not a new generation."""
+    response = client.post(
+        "/api/tiles/artifacts/find/",
+        data={"tile_type": "brick_tile", "overrides": dict(SMALL_TILE, tile_width=3)},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 404
+    assert tile_cache.cache_stats()["misses"] == 1
+
+
+def test_stale_artifact_is_dropped(client, generated):
+    """Rows whose files disappeared are removed instead of being served."""
+    _, manifest = generated
+    shutil.rmtree(os.path.join(tile_cache.get_cache_root(), manifest["key"]))
+
+    assert client.get(f"/api/tiles/artifacts/{manifest['key']}/").status_code == 404
+    assert not TileArtifact.objects.filter(cache_key=manifest["key"]).exists()
+
+
+def test_eviction_prefers_one_hit_entries(generated, settings):
+    """Entries that were reused outlive more recent one-hit entries."""
+    config, first = generated
+    tessellation = resolve_request("brick_tile", overrides=SMALL_TILE)[1]
+    tile_cache.get_or_generate_tile(config, tile_type="brick_tile", export_formats=["stl"],
+                                    tessellation=tessellation)
+    second, _ = tile_cache.get_or_generate_tile(config.with_overrides(tile_width=3), tile_type="brick_tile",
+                                                export_formats=["stl"], tessellation=tessellation)
+
+    settings.TILE_CACHE_MAX_ENTRIES = 2
+    tile_cache.get_or_generate_tile(config.with_overrides(tile_width=4), tile_type="brick_tile",
+                                    export_formats=["stl"], tessellation=tessellation)
+
+    assert tile_cache.lookup(first["key"]) is not None
+    assert tile_cache.lookup(second["key"]) is None
+    assert not TileArtifact.objects.filter(cache_key=second["key"]).exists()
@@ -0,0 +1,87 @@
+"""
+Test Script: test_artifact_lock.py
+Description: Test suite for single-flight artifact locking.
+"""
+
+import os
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from resources.helpers import tile_cache
+from resources.helpers.artifact_lock import artifact_lock, get_lock_root
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and reset counters."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+    return str(tmpdir)
+
+
+def test_lock_is_exclusive():
+    """A second holder waits until the first releases the lock."""
+    events = []
+    acquired = threading.Event()
+
+    def hold():
+        with artifact_lock("key") as waited:
+            acquired.set()
+            events.append(("first", waited))
+            time.sleep(0.2)
+            events.append(("first done", waited))
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait()
+    with artifact_lock("key") as waited:
+        events.append(("second", waited))
+    holder.join()
+
+    assert events == [("first", False), ("first done", False), ("second", True)]
+
+
+def test_lock_timeout():
+    """Waiting longer than the timeout raises instead of hanging."""
+    with artifact_lock("key"):
+        with pytest.raises(RuntimeError, match="Timed out"):
+            with artifact_lock("key", timeout=0.1):
+                pass
+
+
+def test_lock_file_is_removed_on_release():
+    """Released locks leave no files behind."""
+    with artifact_lock("key"):
+        assert os.path.exists(os.path.join(get_lock_root(), "key.lock"))
+    assert os.listdir(get_lock_root()) == []
+
+
+def test_concurrent_misses_build_once():
+    """Simultaneous requests for one configuration generate it once and share the files."""
+    config = {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+    barrier = threading.Barrier(4)
+
+    def request():
+        barrier.wait()
+        return tile_cache.get_or_generate_tile(config, tile_type="brick_tile")[0]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        manifests = list(executor.map(lambda _: request(), range(4)))
+
+    stats = tile_cache.cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+    assert len({manifest["exports"]["stl"]["sha256"] for manifest in manifests}) == 1
+    entry_dir = os.path.dirname(manifests[0]["paths"]["stl"])
+    assert not [name for name in os.listdir(entry_dir) if name.endswith(".tmp")]
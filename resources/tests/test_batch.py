@@ -0,0 +1,64 @@
+"""
+Test Script: test_batch.py
+Description: Test suite for batch / parameter-sweep generation.
+"""
+
+import os
+import pytest
+from resources.helpers.batch import dedupe_variants, expand_sweep, run_batch
+
+
+@pytest.fixture
+def base_config():
+    """Fixture providing a small brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory."""
+    settings.MEDIA_ROOT = str(tmpdir)
+
+
+def test_expand_sweep_is_cartesian(base_config):
+    """Every combination of swept values becomes one variant."""
+    variants = expand_sweep(base_config, {"bond_pattern": ["flemish", "stack"], "tile_width": [2, 3, 4]})
+    assert len(variants) == 6
+    assert variants[0] == ({"bond_pattern": "flemish", "tile_width": 2}, {**base_config, "tile_width": 2})
+
+
+def test_expand_sweep_rejects_scalars(base_config):
+    """Sweep values must be lists."""
+    with pytest.raises(ValueError, match="non-empty list"):
+        expand_sweep(base_config, {"tile_width": 4})
+
+
+def test_equivalent_variants_are_deduplicated(base_config):
+    """Repeated values collapse onto a single artifact key."""
+    variants = expand_sweep(base_config, {"tile_width": [2, 2, 3]})
+    groups = dedupe_variants(variants, "brick_tile", "v1.0")
+    assert sorted(groups.values()) == [[0, 1], [2]]
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_run_batch_streams_every_variant(base_config, max_workers):
+    """Each variant gets a result; duplicates point at the generated variant."""
+    results = list(run_batch(
+        base_config, {"tile_width": [2, 3, 3]}, tile_type="brick_tile", max_workers=max_workers
+    ))
+
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert all(result["status"] == "succeeded" for result in results)
+    assert all(os.path.exists(result["files"]["stl"]) for result in results)
+    duplicates = [result for result in results if "duplicate_of" in result]
+    assert [(result["index"], result["duplicate_of"]) for result in duplicates] == [(2, 1)]
@@ -0,0 +1,80 @@
+"""
+Test Script: test_benchmarks.py
+Description: Test suite for the tile pipeline benchmark suite and regression checks.
+"""
+
+import pytest
+from resources.helpers.benchmarks import (
+    benchmark_cases,
+    compare_results,
+    load_results,
+    run_suite,
+    save_results,
+)
+
+
+def results_with(**metrics):
+    """Build a one-case results document."""
+    return {"results": {"assemble_tile[flemish-4x4]": {"stage": "assemble_tile", **metrics}}}
+
+
+def test_cases_sweep_sizes_and_patterns():
+    """Size-dependent stages run every size; constructors only the first."""
+    cases = benchmark_cases(["brick_constructors", "assemble_tile"], sizes=((2, 2), (4, 4)),
+                            bond_patterns=("flemish", "stack"))
+    names = [name for name, _, _ in cases]
+    assert names == [
+        "brick_constructors[flemish-2x2]",
+        "brick_constructors[stack-2x2]",
+        "assemble_tile[flemish-2x2]",
+        "assemble_tile[flemish-4x4]",
+        "assemble_tile[stack-2x2]",
+        "assemble_tile[stack-4x4]",
+    ]
+
+
+def test_track_cases_sweep_sleeper_counts():
+    """Track stages are swept by sleeper count and ignore bond patterns."""
+    cases = benchmark_cases(["assemble_track"], sleeper_counts=(100, 200))
+    assert [name for name, _, _ in cases] == ["assemble_track[100-sleepers]", "assemble_track[200-sleepers]"]
+    assert cases[0][2]["track_length"] == 100 * cases[0][2]["spacing"]
+
+
+def test_unknown_stage():
+    """Typos in stage names are reported."""
+    with pytest.raises(ValueError, match="Unknown benchmark stage"):
+        benchmark_cases(["assemble_everything"])
+
+
+@pytest.mark.parametrize(
+    "current, regressed",
+    [
+        ({"seconds": 1.2, "peak_rss_bytes": 100 * 2**20, "output_bytes": 1000}, []),
+        ({"seconds": 1.5, "peak_rss_bytes": 100 * 2**20, "output_bytes": 1000}, ["seconds"]),
+        ({"seconds": 1.0, "peak_rss_bytes": 200 * 2**20, "output_bytes": 1100}, ["peak_rss_bytes", "output_bytes"]),
+    ],
+)
+def test_compare_results_flags_regressions(current, regressed):
+    """Metrics beyond their relative tolerance are reported; improvements are not."""
+    baseline = results_with(seconds=1.0, peak_rss_bytes=100 * 2**20, output_bytes=1000)
+    regressions = compare_results(results_with(**current), baseline)
+    assert [regression["metric"] for regression in regressions] == regressed
+
+
+def test_compare_results_ignores_noise():
+    """Tiny absolute differences on fast cases are not regressions."""
+    baseline = results_with(seconds=0.001)
+    assert compare_results(results_with(seconds=0.002), baseline) == []
+
+
+def test_suite_round_trips_and_matches_itself(tmpdir):
+    """A suite run is saved, reloaded and compares cleanly against itself."""
+    results = run_suite(stages=["mesh_engine_stl"], sizes=((2, 2),), bond_patterns=("flemish",),
+                        repeat=1, warmup=0)
+    case = results["results"]["mesh_engine_stl[flemish-2x2]"]
+    assert case["output_bytes"] > 84 and (case["output_bytes"] - 84) % 50 == 0
+    assert case["seconds"] > 0 and case["peak_rss_bytes"] > 0
+
+    path = str(tmpdir.join("baseline.json"))
+    save_results(results, path)
+    assert compare_results(results, load_results(path)) == []
@@ -0,0 +1,86 @@
+"""
+Test Script: test_brick_geometry.py
+Description: Test suite for the shared brick prototype registry.
+"""
+
+import pytest
+from resources.helpers import brick_geometry
+from resources.helpers.brick_helpers import assemble_brick_row
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing brick dimensions."""
+    return {
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "tile_width": 4,
+        "bond_pattern": "flemish",
+    }
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Start every test with an empty prototype registry."""
+    brick_geometry.clear_prototype_cache()
+    yield
+    brick_geometry.clear_prototype_cache()
+
+
+def test_prototype_is_built_once(brick_config):
+    """Repeated requests return the very same shape object."""
+    first = brick_geometry.get_brick_prototype(brick_config, "full")
+    second = brick_geometry.get_brick_prototype(dict(brick_config), "full")
+    assert first is second
+
+    stats = brick_geometry.prototype_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_prototype_dimensions(brick_config):
+    """Full and half prototypes keep the original brick dimensions."""
+    full = brick_geometry.get_brick_prototype(brick_config, "full").val().BoundingBox()
+    half = brick_geometry.get_brick_prototype(brick_config, "half").val().BoundingBox()
+    assert (full.xlen, full.ylen, full.zlen) == pytest.approx((250, 120, 60))
+    assert (half.xlen, half.ylen, half.zlen) == pytest.approx((125, 120, 60))
+
+
+def test_unknown_kind_rejected(brick_config):
+    """Only registered brick kinds can be requested."""
+    with pytest.raises(ValueError, match="Unsupported brick kind"):
+        brick_geometry.get_brick_prototype(brick_config, "quarter")
+
+
+def test_registry_is_bounded(brick_config, monkeypatch):
+    """The least recently used prototype is dropped once the bound is reached."""
+    monkeypatch.setattr(brick_geometry, "PROTOTYPE_CACHE_SIZE", 2)
+    for length in (200, 210, 220):
+        brick_geometry.get_brick_prototype(dict(brick_config, brick_length=length), "full")
+
+    stats = brick_geometry.prototype_cache_stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_rows_share_prototypes(brick_config):
+    """Bricks in different rows reference the same prototype solids."""
+    rows = [assemble_brick_row(brick_config, i) for i in range(4)]
+    shapes = {id(child.obj) for row in rows for child in row.children}
+    assert len(shapes) == 2
+    assert brick_geometry.prototype_cache_stats()["misses"] == 2
+
+
+def test_tile_rows_are_instanced(brick_config):
+    """Rows with the same layout reuse one template instead of being rebuilt."""
+    from resources.helpers.tile_assembly import assemble_tile
+
+    tile = assemble_tile(dict(brick_config, tile_type="bricks", row_repetition=10))
+    assert len(tile.children) == 10
+    assert [row.loc.toTuple()[0][2] for row in tile.children] == [i * 60 for i in range(10)]
+
+    bbox = tile.toCompound().BoundingBox()
+    assert bbox.zlen == pytest.approx(600)
+    assert brick_geometry.prototype_cache_stats()["misses"] == 2
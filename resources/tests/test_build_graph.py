@@ -0,0 +1,87 @@
+"""
+Test Script: test_build_graph.py
+Description: Test suite for incremental regeneration through the build graph.
+"""
+
+import os
+import pytest
+from resources.helpers import build_graph, tile_cache
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration exported through OpenCascade."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "mesh_engine": "occ",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def graph(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and start from an empty graph."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+    graph = build_graph.get_build_graph()
+    graph.clear()
+    yield graph
+    graph.clear()
+
+
+def test_row_key_ignores_row_repetition(brick_config):
+    """Rows do not depend on how many rows the tile has."""
+    taller = dict(brick_config, row_repetition=4)
+    assert build_graph.row_key(brick_config, 1) == build_graph.row_key(taller, 1)
+    assert build_graph.row_key(brick_config, 0) != build_graph.row_key(brick_config, 1)
+
+
+def test_geometry_key_ignores_export_options(brick_config):
+    """Export formats and STL options do not change the geometry key."""
+    changed = dict(brick_config, export_formats=["step"], stl_quality="draft")
+    assert build_graph.geometry_key(brick_config) == build_graph.geometry_key(changed)
+    assert build_graph.geometry_key(brick_config) != build_graph.geometry_key(dict(brick_config, tile_width=3))
+
+
+def test_adding_a_format_only_writes_the_new_file(brick_config, graph):
+    """Switching from STL to STL+STEP reuses the STL and exports only STEP."""
+    first, hit = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert not hit
+    assert "reused" not in first["exports"]["stl"]
+
+    second, hit = tile_cache.get_or_generate_tile(dict(brick_config, export_formats=["stl", "step"]),
+                                                  tile_type="brick_tile")
+    assert not hit
+    assert second["exports"]["stl"]["reused"] is True
+    assert "reused" not in second["exports"]["step"]
+    assert os.path.exists(second["paths"]["step"])
+    with open(first["paths"]["stl"], "rb") as old, open(second["paths"]["stl"], "rb") as new:
+        assert old.read() == new.read()
+    assert graph.stats()["file"] == {"hits": 1, "misses": 2}
+
+
+def test_adding_rows_reuses_row_assemblies(brick_config, graph):
+    """A taller tile reuses the rows built for the shorter one."""
+    graph.tile(brick_config)
+    assert graph.stats()["row"] == {"hits": 0, "misses": 2}
+
+    graph.tile(dict(brick_config, row_repetition=4))
+    stats = graph.stats()
+    assert stats["row"] == {"hits": 2, "misses": 2}
+    assert stats["tile"] == {"hits": 0, "misses": 2}
+
+
+def test_prune_artifacts_keeps_most_recent(brick_config, graph):
+    """Pruning removes stored files and their sidecars beyond the limit."""
+    tile_cache.get_or_generate_tile(dict(brick_config, export_formats=["stl", "step"]), tile_type="brick_tile")
+    assert build_graph.prune_artifacts(max_files=1) == 1
+    remaining = os.listdir(build_graph.get_artifact_root())
+    assert len([name for name in remaining if not name.endswith(".json")]) == 1
+    assert len([name for name in remaining if name.endswith(".json")]) == 1
@@ -0,0 +1,132 @@
+"""
+Test Script: test_config_service.py
+Description: Test suite for the cached, schema-validated config service in yaml_config.py.
+"""
+
+import os
+import pytest
+from resources.configs.yaml_config import (
+    BrickTileConfig,
+    clear_config_cache,
+    config_cache_stats,
+    load_config,
+    validate_config,
+)
+
+BASE_CONFIG = """
+tile_type: bricks
+brick_length: 250
+brick_width: 120
+brick_height: 60
+mortar_chamfer: 5
+row_repetition: 4
+tile_width: 4
+bond_pattern: flemish
+export_formats: [step, stl]
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    """Start every test with an empty config cache."""
+    clear_config_cache()
+    yield
+    clear_config_cache()
+
+
+@pytest.fixture
+def base_file(tmpdir):
+    """Fixture writing a valid brick configuration."""
+    path = tmpdir.join("base.yaml")
+    path.write(BASE_CONFIG)
+    return path
+
+
+def test_load_returns_immutable_normalized_config(base_file):
+    """Values are coerced to their schema types and cannot be modified."""
+    config = load_config(str(base_file))
+    assert isinstance(config, BrickTileConfig)
+    assert config["brick_length"] == 250.0 and isinstance(config["brick_length"], float)
+    assert config["export_formats"] == ("step", "stl")
+    assert config.get("stl_quality") == "print"
+    with pytest.raises(Exception):
+        config.tile_width = 8
+
+
+def test_config_is_hashable_and_mapping_like(base_file):
+    """Equal configs hash equally and unpack like dictionaries."""
+    config = load_config(str(base_file))
+    assert hash(config) == hash(validate_config(dict(config)))
+    assert {**config}["tile_width"] == 4
+    assert {config: "cached"}[config.with_overrides()] == "cached"
+
+
+def test_parse_cache_reuses_unchanged_files(base_file):
+    """Repeated loads hit the cache; touching without changing content does not re-parse."""
+    first = load_config(str(base_file))
+    assert load_config(str(base_file)) is first
+    os.utime(str(base_file), ns=(0, 0))
+    assert load_config(str(base_file)) is first
+    assert config_cache_stats()["parses"] == 1
+
+
+def test_edited_file_is_reloaded(base_file):
+    """Changed content produces a new config."""
+    load_config(str(base_file))
+    base_file.write(BASE_CONFIG.replace("tile_width: 4", "tile_width: 6"))
+    assert load_config(str(base_file))["tile_width"] == 6
+
+
+def test_extends_overrides_parent(base_file, tmpdir):
+    """Child files only list what differs from their parent."""
+    child = tmpdir.join("stack.yaml")
+    child.write("extends: base.yaml\nbond_pattern: stack\nrow_repetition: 8\n")
+    config = load_config(str(child))
+    assert (config["bond_pattern"], config["row_repetition"], config["tile_width"]) == ("stack", 8, 4)
+    assert "extends" not in config
+
+    # Editing the parent invalidates the child
+    base_file.write(BASE_CONFIG.replace("tile_width: 4", "tile_width: 5"))
+    assert load_config(str(child))["tile_width"] == 5
+
+
+def test_circular_extends(tmpdir):
+    """Inheritance cycles are rejected."""
+    tmpdir.join("a.yaml").write("extends: b.yaml\n")
+    tmpdir.join("b.yaml").write("extends: a.yaml\n")
+    with pytest.raises(ValueError, match="Circular"):
+        load_config(str(tmpdir.join("a.yaml")))
+
+
+@pytest.mark.parametrize("content", ["- tile_type: bricks\n", "bricks\n"])
+def test_non_mapping_config(tmpdir, content):
+    """A file whose top level is not a mapping is rejected, also as a parent."""
+    tmpdir.join("list.yaml").write(content)
+    tmpdir.join("child.yaml").write("extends: list.yaml\n")
+    for name in ("list.yaml", "child.yaml"):
+        with pytest.raises(ValueError, match="must be a mapping"):
+            load_config(str(tmpdir.join(name)))
+
+
+@pytest.mark.parametrize(
+    "replacement, message",
+    [
+        (("brick_length: 250", ""), "brick_length"),
+        (("tile_width: 4", "tile_width: many"), "tile_width"),
+        (("bond_pattern: flemish", "bond_pattern: herringbone"), "bond_pattern"),
+        (("tile_type: bricks", "tile_type: cobbles"), "Unsupported tile type"),
+    ],
+)
+def test_invalid_configs_raise_value_error(base_file, replacement, message):
+    """Missing keys, wrong types and unknown values are reported by name."""
+    base_file.write(BASE_CONFIG.replace(*replacement))
+    with pytest.raises(ValueError, match=message):
+        load_config(str(base_file))
+
+
+def test_validate_config_checks_tile_type(base_file):
+    """Aliases are accepted; mismatched tile types are not."""
+    config = load_config(str(base_file))
+    assert validate_config(config, "brick_tile") is config
+    with pytest.raises(ValueError):
+        validate_config(config, "plain_track")
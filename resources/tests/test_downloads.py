@@ -0,0 +1,143 @@
+"""
+Test Script: test_downloads.py
+Description: Test suite for streaming, range-capable artifact downloads.
+"""
+
+import asyncio
+import gzip
+import warnings
+import pytest
+from django.test import AsyncClient
+from resources.helpers.downloads import etag_matches, if_range_matches, parse_range, precompress
+from resources.helpers.tile_cache import get_or_generate_tile
+
+
+@pytest.fixture
+def artifact(settings, tmpdir):
+    """Fixture generating a small cached STL tile."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    settings.TILE_PRECOMPRESS = ("gzip",)
+    config = {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+    }
+    manifest, _ = get_or_generate_tile(config, tile_type="brick_tile", export_formats=["stl"])
+    with open(manifest["paths"]["stl"], "rb") as file:
+        data = file.read()
+    return f"/api/tiles/files/{manifest['key']}/stl/", manifest, data
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-10", (990, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=0-1,5-6", None),
+    ],
+)
+def test_parse_range(header, expected):
+    """Single ranges are clamped to the file; anything else serves the whole file."""
+    assert parse_range(header, 1000) == expected
+
+
+def test_parse_range_unsatisfiable():
+    """Ranges starting past the end are rejected."""
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_precompress_round_trips(tmpdir):
+    """Gzip copies decompress to the original bytes."""
+    path = tmpdir.join("tile.stl")
+    path.write_binary(b"solid" * 1000)
+    sizes = precompress(str(path), ["gzip"])
+    assert sizes["gzip"] < 5000
+    assert gzip.decompress(tmpdir.join("tile.stl.gz").read_binary()) == b"solid" * 1000
+
+
+def test_download_streams_with_strong_etag(client, artifact):
+    """Full downloads stream the file and revalidate with 304."""
+    url, manifest, data = artifact
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.streaming
+    assert b"".join(response.streaming_content) == data
+    assert response["ETag"] == f'"{manifest["exports"]["stl"]["sha256"]}"'
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+
+def test_download_range(client, artifact):
+    """Range requests return 206 with the requested slice."""
+    url, _, data = artifact
+    response = client.get(url, HTTP_RANGE="bytes=80-179")
+    assert response.status_code == 206
+    assert response["Content-Range"] == f"bytes 80-179/{len(data)}"
+    assert b"".join(response.streaming_content) == data[80:180]
+
+    response = client.get(url, HTTP_RANGE=f"bytes={len(data)}-")
+    assert response.status_code == 416
+
+
+def test_if_range_needs_strong_match():
+    """If-Range compares strongly; If-None-Match weakly."""
+    assert if_range_matches('"abc"', '"abc"')
+    assert not if_range_matches('W/"abc"', '"abc"')
+    assert not if_range_matches('"abc", "def"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+
+
+def test_download_if_range(client, artifact):
+    """A stale or weak If-Range validator gets the whole file instead of a slice."""
+    url, manifest, data = artifact
+    etag = f'"{manifest["exports"]["stl"]["sha256"]}"'
+    response = client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+    assert response.status_code == 206
+    for validator in (f"W/{etag}", '"stale"'):
+        response = client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=validator)
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == data
+
+
+def test_download_precompressed(client, artifact):
+    """Clients accepting gzip get the precompressed variant with its own ETag."""
+    url, _, data = artifact
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response["Content-Encoding"] == "gzip"
+    assert response["ETag"].endswith('-gzip"')
+    assert gzip.decompress(b"".join(response.streaming_content)) == data
+
+
+def test_download_unknown_artifact(client, artifact):
+    """Unknown keys and formats are 404s."""
+    url, _, _ = artifact
+    assert client.get(url.replace("/stl/", "/step/")).status_code == 404
+    assert client.get("/api/tiles/files/not-a-key/stl/").status_code == 404
+
+
+def test_asgi_downloads_stream_asynchronously(artifact):
+    """Under ASGI the body is an async iterator, so Django never buffers it into memory."""
+    url, _, data = artifact
+
+    async def fetch(headers=None):
+        response = await AsyncClient().get(url, headers=headers)
+        assert response.is_async
+        return response, b"".join([chunk async for chunk in response.streaming_content])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        response, body = asyncio.run(fetch())
+        assert response.status_code == 200 and body == data
+        assert response["Content-Length"] == str(len(data))
+        response, body = asyncio.run(fetch({"Range": "bytes=80-179"}))
+        assert response.status_code == 206 and body == data[80:180]
@@ -0,0 +1,58 @@
+"""
+Test Script: test_file_helper.py
+Description: Test suite for multi-format tile export.
+"""
+
+import os
+import pytest
+from resources.helpers.file_helper import atomic_output, export_tile
+from resources.helpers.tile_assembly import assemble_tile
+
+
+@pytest.fixture
+def tile():
+    """Fixture providing a small assembled brick tile."""
+    return assemble_tile({
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+    })
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_export_manifest(tile, tmpdir, parallel):
+    """Each format is written once and reported with its size and timing."""
+    manifest = export_tile(tile, version="test", export_formats=["step", "stl"], output_dir=str(tmpdir), parallel=parallel)
+
+    assert set(manifest["files"]) == {"step", "stl"}
+    for fmt, entry in manifest["files"].items():
+        assert entry["path"] == os.path.join(str(tmpdir), f"brick_tile_test.{fmt}")
+        assert entry["bytes"] == os.path.getsize(entry["path"]) > 0
+        assert entry["seconds"] >= 0
+
+    # Only the final files remain; temporary files were renamed into place
+    assert sorted(os.listdir(str(tmpdir))) == ["brick_tile_test.step", "brick_tile_test.stl"]
+
+
+def test_unsupported_format(tile, tmpdir):
+    """Unknown formats are rejected before anything is written."""
+    with pytest.raises(RuntimeError, match="Unsupported export format"):
+        export_tile(tile, export_formats=["obj"], output_dir=str(tmpdir))
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_atomic_output_discards_failed_writes(tmpdir):
+    """A failed write leaves neither a partial file nor a temporary file."""
+    target = os.path.join(str(tmpdir), "tile.stl")
+    with pytest.raises(ValueError):
+        with atomic_output(target) as temp_path:
+            with open(temp_path, "w") as file:
+                file.write("partial")
+            raise ValueError("writer failed")
+
+    assert os.listdir(str(tmpdir)) == []
@@ -0,0 +1,86 @@
+"""
+Test Script: test_fusion.py
+Description: Test suite for fusing tiles into single solids.
+"""
+
+import cadquery as cq
+import pytest
+from resources.helpers import build_graph, fusion, tile_cache
+from resources.helpers.mesh_engine import supports_mesh_engine
+from resources.helpers.tile_assembly import assemble_tile
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small fused brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 4,
+        "tile_width": 2,
+        "bond_pattern": "stack",
+        "fuse_solids": True,
+        "fuse_tolerance": 0.001,
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def graph(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and start from an empty graph."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+    graph = build_graph.get_build_graph()
+    graph.clear()
+    yield graph
+    graph.clear()
+
+
+def test_touching_boxes_fuse_into_one_solid():
+    """Shared faces disappear and coplanar faces are merged."""
+    left = cq.Solid.makeBox(10, 10, 10)
+    right = cq.Solid.makeBox(10, 10, 10, pnt=cq.Vector(10, 0, 0))
+    fused = fusion.fuse_shapes([left, right])
+    assert len(fused.Solids()) == 1
+    assert len(fused.Faces()) == 6
+    assert fused.Volume() == pytest.approx(2000)
+
+
+def test_fused_tile_matches_flat_fusion(brick_config):
+    """Row-by-row fusion gives the same solid as fusing every brick at once."""
+    tile = assemble_tile(brick_config)
+    flat = fusion.fuse_shapes(tile.toCompound().Solids())
+    hierarchical = fusion.fuse_tile(brick_config)
+    assert len(hierarchical.Solids()) == len(flat.Solids()) == 1
+    assert hierarchical.Volume() == pytest.approx(flat.Volume())
+    assert hierarchical.isValid()
+
+
+def test_fused_tiles_skip_the_mesh_engine(brick_config):
+    """Fused STL must come from the fused B-rep, not the per-brick mesh engine."""
+    assert not supports_mesh_engine(brick_config, ["stl"])
+    assert supports_mesh_engine(dict(brick_config, fuse_solids=False), ["stl"])
+
+
+def test_fused_export_is_smaller_and_cached(brick_config, graph):
+    """The fused STL has fewer triangles, and fusion runs once per geometry."""
+    plain, _ = tile_cache.get_or_generate_tile(dict(brick_config, fuse_solids=False, mesh_engine="occ"),
+                                               tile_type="brick_tile")
+    fused, _ = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert fused["exports"]["stl"]["triangles"] < plain["exports"]["stl"]["triangles"]
+
+    tile_cache.get_or_generate_tile(dict(brick_config, export_formats=["step"]), tile_type="brick_tile")
+    stats = graph.stats()
+    assert stats["fused_tile"] == {"hits": 1, "misses": 1}
+    assert stats["fused_row"]["misses"] == 1
+
+
+def test_fused_bricks_skip_the_tile_assembly(brick_config, graph):
+    """Fused brick tiles are built from fused rows only; the unfused tile is never assembled."""
+    tile_cache.get_or_generate_tile(dict(brick_config, export_formats=["step", "stl"]), tile_type="brick_tile")
+    stats = graph.stats()
+    assert stats["tile"] == {"hits": 0, "misses": 0}
+    assert stats["fused_tile"]["misses"] == 1
@@ -0,0 +1,47 @@
+"""
+Test Script: test_import_report.py
+Description: Test suite for cold-start import checks and the tile generation CLI.
+"""
+
+import os
+import pytest
+from resources.helpers.import_report import measure_imports, parse_importtime
+from resources.tiles import generate_tile
+
+
+def test_parse_importtime_tracks_depth():
+    """Indented entries are nested imports; the header line is skipped."""
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       311 |        311 |   _io",
+        "import time:       710 |       1726 | encodings",
+    ])
+    assert parse_importtime(output) == [("_io", 1, 311, 311), ("encodings", 0, 710, 1726)]
+
+
+def test_api_urls_do_not_import_geometry_libraries():
+    """Loading the URL conf (every API router) must not pull in CadQuery, OCP or NumPy."""
+    report = measure_imports("railworks_project.urls", top=5)
+    assert report["heavy"] == []
+    assert report["module_seconds"] > 0
+
+
+def test_import_failures_are_reported():
+    """A module that cannot be imported raises a RuntimeError naming it."""
+    with pytest.raises(RuntimeError, match="Import failed for resources.no_such_module"):
+        measure_imports("resources.no_such_module")
+
+
+def test_cli_generates_tile(settings, tmpdir):
+    """The CLI exports the requested formats into the output directory."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    output_dir = str(tmpdir.join("out"))
+    exit_code = generate_tile.main(["--tile-type", "brick_tile", "--formats", "stl", "--output-dir", output_dir])
+    assert exit_code == 0
+    assert os.path.exists(os.path.join(output_dir, "brick_tile_v2.0.stl"))
+
+
+def test_cli_reports_unknown_tile_type(capsys):
+    """Unsupported tile types exit with an error instead of a traceback."""
+    assert generate_tile.main(["--tile-type", "roof"]) == 1
+    assert "Unsupported tile type" in capsys.readouterr().out
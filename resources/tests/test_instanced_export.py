@@ -0,0 +1,174 @@
+"""
+Test Script: test_instanced_export.py
+Description: Test suite for instanced GLB and 3MF export.
+"""
+
+import json
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+import cadquery as cq
+import numpy as np
+import pytest
+from resources.configs.yaml_config import build_config
+from resources.helpers.instanced_export import collect_instances, export_3mf, export_glb
+from resources.helpers.tile_assembly import assemble_tile
+from resources.helpers.tile_cache import get_or_generate_tile
+from resources.helpers.wall_tiling import read_binary_stl
+
+COMPONENT_DTYPES = {5120: np.int8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+COMPONENTS = {"SCALAR": 1, "VEC3": 3, "VEC4": 4}
+CORE = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory."""
+    settings.MEDIA_ROOT = str(tmpdir)
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return build_config({
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 4,
+        "tile_width": 4,
+        "bond_pattern": "flemish",
+        "mesh_engine": "occ",
+        "export_formats": ["stl", "glb", "3mf"],
+    })
+
+
+def read_accessor(document, binary, index):
+    """Decode one glTF accessor into an ``(count, components)`` array."""
+    accessor = document["accessors"][index]
+    view = document["bufferViews"][accessor["bufferView"]]
+    dtype = np.dtype(COMPONENT_DTYPES[accessor["componentType"]])
+    components = COMPONENTS[accessor["type"]]
+    stride = view.get("byteStride", dtype.itemsize * components)
+    rows = np.frombuffer(binary, dtype=np.uint8, count=accessor["count"] * stride, offset=view["byteOffset"])
+    values = rows.reshape(accessor["count"], stride)[:, :dtype.itemsize * components].copy().view(dtype)
+    return values.astype(float)
+
+
+def quaternion_matrices(quaternions):
+    """Rotation matrices of ``(n, 4)`` quaternions (x, y, z, w)."""
+    x, y, z, w = quaternions.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=1)
+
+
+def read_glb(file_path):
+    """Return the GLB document and every instanced triangle in tile space (millimetres, Z up)."""
+    with open(file_path, "rb") as file:
+        data = file.read()
+    magic, version, length = struct.unpack_from("<III", data)
+    assert (magic, version, length) == (0x46546C67, 2, len(data))
+    json_length, _ = struct.unpack_from("<II", data, 12)
+    document = json.loads(data[20:20 + json_length])
+    binary = data[20 + json_length + 8:]
+
+    root = document["nodes"][0]
+    step = root["scale"][0] / 0.001
+    triangles = []
+    for node_index in root["children"]:
+        node = document["nodes"][node_index]
+        primitive = document["meshes"][node["mesh"]]["primitives"][0]
+        positions = read_accessor(document, binary, primitive["attributes"]["POSITION"]) * step
+        indices = read_accessor(document, binary, primitive["indices"]).astype(int).reshape(-1, 3)
+        attributes = node["extensions"]["EXT_mesh_gpu_instancing"]["attributes"]
+        translations = read_accessor(document, binary, attributes["TRANSLATION"]) * step
+        rotations = np.broadcast_to(np.eye(3), (len(translations), 3, 3))
+        if "ROTATION" in attributes:
+            rotations = quaternion_matrices(read_accessor(document, binary, attributes["ROTATION"]))
+        for rotation, translation in zip(rotations, translations):
+            triangles.append(positions[indices] @ rotation.T + translation)
+    return document, np.concatenate(triangles)
+
+
+def surface_area(triangles):
+    """Total area of an ``(n, 3, 3)`` triangle array."""
+    return 0.5 * np.linalg.norm(
+        np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1
+    ).sum()
+
+
+def test_prototypes_are_shared(brick_config):
+    """Every brick of the tile is an instance of one of two prototypes."""
+    instances = collect_instances(assemble_tile(brick_config))
+    assert len(instances) == 2
+    assert sum(len(transforms) for _, transforms in instances) == 16
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_glb_matches_stl(brick_config, quantize):
+    """The instanced GLB covers the same surface as the STL while being far smaller."""
+    config = brick_config.with_overrides(mesh_quantize=quantize)
+    manifest, _ = get_or_generate_tile(config, tile_type="brick_tile")
+    stl = read_binary_stl(manifest["paths"]["stl"])["vertices"].astype(float)
+    document, triangles = read_glb(manifest["paths"]["glb"])
+
+    entry = manifest["exports"]["glb"]
+    assert entry["instances"] == 16 and entry["prototypes"] == 2
+    assert entry["triangles"] == len(triangles) == len(stl)
+    assert entry["bytes"] * 4 < manifest["exports"]["stl"]["bytes"]
+    assert ("KHR_mesh_quantization" in document["extensionsRequired"]) == quantize
+
+    assert surface_area(triangles) == pytest.approx(surface_area(stl), rel=1e-4)
+    assert np.allclose(triangles.reshape(-1, 3).min(axis=0), stl.reshape(-1, 3).min(axis=0), atol=0.01)
+    assert np.allclose(triangles.reshape(-1, 3).max(axis=0), stl.reshape(-1, 3).max(axis=0), atol=0.01)
+
+
+def test_glb_rotated_instances(tmpdir):
+    """Rotated placements are written as instance rotations."""
+    box = cq.Workplane("XY").box(40, 10, 5)
+    assembly = cq.Assembly()
+    assembly.add(box, loc=cq.Location(cq.Vector(0, 0, 0)))
+    assembly.add(box, loc=cq.Location(cq.Vector(100, 0, 0), cq.Vector(0, 0, 1), 90))
+    file_path = str(tmpdir.join("rotated.glb"))
+
+    export_glb(assembly, file_path, {"quality": "draft"})
+    _, triangles = read_glb(file_path)
+
+    rotated = triangles[len(triangles) // 2:].reshape(-1, 3)
+    assert np.allclose(rotated.min(axis=0), [95, -20, -2.5], atol=1e-4)
+    assert np.allclose(rotated.max(axis=0), [105, 20, 2.5], atol=1e-4)
+
+
+def test_3mf_package(brick_config):
+    """The 3MF places one manifold mesh per prototype through components."""
+    manifest, _ = get_or_generate_tile(brick_config, tile_type="brick_tile")
+    with zipfile.ZipFile(manifest["paths"]["3mf"]) as package:
+        assert {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"} <= set(package.namelist())
+        model = ET.fromstring(package.read("3D/3dmodel.model"))
+
+    assert model.get("unit") == "millimeter"
+    meshes = model.findall(f"{CORE}resources/{CORE}object/{CORE}mesh")
+    components = model.findall(f".//{CORE}component")
+    assert len(meshes) == 2 and len(components) == 16
+
+    for mesh in meshes:
+        triangles = [
+            (int(t.get("v1")), int(t.get("v2")), int(t.get("v3"))) for t in mesh.iter(f"{CORE}triangle")
+        ]
+        edges = {}
+        for a, b, c in triangles:
+            for edge in ((a, b), (b, c), (c, a)):
+                edges[edge] = edges.get(edge, 0) + 1
+        # Closed and consistently oriented: every edge is used once in each direction
+        assert all(edges.get((b, a)) == 1 for (a, b), uses in edges.items() if uses == 1)
+        assert all(uses == 1 for uses in edges.values())
+
+
+def test_empty_tile_is_rejected(tmpdir):
+    """Tiles without geometry cannot be exported."""
+    with pytest.raises(ValueError, match="no geometry"):
+        export_3mf(cq.Assembly(), str(tmpdir.join("empty.3mf")), {"quality": "draft"})
@@ -0,0 +1,110 @@
+"""
+Test Script: test_instrumentation.py
+Description: Test suite for timing spans, counters and the metrics surface.
+"""
+
+import contextvars
+import threading
+import pytest
+from resources.helpers.instrumentation import (
+    count,
+    metrics_snapshot,
+    prometheus_text,
+    reset_metrics,
+    span,
+    trace_request,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start every test with empty aggregates."""
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def test_spans_nest_within_a_trace():
+    """Inner spans become children of the enclosing span."""
+    with trace_request() as trace:
+        with span("outer"):
+            with span("inner"):
+                count("bricks_placed", 4)
+            with span("inner"):
+                pass
+
+    assert [record["name"] for record in trace.spans] == ["outer"]
+    assert [child["name"] for child in trace.spans[0]["children"]] == ["inner", "inner"]
+    assert trace.counters == {"bricks_placed": 4}
+    assert trace.server_timing().startswith("outer;dur=")
+    assert "inner;dur=" in trace.server_timing()
+
+
+def test_spans_outside_a_trace_only_feed_aggregates():
+    """Untraced work is still counted process-wide."""
+    with span("assembly.tile"):
+        count("shapes_created")
+    snapshot = metrics_snapshot()
+    assert snapshot["spans"]["assembly.tile"]["count"] == 1
+    assert snapshot["counters"] == {"shapes_created": 1}
+
+
+def test_threads_join_the_trace_through_copied_context():
+    """Work run in a copied context records into the request's span tree."""
+    with trace_request() as trace:
+        with span("export"):
+            context = contextvars.copy_context()
+
+            def write():
+                with span("export.stl"):
+                    pass
+            worker = threading.Thread(target=context.run, args=(write,))
+            worker.start()
+            worker.join()
+
+    assert [child["name"] for child in trace.spans[0]["children"]] == ["export.stl"]
+
+
+def test_cprofile_capture():
+    """Profiling returns a text report with the trace."""
+    with trace_request(profile="cprofile") as trace:
+        sum(range(1000))
+    assert "function calls" in trace.to_dict()["profile"]
+
+
+def test_unknown_profiler():
+    """Only known profilers are accepted."""
+    with pytest.raises(ValueError, match="Unsupported profiler"):
+        with trace_request(profile="perf"):
+            pass
+
+
+def test_prometheus_text_format():
+    """Histograms are cumulative and counters carry the _total suffix."""
+    with span("export.step"):
+        pass
+    count("triangles_emitted", 28)
+    text = prometheus_text({"tile_cache_hits": 3})
+
+    assert '# TYPE railworks_stage_seconds histogram' in text
+    assert 'railworks_stage_seconds_bucket{stage="export.step",le="+Inf"} 1' in text
+    assert 'railworks_stage_seconds_bucket{stage="export.step",le="60.0"} 1' in text
+    assert 'railworks_stage_seconds_count{stage="export.step"} 1' in text
+    assert "railworks_triangles_emitted_total 28" in text
+    assert "railworks_tile_cache_hits_total 3" in text
+
+
+def test_generate_reports_timings(client, settings, tmpdir):
+    """The generate endpoint returns Server-Timing and, with debug, the span tree."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    response = client.post("/api/tiles/generate/?tile_type=brick_tile&debug=true")
+    assert response.status_code == 200
+    assert "config.load;dur=" in response["Server-Timing"]
+
+    timings = response.json()["timings"]
+    assert timings["spans"][0]["name"] == "request.generate"
+    assert timings["counters"]["bricks_placed"] > 0
+
+    metrics = client.get("/api/tiles/metrics/")
+    assert metrics["Content-Type"].startswith("text/plain")
+    assert b'stage="request.generate"' in metrics.content
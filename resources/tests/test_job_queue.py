@@ -0,0 +1,138 @@
+"""
+Test Script: test_job_queue.py
+Description: Test suite for asynchronous tile generation jobs.
+"""
+
+import os
+import subprocess
+import sys
+import time
+import pytest
+from resources.helpers import job_queue
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def job_settings(settings, tmpdir):
+    """Use a temporary media root and job database."""
+    settings.MEDIA_ROOT = str(tmpdir.mkdir("media"))
+    settings.TILE_JOB_DATABASE = str(tmpdir.join("jobs.sqlite3"))
+    settings.TILE_JOB_BACKEND = "inline"
+    yield settings
+    job_queue.shutdown_executor()
+
+
+def test_identical_inflight_requests_are_coalesced(brick_config, job_settings):
+    """A second identical request joins the queued job instead of creating one."""
+    store = job_queue.JobStore(job_settings.TILE_JOB_DATABASE)
+    first, created = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"])
+    second, joined_created = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"])
+
+    assert created and not joined_created
+    assert first["id"] == second["id"]
+
+
+def test_unknown_tile_type_is_404(client):
+    """Jobs for an unknown tile type are rejected before anything is queued."""
+    response = client.post("/api/tiles/jobs/?tile_type=no_such_tile")
+    assert response.status_code == 404
+    assert "no_such_tile" in response.json()["detail"]
+
+
+def test_finished_jobs_are_not_joined(brick_config, job_settings):
+    """Only queued/running jobs are coalesced; finished ones start a new job."""
+    store = job_queue.JobStore(job_settings.TILE_JOB_DATABASE)
+    first, _ = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"])
+    store.update(first["id"], status=job_queue.SUCCEEDED)
+
+    second, created = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"])
+    assert created
+    assert second["id"] != first["id"]
+
+
+def test_inline_job_runs_to_completion(brick_config):
+    """A submitted job records its progress and artifact paths."""
+    job, created = job_queue.submit_tile_job(brick_config, tile_type="brick_tile")
+
+    assert created
+    assert job["status"] == job_queue.SUCCEEDED
+    assert job["progress"] == 1.0
+    assert os.path.exists(job["result"]["files"]["stl"])
+    assert job_queue.get_tile_job(job["id"]) == job
+
+
+def test_thread_backend(brick_config, job_settings):
+    """The thread backend returns immediately and finishes in the background."""
+    job_settings.TILE_JOB_BACKEND = "thread"
+    job, _ = job_queue.submit_tile_job(brick_config, tile_type="brick_tile")
+    job_queue.shutdown_executor(wait=True)
+
+    assert job_queue.get_tile_job(job["id"])["status"] == job_queue.SUCCEEDED
+
+
+def test_failed_job_records_error(brick_config):
+    """Generation errors are stored on the job rather than raised to the caller."""
+    job, _ = job_queue.submit_tile_job(dict(brick_config, tile_type="unknown"), tile_type="brick_tile", export_formats=["step"])
+
+    assert job["status"] == job_queue.FAILED
+    assert "Unsupported tile type" in job["error"]
+
+
+@pytest.fixture
+def dead_pid():
+    """Pid of a process that has already exited."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_jobs_of_dead_owners_are_not_joined(brick_config, job_settings, dead_pid):
+    """A queued job whose owner process died is failed, and the next request starts a new job."""
+    store = job_queue.JobStore(job_settings.TILE_JOB_DATABASE)
+    orphan, _ = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"], owner_pid=dead_pid)
+
+    job, created = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"], owner_pid=os.getpid())
+    assert created and job["id"] != orphan["id"]
+    orphan = store.get(orphan["id"])
+    assert orphan["status"] == job_queue.FAILED and "gone" in orphan["error"]
+
+    # Pool jobs have no owner and wait for a worker however long it takes
+    pooled, _ = store.create_or_join("pooled", "brick_tile", "v1.0", brick_config, ["stl"])
+    assert store.create_or_join("pooled", "brick_tile", "v1.0", brick_config, ["stl"])[0]["id"] == pooled["id"]
+
+
+def test_expired_lease_fails_running_job(brick_config, job_settings):
+    """A running job that stops heartbeating is reported failed instead of running forever."""
+    store = job_queue.JobStore(job_settings.TILE_JOB_DATABASE, lease=60)
+    job, _ = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"], owner_pid=os.getpid())
+    assert store.claim(job["id"])
+    assert store.get(job["id"])["status"] == job_queue.RUNNING
+
+    store.update(job["id"], heartbeat_at=job["created_at"] - 120)
+    expired = store.get(job["id"])
+    assert expired["status"] == job_queue.FAILED and "heartbeat" in expired["error"]
+    assert store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"])[1]
+
+
+def test_running_job_heartbeats(brick_config, job_settings):
+    """Jobs renew their lease while they run."""
+    store = job_queue.JobStore(job_settings.TILE_JOB_DATABASE, lease=0.2)
+    job, _ = store.create_or_join("key", "brick_tile", "v1.0", brick_config, ["stl"], owner_pid=os.getpid())
+    with job_queue._heartbeat(store, job["id"]):
+        time.sleep(0.15)
+    assert store.get(job["id"])["heartbeat_at"] is not None
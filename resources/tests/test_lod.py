@@ -0,0 +1,126 @@
+"""
+Test Script: test_lod.py
+Description: Test suite for level-of-detail tile variants.
+"""
+
+import json
+import struct
+import pytest
+from resources.configs.yaml_config import build_config, get_default_config_path, load_config
+from resources.helpers import brick_geometry, lod, track_geometry
+from resources.helpers.brick_layout import brick_tile_placements
+from resources.helpers.mesh_engine import build_tile_mesh
+from resources.helpers.tile_assembly import assemble_tile
+from resources.helpers.tile_cache import artifact_key, get_or_generate_tile
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and start from an empty prototype registry."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    brick_geometry.clear_prototype_cache()
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return build_config({
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 4,
+        "tile_width": 3,
+        "bond_pattern": "flemish",
+        "mesh_engine": "occ",
+        "export_formats": ["stl"],
+    })
+
+
+@pytest.mark.parametrize("tile_type", ["bricks", "plain_track"])
+def test_slab_covers_the_full_tile(brick_config, tile_type):
+    """The slab and the extent computed without building match the full tile's bounds."""
+    config = brick_config if tile_type == "bricks" else load_config(get_default_config_path("plain_track"))
+    full = assemble_tile(config).toCompound().BoundingBox()
+    slab = assemble_tile(config.with_overrides(lod=lod.SLAB_LOD)).toCompound()
+
+    assert len(slab.Solids()) == 1
+    lower, upper = lod.tile_extent(config)
+    for box in (slab.BoundingBox(), full):
+        assert (box.xmin, box.ymin, box.zmin) == pytest.approx(lower)
+        assert (box.xmax, box.ymax, box.zmax) == pytest.approx(upper)
+
+
+def test_box_level_drops_chamfers(brick_config):
+    """Bricks at the box level are plain boxes with their own prototypes."""
+    full = assemble_tile(brick_config).toCompound()
+    boxes = assemble_tile(brick_config.with_overrides(lod=lod.BOX_LOD)).toCompound()
+
+    assert len(boxes.Solids()) == len(full.Solids())
+    assert all(len(solid.Faces()) == 6 for solid in boxes.Solids())
+    assert boxes.Volume() > full.Volume()
+    assert brick_geometry.prototype_cache_stats()["misses"] == 4
+
+
+def test_track_box_level_drops_chairs():
+    """Track tiles at the box level keep their sleepers and rails only."""
+    config = load_config(get_default_config_path("plain_track")).with_overrides(lod=lod.BOX_LOD)
+    sleepers = len(track_geometry.sleeper_positions(config))
+    assert len(assemble_tile(config).toCompound().Solids()) == sleepers + 2
+
+
+def test_mesh_engine_levels(brick_config):
+    """The mesh engine emits unchamfered bricks at the box level and 12 triangles for a slab."""
+    config = brick_config.with_overrides(mesh_engine="auto")
+    full = build_tile_mesh(config)
+    boxes = build_tile_mesh(config.with_overrides(lod=lod.BOX_LOD))
+    slab = build_tile_mesh(config.with_overrides(lod=lod.SLAB_LOD))
+
+    assert len(boxes) == 12 * len(brick_tile_placements(config)) < len(full)
+    assert len(slab) == 12
+    lower, upper = lod.tile_extent(config)
+    assert slab.reshape(-1, 3).min(axis=0) == pytest.approx(lower)
+    assert slab.reshape(-1, 3).max(axis=0) == pytest.approx(upper)
+
+
+def test_mortar_hint(brick_config):
+    """The slab's mortar hint lists the joints of each distinct row layout."""
+    hint = lod.mortar_hint(brick_config)
+    assert hint["course_height"] == 60 and hint["courses"] == 4
+    assert hint["joint_width"] == 10
+    assert len(hint["row_joints"]) == 2
+    assert lod.mortar_hint(load_config(get_default_config_path("plain_track"))) is None
+
+
+def test_every_level_is_cached_separately(brick_config):
+    """Each level has its own cache key; the slab GLB carries the mortar hint."""
+    keys = {artifact_key(brick_config.with_overrides(lod=level), "brick_tile", "v1.0", ["stl"], {})
+            for level in range(len(lod.LOD_LEVELS))}
+    assert len(keys) == 3
+
+    config = brick_config.with_overrides(lod=lod.SLAB_LOD, export_formats=("stl", "glb"))
+    manifest, cached = get_or_generate_tile(config, tile_type="brick_tile")
+    assert not cached
+    assert manifest["exports"]["stl"]["triangles"] == 12
+
+    with open(manifest["paths"]["glb"], "rb") as file:
+        data = file.read()
+    json_length, _ = struct.unpack_from("<II", data, 12)
+    root = json.loads(data[20:20 + json_length])["nodes"][0]
+    assert root["extras"]["mortar"] == lod.mortar_hint(config)
+
+
+def test_generate_serves_requested_level(client):
+    """``lod`` on the generate endpoint selects the level and returns the slab's mortar hint."""
+    response = client.post("/api/tiles/generate/?tile_type=brick_tile&lod=2")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["lod"] == 2
+    assert body["mortar"]["courses"] > 0
+
+    full = client.post("/api/tiles/generate/?tile_type=brick_tile").json()
+    assert full["lod"] == 0 and "mortar" not in full
+    assert full["cache_key"] != body["cache_key"]
+
+    assert client.post("/api/tiles/generate/?tile_type=brick_tile&lod=3").status_code == 400
@@ -0,0 +1,74 @@
+"""
+Test Script: test_mesh_engine.py
+Description: Parity tests between the NumPy mesh engine and the CadQuery path.
+"""
+
+import numpy as np
+import pytest
+from resources.helpers.mesh_engine import (
+    build_tile_mesh,
+    chamfered_box_triangles,
+    export_tile_mesh,
+)
+from resources.helpers.tile_assembly import assemble_tile
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 3,
+        "tile_width": 5,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+def signed_volume(triangles):
+    """Volume enclosed by an outward-oriented triangle mesh."""
+    return np.einsum("ij,ij->i", triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6
+
+
+@pytest.mark.parametrize("bond_pattern", ["flemish", "stretcher", "stack"])
+def test_mesh_matches_cadquery(brick_config, bond_pattern):
+    """Bounding box and triangle count match the OCC tessellation."""
+    config = dict(brick_config, bond_pattern=bond_pattern)
+    mesh = build_tile_mesh(config)
+
+    compound = assemble_tile(config).toCompound()
+    bbox = compound.BoundingBox()
+    _, occ_triangles = compound.tessellate(0.1, 0.1)
+
+    assert len(mesh) == len(occ_triangles)
+    points = mesh.reshape(-1, 3)
+    assert points.min(axis=0) == pytest.approx((bbox.xmin, bbox.ymin, bbox.zmin), abs=1e-3)
+    assert points.max(axis=0) == pytest.approx((bbox.xmax, bbox.ymax, bbox.zmax), abs=1e-3)
+
+
+@pytest.mark.parametrize("chamfer", [0, 5, 10])
+def test_prototype_volume(chamfer):
+    """The canonical brick is closed and outward-facing."""
+    import cadquery as cq
+
+    triangles = chamfered_box_triangles(250, 120, 60, chamfer)
+    solid = cq.Workplane("XY").box(250, 120, 60)
+    if chamfer:
+        solid = solid.edges("|Z or |X").chamfer(chamfer)
+    assert signed_volume(triangles) == pytest.approx(solid.val().Volume())
+
+
+def test_binary_stl_export(brick_config, tmpdir):
+    """The exported file is a binary STL with the expected triangle count."""
+    manifest = export_tile_mesh(brick_config, version="test", output_dir=str(tmpdir))
+    with open(manifest["files"]["stl"]["path"], "rb") as file:
+        data = file.read()
+
+    triangle_count = int(np.frombuffer(data[80:84], dtype="<u4")[0])
+    assert triangle_count == len(build_tile_mesh(brick_config))
+    assert len(data) == 84 + 50 * triangle_count
+    assert manifest["files"]["stl"]["bytes"] == len(data)
@@ -0,0 +1,145 @@
+"""
+Test Script: test_offload.py
+Description: Test suite for the bounded executor behind the async API handlers.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import pytest
+from django.test import AsyncClient
+from resources.helpers import batch, offload
+
+
+@pytest.fixture(autouse=True)
+def single_worker(settings, tmpdir):
+    """One worker, no queue and a fresh executor for every test."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    settings.TILE_OFFLOAD_WORKERS = 1
+    settings.TILE_OFFLOAD_QUEUE = 0
+    offload.shutdown_offload_executor()
+    offload.reset_offload_stats()
+    yield
+    offload.shutdown_offload_executor()
+
+
+@pytest.fixture
+def busy_worker():
+    """Occupy the only worker until the test ends."""
+    release = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(offload.offload(release.wait, 30)))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while offload.offload_stats()["in_flight"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield
+    release.set()
+    thread.join()
+
+
+def test_offload_returns_results_and_errors():
+    """Results and exceptions of the offloaded call reach the awaiting coroutine."""
+    assert asyncio.run(offload.offload(sum, [1, 2, 3])) == 6
+    with pytest.raises(ValueError, match="bad"):
+        asyncio.run(offload.offload(int, "bad"))
+
+    stats = offload.offload_stats()
+    assert stats["completed"] == 2 and stats["in_flight"] == 0
+    assert stats["average_seconds"] is not None
+
+
+def test_saturated_executor_rejects(busy_worker):
+    """With every slot taken, new work is rejected at once instead of queueing."""
+    started = time.monotonic()
+    with pytest.raises(offload.Saturated) as error:
+        asyncio.run(offload.offload(sum, [1]))
+
+    assert time.monotonic() - started < 1
+    assert error.value.retry_after >= offload.DEFAULT_RETRY_AFTER
+    assert offload.offload_stats()["rejected"] == 1
+
+
+def test_api_answers_429_while_light_endpoints_stay_up(client, busy_worker):
+    """Generation is refused with Retry-After; config and helper endpoints still answer."""
+    response = client.post("/api/tiles/generate/?tile_type=brick_tile")
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) >= 1
+
+    started = time.monotonic()
+    assert client.get("/api/configs/bricks/config/").status_code == 200
+    assert client.get("/api/helpers/check-media-folder").status_code == 200
+    assert time.monotonic() - started < 5
+
+    workers = client.get("/api/tiles/workers/").json()["offload"]
+    assert workers["in_flight"] == 1 and workers["rejected"] == 1
+
+
+def test_unknown_tile_type_is_404(client):
+    """Generation of an unknown tile type is a 404, not a server error."""
+    response = client.post("/api/tiles/generate/?tile_type=no_such_tile")
+    assert response.status_code == 404
+    assert "no_such_tile" in response.json()["detail"]
+
+
+def test_cache_hits_skip_the_executor(client, request):
+    """Cached previews and tiles are served while the executor is saturated."""
+    assert client.get("/api/tiles/preview/brick_tile/").status_code == 200
+    assert client.post("/api/tiles/generate/?tile_type=brick_tile&lod=2").status_code == 200
+    request.getfixturevalue("busy_worker")
+
+    assert client.get("/api/tiles/preview/brick_tile/").status_code == 200
+    response = client.post("/api/tiles/generate/?tile_type=brick_tile&lod=2")
+    assert response.status_code == 200 and response.json()["cached"]
+    assert client.get("/api/tiles/preview/brick_tile/?lod=1").status_code == 429
+    assert offload.offload_stats()["rejected"] == 1
+
+
+@pytest.fixture
+def shared_batch_pool(settings):
+    """A one-process shared batch pool, stopped after the test."""
+    settings.TILE_BATCH_WORKERS = 1
+    batch.shutdown_batch_executor()
+    yield
+    batch.shutdown_batch_executor()
+
+
+def test_batches_are_admitted_and_stream(client, shared_batch_pool, request):
+    """Batches stream NDJSON from the shared pool, under ASGI as an async iterator, and get 429 when saturated."""
+    payload = {"tile_type": "brick_tile", "overrides": {"export_formats": ["stl"], "row_repetition": 2},
+               "sweep": {"tile_width": [2, 3, 3]}}
+    lines = b"".join(client.post("/api/tiles/batch/", payload, content_type="application/json").streaming_content)
+    results = [json.loads(line) for line in lines.splitlines()]
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert all(result["status"] == "succeeded" for result in results)
+
+    async def stream():
+        response = await AsyncClient().post("/api/tiles/batch/", payload, content_type="application/json")
+        assert response.is_async
+        return [json.loads(line) async for line in response.streaming_content]
+
+    assert all(result["cached"] for result in asyncio.run(stream()))
+
+    request.getfixturevalue("busy_worker")
+    response = client.post("/api/tiles/batch/", payload, content_type="application/json")
+    assert response.status_code == 429 and int(response["Retry-After"]) >= 1
+
+
+@pytest.mark.django_db
+def test_closed_batch_stream_stops_the_batch(client, shared_batch_pool):
+    """Closing the response (a client disconnect) frees the slot without building the rest of the sweep."""
+    from resources.helpers.tile_cache import MANIFEST_NAME, get_cache_root
+
+    payload = {"tile_type": "brick_tile", "overrides": {"export_formats": ["stl"], "row_repetition": 2},
+               "sweep": {"tile_width": [2, 3, 4, 5, 6, 7, 8, 9]}}
+    response = client.post("/api/tiles/batch/", payload, content_type="application/json")
+    assert json.loads(next(iter(response.streaming_content)))["status"] == "succeeded"
+    response.close()
+
+    deadline = time.monotonic() + 60
+    while offload.offload_stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert offload.offload_stats()["in_flight"] == 0
+    built = [name for _, _, names in os.walk(get_cache_root()) for name in names if name == MANIFEST_NAME]
+    assert len(built) < len(payload["sweep"]["tile_width"])
@@ -0,0 +1,116 @@
+"""
+Test Script: test_preview.py
+Description: Test suite for headless PNG tile previews.
+"""
+
+import struct
+import zlib
+import numpy as np
+import pytest
+from resources.configs.yaml_config import build_config
+from resources.helpers import preview, tile_cache
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return build_config({
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 4,
+        "tile_width": 4,
+        "bond_pattern": "flemish",
+        "export_formats": ["png"],
+    })
+
+
+def square(size, z=0.0):
+    """Two triangles covering a square centred on the origin at height ``z``."""
+    h = size / 2
+    corners = np.array([[-h, -h, z], [h, -h, z], [h, h, z], [-h, h, z]])
+    return corners[[[0, 1, 2], [0, 2, 3]]]
+
+
+def decode_png(data):
+    """Decode an 8-bit RGBA PNG without filters into an ``(h, w, 4)`` array."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset, chunks = 8, {}
+    while offset < len(data):
+        length, tag = struct.unpack_from(">I4s", data, offset)
+        body = data[offset + 8:offset + 8 + length]
+        assert struct.unpack_from(">I", data, offset + 8 + length)[0] == zlib.crc32(tag + body)
+        chunks[tag] = chunks.get(tag, b"") + body
+        offset += 12 + length
+    width, height, depth, color_type = struct.unpack_from(">IIBB", chunks[b"IHDR"])
+    assert (depth, color_type) == (8, 6)
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def test_png_round_trip():
+    """Encoded images decode back to the same pixels."""
+    image = np.random.default_rng(0).integers(0, 256, size=(7, 5, 4), dtype=np.uint8)
+    assert np.array_equal(decode_png(preview.encode_png(image)), image)
+
+
+def test_top_view_fills_square():
+    """A square seen from the top fills the image inside the margin; the background stays transparent."""
+    image = preview.rasterize(square(10), size=100, view="top")
+    alpha = image[..., 3]
+    assert alpha[50, 50] == 255 and alpha[2, 2] == 0
+    assert (alpha > 127).mean() == pytest.approx((1 - 2 * preview.MARGIN) ** 2, abs=0.02)
+
+
+def test_nearer_faces_hide_farther_ones():
+    """The depth buffer keeps the nearest face, whatever the drawing order."""
+    tilted = square(10) @ np.array([[1, 0, 0], [0, 0.8, -0.6], [0, 0.6, 0.8]]).T + [0, 0, -5]
+    near = square(20)
+    expected = preview.rasterize(near, size=64, view="top")[32, 32]
+    for triangles in (np.concatenate([tilted, near]), np.concatenate([near, tilted])):
+        assert np.array_equal(preview.rasterize(triangles, size=64, view="top")[32, 32], expected)
+    assert not np.array_equal(preview.rasterize(tilted, size=64, view="top")[32, 32], expected)
+
+
+def test_invalid_input():
+    """Unknown views and empty meshes are rejected."""
+    with pytest.raises(ValueError, match="Unsupported preview view"):
+        preview.rasterize(square(1), view="worm")
+    with pytest.raises(ValueError, match="no geometry"):
+        preview.rasterize(np.empty((0, 3, 3)))
+
+
+def test_mesh_engine_matches_cadquery(brick_config):
+    """Previews from the mesh engine and from the B-rep tile show the same silhouette."""
+    fast, _ = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    occ, _ = tile_cache.get_or_generate_tile(brick_config.with_overrides(mesh_engine="occ"), tile_type="brick_tile")
+
+    images = []
+    for manifest in (fast, occ):
+        assert manifest["exports"]["png"]["width"] == preview.PREVIEW_SIZE
+        with open(manifest["paths"]["png"], "rb") as file:
+            images.append(decode_png(file.read()).astype(int))
+    assert np.abs(images[0][..., 3] - images[1][..., 3]).mean() < 2
+
+
+def test_preview_endpoint_is_cached(client):
+    """The preview endpoint renders once, then serves the cached file."""
+    response = client.get("/api/tiles/preview/brick_tile/")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    assert decode_png(b"".join(response.streaming_content)).shape == (preview.PREVIEW_SIZE, preview.PREVIEW_SIZE, 4)
+
+    assert client.get("/api/tiles/preview/brick_tile/").status_code == 200
+    assert client.get("/api/tiles/preview/brick_tile/?lod=2").status_code == 200
+    assert tile_cache.cache_stats()["misses"] == 2
+    assert client.get("/api/tiles/preview/no_such_tile/").status_code == 404
@@ -0,0 +1,131 @@
+"""
+Test Script: test_stl_stream.py
+Description: Test suite for the streaming binary STL writer.
+"""
+
+import numpy as np
+import pytest
+from resources.configs.yaml_config import build_config, get_default_config_path, load_config
+from resources.helpers import instanced_export
+from resources.helpers.mesh_engine import build_tile_mesh, iter_tile_mesh
+from resources.helpers.stl_stream import (
+    StlStreamWriter,
+    choose_prototype_tessellation,
+    iter_instance_triangles,
+    stream_tile_stl,
+)
+from resources.helpers.tessellation import choose_tessellation, resolve_tessellation
+from resources.helpers.tile_assembly import assemble_tile
+from resources.helpers.wall_tiling import read_binary_stl
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a brick tile configuration."""
+    return build_config({
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 6,
+        "tile_width": 6,
+        "bond_pattern": "flemish",
+        "mesh_engine": "occ",
+    })
+
+
+def surface_area(triangles):
+    """Total area of an ``(n, 3, 3)`` triangle array."""
+    return 0.5 * np.linalg.norm(
+        np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1
+    ).sum()
+
+
+def test_writer_patches_triangle_count(tmpdir):
+    """Batches are appended and the header count is written on close."""
+    file_path = str(tmpdir.join("stream.stl"))
+    triangles = np.arange(36, dtype=np.float32).reshape(4, 3, 3)
+    with StlStreamWriter(file_path) as writer:
+        writer.write(triangles[:1])
+        writer.write(triangles[1:])
+
+    with open(file_path, "rb") as file:
+        assert int(np.frombuffer(file.read()[80:84], dtype="<u4")[0]) == 4
+    assert np.array_equal(read_binary_stl(file_path)["vertices"], triangles)
+    assert writer.bounds == {"min": [0.0, 1.0, 2.0], "max": [33.0, 34.0, 35.0]}
+
+
+@pytest.mark.parametrize("tile_type", ["bricks", "plain_track"])
+def test_stream_matches_compound_mesh(brick_config, tile_type, tmpdir):
+    """Streaming the assembly writes the same surface as meshing the whole compound."""
+    config = brick_config if tile_type == "bricks" else load_config(get_default_config_path("plain_track"))
+    tile = assemble_tile(config)
+    file_path = str(tmpdir.join("tile.stl"))
+
+    details = stream_tile_stl(tile, file_path, resolve_tessellation(config))
+    streamed = read_binary_stl(file_path)["vertices"].astype(float)
+
+    compound = tile.toCompound()
+    chosen = choose_tessellation(compound, resolve_tessellation(config))
+    vertices, indices = compound.tessellate(chosen["tolerance"], chosen["angular_tolerance"])
+    points = np.array([vertex.toTuple() for vertex in vertices])
+    meshed = points[np.array(indices)]
+
+    assert details["triangles"] == len(streamed) == chosen["triangles"]
+    assert surface_area(streamed) == pytest.approx(surface_area(meshed), rel=1e-6)
+    box = compound.BoundingBox()
+    assert details["bounds"]["min"] == pytest.approx([box.xmin, box.ymin, box.zmin], abs=1e-3)
+    assert details["bounds"]["max"] == pytest.approx([box.xmax, box.ymax, box.zmax], abs=1e-3)
+
+
+def test_budget_steps_to_coarser_preset(tmpdir):
+    """A triangle budget is checked on the prototype meshes before anything is written."""
+    import cadquery as cq
+
+    tile = cq.Assembly()
+    cylinder = cq.Workplane("XY").cylinder(10, 20)
+    for i in range(4):
+        tile.add(cylinder, loc=cq.Location(cq.Vector(50 * i, 0, 0)))
+    prototypes = instanced_export.count_instances(tile)
+    assert [placements for _, _, placements in prototypes] == [4]
+    draft = choose_prototype_tessellation(prototypes, resolve_tessellation(quality="draft"))[1]["triangles"]
+
+    details = stream_tile_stl(tile, str(tmpdir.join("c.stl")), resolve_tessellation(
+        quality="archive", max_triangles=draft
+    ))
+    assert details["quality"] == "draft" and details["budget_met"]
+    assert details["triangles"] == draft
+
+
+def test_batches_stay_bounded(brick_config, monkeypatch):
+    """Placed triangles come in batches of the requested size, and placements are walked lazily."""
+    tile = assemble_tile(brick_config)
+    meshes = choose_prototype_tessellation(instanced_export.count_instances(tile), resolve_tessellation())[0]
+    largest = max(len(corners) for corners in meshes.values())
+
+    walked = []
+
+    def iter_instances(tile):
+        for placement in real_iter_instances(tile):
+            walked.append(placement)
+            yield placement
+
+    real_iter_instances = instanced_export.iter_instances
+    monkeypatch.setattr(instanced_export, "iter_instances", iter_instances)
+    batches = iter_instance_triangles(tile, meshes, batch=100)
+    first = next(batches)
+    # The first batch is placed before the walk has reached the rest of the tile
+    assert len(first) <= max(100, largest)
+    assert len(walked) < 36
+    batches = [first, *batches]
+    assert len(walked) == 36 and len(batches) > 2
+    assert max(len(batch) for batch in batches) <= max(100, largest)
+    assert sum(len(batch) for batch in batches) == sum(
+        len(meshes[key]) for key, _, _ in walked
+    )
+
+    engine_config = brick_config.with_overrides(mesh_engine="auto")
+    chunks = list(iter_tile_mesh(engine_config, batch_triangles=100))
+    assert max(len(chunk) for chunk in chunks) <= 100
+    assert np.array_equal(np.concatenate(chunks), build_tile_mesh(engine_config))
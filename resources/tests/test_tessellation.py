@@ -0,0 +1,69 @@
+"""
+Test Script: test_tessellation.py
+Description: Test suite for STL quality presets and size budgets.
+"""
+
+import os
+import cadquery as cq
+import pytest
+from resources.helpers.file_helper import export_tile
+from resources.helpers.tessellation import (
+    choose_tessellation,
+    mesh_shape,
+    resolve_tessellation,
+    stl_size,
+)
+
+
+@pytest.fixture
+def cylinder():
+    """A curved solid whose triangle count depends on the tolerance."""
+    return cq.Workplane("XY").cylinder(50, 30).val()
+
+
+def test_presets_trade_detail_for_size(cylinder):
+    """Finer presets produce more triangles."""
+    draft = mesh_shape(cylinder, 1.0, 0.5)
+    archive = mesh_shape(cylinder, 0.01, 0.05)
+    assert archive > draft
+
+
+def test_unknown_quality_rejected():
+    """Only the named presets are accepted."""
+    with pytest.raises(ValueError, match="Unsupported tessellation quality"):
+        resolve_tessellation(quality="ultra")
+
+
+def test_config_keys_are_defaults():
+    """Explicit options override the stl_* configuration keys."""
+    config = {"stl_quality": "draft", "stl_max_triangles": 100}
+    assert resolve_tessellation(config) == {"quality": "draft", "max_triangles": 100, "max_bytes": None}
+    assert resolve_tessellation(config, quality="archive")["quality"] == "archive"
+
+
+def test_budget_steps_down_to_coarser_preset(cylinder):
+    """The finest preset that fits the triangle budget is chosen."""
+    draft = mesh_shape(cylinder, 1.0, 0.5)
+    chosen = choose_tessellation(cylinder, resolve_tessellation(quality="archive", max_triangles=draft))
+    assert chosen["quality"] == "draft"
+    assert chosen["triangles"] == draft
+    assert chosen["budget_met"]
+
+
+def test_unreachable_budget_is_reported(cylinder):
+    """When no preset fits, the coarsest mesh is kept and flagged."""
+    chosen = choose_tessellation(cylinder, resolve_tessellation(max_bytes=stl_size(1)))
+    assert chosen["quality"] == "draft"
+    assert not chosen["budget_met"]
+
+
+def test_export_writes_binary_stl_with_triangle_count(tmpdir):
+    """The STL manifest entry records the triangle count of the binary file."""
+    tile = cq.Assembly().add(cq.Workplane("XY").cylinder(50, 30))
+    manifest = export_tile(
+        tile, export_formats=["stl"], output_dir=str(tmpdir),
+        tessellation=resolve_tessellation(quality="draft"),
+    )
+    entry = manifest["files"]["stl"]
+    assert entry["quality"] == "draft"
+    assert entry["bytes"] == stl_size(entry["triangles"]) == os.path.getsize(entry["path"])
@@ -0,0 +1,101 @@
+"""
+Test Script: test_tile_cache.py
+Description: Test suite for the content-addressed tile cache.
+"""
+
+import os
+import pytest
+from resources.helpers import tile_cache
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory and reset counters."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    tile_cache.reset_cache_stats()
+    return str(tmpdir)
+
+
+def test_fingerprint_is_order_independent(brick_config):
+    """Key order in the configuration must not change the cache key."""
+    reordered = dict(reversed(list(brick_config.items())))
+    assert tile_cache.config_fingerprint(brick_config) == tile_cache.config_fingerprint(reordered)
+
+
+def test_fingerprint_changes_with_config(brick_config):
+    """Different geometry parameters produce different cache keys."""
+    changed = dict(brick_config, tile_width=3)
+    assert tile_cache.config_fingerprint(brick_config) != tile_cache.config_fingerprint(changed)
+
+
+def test_second_request_is_served_from_cache(brick_config):
+    """An identical configuration is generated once and then reused."""
+    manifest, hit = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert not hit
+    assert os.path.exists(manifest["paths"]["stl"])
+
+    cached_manifest, hit = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert hit
+    assert cached_manifest["paths"] == manifest["paths"]
+
+    stats = tile_cache.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_build_finished_before_the_lock_is_reused(brick_config, monkeypatch):
+    """An entry built between the first lookup and an uncontended acquire is not built again."""
+    manifest, _ = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+
+    def generate_entry(*args, **kwargs):
+        raise AssertionError("built twice")
+
+    # The first lookup ran before the concurrent build finished
+    monkeypatch.setattr(tile_cache, "cached_tile", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tile_cache, "_generate_entry", generate_entry)
+    coalesced_manifest, hit = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert hit
+    assert coalesced_manifest["paths"] == manifest["paths"]
+    assert tile_cache.cache_stats()["coalesced"] == 1
+
+
+def test_missing_artifact_invalidates_entry(brick_config):
+    """A deleted artifact forces regeneration instead of a broken hit."""
+    manifest, _ = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    os.remove(manifest["paths"]["stl"])
+
+    _, hit = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    assert not hit
+
+
+def test_lru_eviction(brick_config, settings):
+    """The least recently used entry is evicted once the entry limit is hit."""
+    settings.TILE_CACHE_MAX_ENTRIES = 2
+    first, _ = tile_cache.get_or_generate_tile(brick_config, tile_type="brick_tile")
+    second, _ = tile_cache.get_or_generate_tile(dict(brick_config, tile_width=3), tile_type="brick_tile")
+
+    # Touch the first entry so the second becomes least recently used
+    os.utime(os.path.join(tile_cache.get_cache_root(), second["key"], tile_cache.MANIFEST_NAME), (0, 0))
+    tile_cache.lookup(first["key"])
+
+    tile_cache.get_or_generate_tile(dict(brick_config, tile_width=4), tile_type="brick_tile")
+
+    assert tile_cache.lookup(first["key"]) is not None
+    assert tile_cache.lookup(second["key"]) is None
+    assert tile_cache.cache_stats()["evictions"] == 1
@@ -0,0 +1,90 @@
+"""
+Test Script: test_track_geometry.py
+Description: Test suite for plain track tile generation.
+"""
+
+import json
+import pytest
+from django.core.management import call_command
+from resources.configs.yaml_config import config_path_for, get_default_config_path, load_config
+from resources.helpers import brick_geometry, track_geometry
+from resources.helpers.tile_assembly import assemble_tile
+
+
+@pytest.fixture
+def track_config():
+    """Fixture providing the default plain track configuration."""
+    return load_config(get_default_config_path("plain_track"))
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Start every test with an empty prototype registry."""
+    brick_geometry.clear_prototype_cache()
+    yield
+    brick_geometry.clear_prototype_cache()
+
+
+def test_default_config_fills_track_defaults(track_config):
+    """plain_track.yaml validates and carries every track dimension."""
+    assert track_config["tile_type"] == "plain_track"
+    assert track_config["gauge"] == 1435
+    assert len(track_geometry.sleeper_positions(track_config)) == 10
+
+
+def test_sleepers_are_centred_with_constant_pitch(track_config):
+    """Leftover length is split between both ends so tiles join at the same pitch."""
+    config = track_config.with_overrides(track_length=7350)
+    positions = track_geometry.sleeper_positions(config)
+    assert positions[0] == pytest.approx(7350 - positions[-1])
+    assert positions[1] - positions[0] == pytest.approx(config["spacing"])
+
+
+def test_track_tile_instances_sleepers_and_rails(track_config):
+    """Every sleeper unit and both rails are placed; each part is built only once."""
+    config = track_config.with_overrides(track_length=100 * track_config["spacing"])
+    tile = assemble_tile(config)
+    compound = tile.toCompound()
+
+    # A sleeper and two chairs per position plus two rails
+    assert len(compound.Solids()) == 100 * 3 + 2
+    assert brick_geometry.prototype_cache_stats()["misses"] == 3
+
+    box = compound.BoundingBox()
+    assert box.xlen == pytest.approx(config["track_length"])
+    assert box.ylen == pytest.approx(config["track_width"])
+    assert box.zlen == pytest.approx(config["track_height"] + config["chair_height"] + config["rail_height"])
+
+
+def test_rails_sit_at_gauge(track_config):
+    """The inner faces of the rail heads are one gauge apart."""
+    rail = track_geometry.create_rail(track_config).val()
+    assert rail.BoundingBox().xlen == pytest.approx(track_config["track_length"])
+    inner_face = track_geometry.rail_offset(track_config) - track_config["rail_head_width"] / 2
+    assert 2 * inner_face == pytest.approx(track_config["gauge"])
+
+
+@pytest.mark.parametrize(
+    "overrides, message",
+    [
+        ({"sleeper_width": 800}, "Sleepers overlap"),
+        ({"track_width": 1600}, "do not fit on sleepers"),
+        ({"rail_head_height": 160}, "rail_head_height"),
+        ({"track_length": 500}, "shorter than one sleeper spacing"),
+    ],
+)
+def test_invalid_layouts_are_rejected(track_config, overrides, message):
+    """Parts that cannot fit together raise a ValueError before any geometry is built."""
+    with pytest.raises(ValueError, match=message):
+        assemble_tile(track_config.with_overrides(**overrides))
+
+
+def test_track_tiles_resolve_everywhere(settings, tmpdir, capsys):
+    """Track tiles resolve to their default config in the CLIs too, not to configs/bricks."""
+    settings.MEDIA_ROOT = str(tmpdir)
+    assert config_path_for("plain_track") == get_default_config_path("plain_track")
+    assert config_path_for("brick_tile") == "resources/configs/bricks/brick_tile.yaml"
+
+    call_command("generate_batch", "plain_track", "--formats", "stl", "--workers", "0")
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert json.loads(lines[0])["status"] == "succeeded"
@@ -0,0 +1,168 @@
+"""
+Test Script: test_wall_tiling.py
+Description: Test suite for splitting large walls into cached, bond-aligned sub-tiles.
+"""
+
+import os
+import numpy as np
+import pytest
+from resources.helpers.mesh_engine import build_tile_mesh
+from resources.helpers.wall_tiling import bond_periods, export_wall, get_wall_root, plan_wall, read_binary_stl
+
+
+@pytest.fixture
+def wall_config():
+    """Fixture providing a wall that does not divide evenly into chunks."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 7,
+        "tile_width": 11,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Point MEDIA_ROOT at a temporary directory."""
+    settings.MEDIA_ROOT = str(tmpdir)
+
+
+def sorted_triangles(triangles):
+    """Order-independent view of a triangle array."""
+    rows = np.round(np.asarray(triangles, dtype=float).reshape(len(triangles), -1), 3)
+    return rows[np.lexsort(rows.T[::-1])]
+
+
+@pytest.mark.parametrize("bond_pattern, periods", [("flemish", (2, 2)), ("stretcher", (2, 1)), ("stack", (1, 1))])
+def test_bond_periods(wall_config, bond_pattern, periods):
+    """Chunks repeat every full+half brick and every distinct row layout."""
+    assert bond_periods({**wall_config, "bond_pattern": bond_pattern}) == periods
+
+
+def test_plan_aligns_chunks_and_dedupes(wall_config):
+    """Chunk sizes round up to the bond period; only edge chunks differ from the interior."""
+    plan = plan_wall(wall_config, chunk_width=3, chunk_rows=3)
+    assert (plan["chunk_width"], plan["chunk_rows"]) == (4, 4)
+    assert len(plan["placements"]) == 3 * 2
+    assert len(plan["chunks"]) == 4  # interior, right edge, top edge, corner
+
+
+@pytest.mark.parametrize("bond_pattern", ["flemish", "stretcher", "stack"])
+def test_combined_stl_matches_monolithic_wall(wall_config, bond_pattern):
+    """Composed chunks reproduce the wall exactly."""
+    config = {**wall_config, "bond_pattern": bond_pattern}
+    manifest = export_wall(config, export_formats=["stl"], chunk_width=4, chunk_rows=3)
+
+    combined = read_binary_stl(manifest["files"]["stl"]["path"])["vertices"]
+    assert np.array_equal(sorted_triangles(combined), sorted_triangles(build_tile_mesh(config)))
+
+
+def test_chunk_mode_and_cache(wall_config):
+    """Chunk mode lists distinct chunk files; repeated walls are served from disk."""
+    manifest = export_wall(wall_config, mode="chunks", chunk_width=4, chunk_rows=4)
+    assert manifest["files"] == {} and not manifest["cached"]
+    assert len(manifest["chunk_files"]) == manifest["distinct_chunks"]
+    assert all(os.path.exists(paths["stl"]) for paths in manifest["chunk_files"].values())
+    assert {placement["chunk"] for placement in manifest["placements"]} == set(manifest["chunk_files"])
+
+    assert export_wall(wall_config, mode="chunks", chunk_width=4, chunk_rows=4)["cached"]
+
+
+def test_wall_built_before_the_lock_is_reused(wall_config, monkeypatch):
+    """A wall finished between the first manifest read and an uncontended acquire is reused."""
+    from resources.helpers import wall_tiling
+
+    export_wall(wall_config, mode="chunks", chunk_width=4, chunk_rows=4)
+    reads = []
+
+    def read_wall_manifest(manifest_path):
+        reads.append(manifest_path)
+        # The first read ran before the concurrent build finished
+        return real_read_wall_manifest(manifest_path) if len(reads) > 1 else None
+
+    real_read_wall_manifest = wall_tiling._read_wall_manifest
+    monkeypatch.setattr(wall_tiling, "_read_wall_manifest", read_wall_manifest)
+    assert export_wall(wall_config, mode="chunks", chunk_width=4, chunk_rows=4)["cached"]
+    assert len(reads) == 2
+
+
+def test_invalid_mode(wall_config):
+    """Unknown modes are rejected."""
+    with pytest.raises(ValueError, match="Unsupported wall mode"):
+        export_wall(wall_config, mode="everything")
+
+
+def test_combined_step_wall(wall_config):
+    """Combined STEP walls are written from chunk instances and report their bounds."""
+    manifest = export_wall(wall_config, export_formats=["step"], chunk_width=4, chunk_rows=4)
+
+    entry = manifest["files"]["step"]
+    assert os.path.getsize(entry["path"]) > 0
+    height = entry["bounds"]["max"][2] - entry["bounds"]["min"][2]
+    assert height == pytest.approx(7 * wall_config["brick_height"], abs=0.01)
+
+
+def test_combined_wall_is_assembled_once(wall_config, monkeypatch):
+    """Several non-STL formats share one assembled wall."""
+    from resources.helpers import wall_tiling
+
+    assembled = []
+    written = []
+
+    def assemble_wall(config, plan=None):
+        assembled.append(plan)
+        return real_assemble_wall(config, plan=plan)
+
+    def write_glb(wall, compound, file_path, tessellation):
+        written.append(wall)
+        with open(file_path, "wb") as file:
+            file.write(b"glb")
+        return {}
+
+    real_assemble_wall = wall_tiling.assemble_wall
+    monkeypatch.setattr(wall_tiling, "assemble_wall", assemble_wall)
+    monkeypatch.setitem(wall_tiling.FORMAT_WRITERS, "glb", write_glb)
+    manifest = export_wall(wall_config, export_formats=["step", "stl", "glb"], chunk_width=4, chunk_rows=4)
+
+    assert set(manifest["files"]) == {"step", "stl", "glb"}
+    assert len(assembled) == 1 and len(written) == 1
+
+
+def test_walls_are_evicted_lru(wall_config, settings):
+    """Walls beyond the entry limit are evicted, least recently used first."""
+    settings.TILE_WALL_MAX_ENTRIES = 2
+    first = export_wall(wall_config, chunk_width=4, chunk_rows=4)
+    second = export_wall(wall_config, chunk_width=6, chunk_rows=4)
+    os.utime(first["manifest_path"], (0, 0))
+    os.utime(second["manifest_path"], (1, 1))
+    # A hit counts as an access, so the first wall is now the most recent
+    assert export_wall(wall_config, chunk_width=4, chunk_rows=4)["cached"]
+
+    export_wall(wall_config, chunk_width=8, chunk_rows=4)
+    assert os.path.exists(first["manifest_path"])
+    assert not os.path.exists(os.path.dirname(second["manifest_path"]))
+    assert len(os.listdir(get_wall_root())) == 2
+
+
+def test_wall_endpoint_reports_build_errors(client, monkeypatch):
+    """Geometry failures answer 500 with their message rather than an empty error."""
+    def fail(*args, **kwargs):
+        raise RuntimeError("❌ Fusion failed for 4 shapes")
+
+    monkeypatch.setattr("resources.helpers.wall_tiling.export_wall", fail)
+    response = client.post("/api/tiles/wall/?tile_type=brick_tile&wall_width=8&wall_rows=4")
+    assert response.status_code == 500
+    assert "Fusion failed" in response.json()["detail"]
+
+
+def test_wall_endpoint_needs_brick_tiles(client):
+    """Track tiles are rejected explicitly; unknown tile types are 404s."""
+    response = client.post("/api/tiles/wall/?tile_type=plain_track&wall_width=8&wall_rows=4")
+    assert response.status_code == 400
+    assert "brick tiles" in response.json()["detail"]
+    assert client.post("/api/tiles/wall/?tile_type=no_such_tile&wall_width=8&wall_rows=4").status_code == 404
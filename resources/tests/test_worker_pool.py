@@ -0,0 +1,85 @@
+"""
+Test Script: test_worker_pool.py
+Description: Test suite for the warm tile worker pool.
+"""
+
+import time
+import pytest
+from resources.helpers import job_queue
+from resources.helpers.worker_pool import WorkerPool, current_rss_bytes, worker_stats
+
+
+@pytest.fixture
+def brick_config():
+    """Fixture providing a small brick tile configuration."""
+    return {
+        "tile_type": "bricks",
+        "brick_length": 250,
+        "brick_width": 120,
+        "brick_height": 60,
+        "mortar_chamfer": 5,
+        "row_repetition": 2,
+        "tile_width": 2,
+        "bond_pattern": "flemish",
+        "export_formats": ["stl"],
+    }
+
+
+@pytest.fixture
+def pool_settings(settings, tmpdir):
+    """Queue jobs for the pool in a temporary job database."""
+    settings.MEDIA_ROOT = str(tmpdir.mkdir("media"))
+    settings.TILE_JOB_DATABASE = str(tmpdir.join("jobs.sqlite3"))
+    settings.TILE_JOB_BACKEND = "pool"
+    return settings
+
+
+def wait_for(job_id, timeout=60):
+    """Poll a job until it leaves the queue."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get_tile_job(job_id)
+        if job["status"] in (job_queue.SUCCEEDED, job_queue.FAILED):
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_pool_backend_only_enqueues(brick_config, pool_settings):
+    """With the pool backend, submitting leaves the job queued for the workers."""
+    job, created = job_queue.submit_tile_job(brick_config, tile_type="brick_tile")
+    assert created
+    assert job["status"] == job_queue.QUEUED
+
+
+def test_pool_runs_and_recycles_workers(brick_config, pool_settings):
+    """Workers claim queued jobs and are replaced after ``max_jobs``."""
+    pool = WorkerPool(
+        pool_settings.TILE_JOB_DATABASE,
+        size=1,
+        max_jobs=1,
+        poll_interval=0.1,
+        settings_overrides={"MEDIA_ROOT": pool_settings.MEDIA_ROOT, "TILE_ARTIFACT_INDEX": False},
+    ).start()
+    try:
+        first, _ = job_queue.submit_tile_job(brick_config, tile_type="brick_tile")
+        second, _ = job_queue.submit_tile_job(dict(brick_config, tile_width=3), tile_type="brick_tile")
+
+        deadline = time.monotonic() + 60
+        while job_queue.get_tile_job(second["id"])["status"] == job_queue.QUEUED:
+            pool.check_workers()
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+
+        assert wait_for(first["id"])["status"] == job_queue.SUCCEEDED
+        assert wait_for(second["id"])["status"] == job_queue.SUCCEEDED
+        assert pool.recycled >= 1
+    finally:
+        pool.stop()
+
+    assert worker_stats(pool_settings.TILE_JOB_DATABASE) == []
+
+
+def test_current_rss_bytes():
+    """Resident memory is reported for the current process."""
+    assert current_rss_bytes() > 0
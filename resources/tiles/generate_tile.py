@@ -1,46 +1,114 @@
+"""
+generate_tile.py - Generates and exports a tile from the command line.
+
+Usage:
+    python -m resources.tiles.generate_tile
+    python -m resources.tiles.generate_tile --tile-type plain_track --formats stl
+    python -m resources.tiles.generate_tile --config my_tile.yaml --show
+    python -m resources.tiles.generate_tile --lod 2
+
+``--show`` opens the tile in the OCP CAD Viewer when ``ocp_vscode`` is installed.
+Django and CadQuery are only loaded once ``main`` runs, so importing this module is cheap.
+"""
+
+import argparse
 import os
 import sys
-import django
-from ocp_vscode import show_object
 
-# Ensure Python finds `resources/`
+# Ensure Python finds `resources/` when run as a plain script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-# ✅ **Manually configure Django settings**
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "railworks_project.settings")
-django.setup()  # ✅ This initializes Django settings manually
 
-# Import necessary modules AFTER setting up Django
-from django.conf import settings
-from resources.configs.yaml_config import load_config, validate_config, get_default_config_path
-from resources.helpers.tile_assembly import assemble_tile
-from resources.helpers.file_helper import export_tile
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Generate a tile from its YAML configuration.")
+    parser.add_argument("--tile-type", default="brick_tile",
+                        help="Tile type whose default configuration is used (e.g. brick_tile, plain_track).")
+    parser.add_argument("--config", help="Path to a YAML configuration (overrides --tile-type's default).")
+    parser.add_argument("--formats", nargs="+", help="Export formats (defaults to the config's).")
+    parser.add_argument("--version", default="v2.0", help="Version label used in the file names.")
+    parser.add_argument("--output-dir",
+                        help="Directory for the exported files (defaults to a versioned one in MEDIA_ROOT).")
+    parser.add_argument("--fuse", action="store_true", help="Fuse the tile into as few solids as possible.")
+    parser.add_argument("--lod", type=int, choices=(0, 1, 2),
+                        help="Level of detail: 0 full, 1 plain boxes, 2 one slab (defaults to the config's).")
+    parser.add_argument("--show", action="store_true", help="Show the tile in the OCP CAD Viewer.")
+    return parser.parse_args(argv)
+
+
+def show_tile(tile, name: str) -> bool:
+    """
+    Show a tile in the OCP CAD Viewer.
+    :return: False if ``ocp_vscode`` is not installed.
+    """
+    try:
+        from ocp_vscode import show_object
+    except ImportError:
+        print("❌ ocp_vscode is not installed; skipping the viewer.")
+        return False
+    show_object(tile, name=name)
+    return True
+
+
+def main(argv=None) -> int:
+    """
+    Generate and export one tile.
+    :return: Process exit code.
+    """
+    args = parse_args(argv)
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "railworks_project.settings")
+    django.setup()
 
-# Load default config path (fallback to "brick_tile" if type is not set)
-default_config_path = get_default_config_path("brick_tile")  # Uses correct filename
-temp_config = load_config(default_config_path)
+    # Geometry modules pull in CadQuery/OCP; import them only once we need them
+    from resources.configs.yaml_config import get_default_config_path, load_config, validate_config
+    from resources.helpers.file_helper import export_tile
+    from resources.helpers.tessellation import resolve_tessellation
+    from resources.helpers.tile_assembly import assemble_tile
 
-# Extract actual tile type from the loaded config
-tile_type = temp_config.get("tile_type", "brick_tile")  # Defaults to "brick_tile" if missing
+    try:
+        config = load_config(args.config or get_default_config_path(args.tile_type))
+        validate_config(config)
+        if args.lod is not None:
+            config = config.with_overrides(lod=args.lod)
+        tile = assemble_tile(config)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
 
-# Load correct config file based on actual tile type
-config_path = get_default_config_path(tile_type)
-config = load_config(config_path)
+    # A fused tile is a bare shape; it doubles as the compound the writers mesh
+    compound = None
+    if args.fuse or config["fuse_solids"]:
+        from resources.helpers.fusion import fuse_tile
 
-# Validate the extracted config
-validate_config(config, tile_type)
+        tile = compound = fuse_tile(config, tile=tile)
 
-# Generate the tile dynamically
-tile = assemble_tile(config)
+    tile_type = args.tile_type if args.config is None else config["tile_type"]
+    if config["lod"]:
+        # Keep reduced levels from overwriting the full tile's files
+        tile_type = f"{tile_type}_lod{config['lod']}"
 
-# ✅ **Ensure `MEDIA_ROOT` exists**
-if not os.path.exists(settings.MEDIA_ROOT):
-    os.makedirs(settings.MEDIA_ROOT)
+    try:
+        export_tile(
+            tile,
+            version=args.version,
+            tile_type=tile_type,
+            export_formats=args.formats or list(config["export_formats"]),
+            output_dir=args.output_dir,
+            tessellation=resolve_tessellation(config),
+            compound=compound,
+        )
+    except RuntimeError as e:
+        print(e)
+        return 1
+    print(f"✅ Tile generation and export completed for {tile_type}!")
 
-# Export the tile
-export_tile(tile, version="v2.0", tile_type=tile_type, export_formats=config["export_formats"])
+    if args.show:
+        show_tile(tile, name=f"{tile_type} tile")
+    return 0
 
-print(f"✅ Tile generation and export completed for {tile_type}!")
 
-     # Visualize the tile
-show_object(tile, name="Flemish Bond Tile")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())